@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""Offline grading of finished experiments through the OpenAI and Anthropic batch APIs.
+
+Grading runs in rounds. Each round runs the evaluators with judge calls deferred: cached
+results are used as usual and every missing judge call is collected instead of being made.
+The collected calls are submitted as batch jobs, chunked to the provider's size limits, and
+their parsed results are written to the judge cache. Calls that depend on an earlier result
+(claim verification after claim extraction) are collected in the next round. Once a round
+collects nothing new, the evaluators produce their usual feedback keys from the cache alone.
+
+Submitted batch ids are kept in a state file, so a restarted run resumes polling the same
+jobs instead of submitting (and paying for) them again. Point --base-url at a stand-in
+server (see batch_standin_server.py) to exercise the whole flow locally.
+"""
+
+import argparse
+import inspect
+import json
+import os
+import random
+import re
+import time
+import requests
+from dotenv import load_dotenv
+from langchain_anthropic import ChatAnthropic
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from langsmith import Client
+from tests.evaluators import eval_overall_quality, eval_relevance, eval_structure, eval_correctness, eval_groundedness, eval_groundedness_chunked, eval_completeness
+from tests.pairwise_evaluation import head_to_head_evaluator, free_for_all_evaluator
+from tests.judge_cache import judge_cache
+from tests.judges import JudgeCallDeferred, defer_judge_calls
+from tests.experiments import load_experiment_outputs
+
+load_dotenv("../.env")
+
+DEFAULT_BASE_URLS = {
+    "openai": "https://api.openai.com/v1",
+    "anthropic": "https://api.anthropic.com/v1",
+}
+# Per-batch limits; the byte caps stay a little under the documented maximums
+BATCH_LIMITS = {
+    "openai": {"max_requests": 50_000, "max_bytes": 190 * 1024 ** 2},
+    "anthropic": {"max_requests": 100_000, "max_bytes": 240 * 1024 ** 2},
+}
+# A call submitted this many times without a usable result is reported as an evaluator error
+MAX_ATTEMPTS = 2
+STATE_DIR = "tests/.cache/batches"
+
+
+def _strip_cache_control(content):
+    if isinstance(content, list):
+        return [{key: value for key, value in block.items() if key != "cache_control"} for block in content]
+    return content
+
+
+def _text_blocks(content) -> list[dict]:
+    return [{"type": "text", "text": content}] if isinstance(content, str) else list(content)
+
+
+class OpenAIBatchAPI:
+    """Chat completions through /v1/batches, with the judge's schema forced as a tool call."""
+
+    provider = "openai"
+
+    def __init__(self, base_url: str, api_key: str, session: requests.Session):
+        self.base_url = base_url.rstrip("/")
+        self.headers = {"Authorization": f"Bearer {api_key}"}
+        self.session = session
+
+    def request_line(self, custom_id: str, call: dict) -> dict:
+        judge = call["judge"]
+        body = {
+            "model": judge.model_name,
+            "messages": [{"role": message["role"], "content": _strip_cache_control(message["content"])} for message in call["messages"]],
+            "tools": [convert_to_openai_tool(schema) for schema in call["tool_schemas"]],
+            "tool_choice": {"type": "function", "function": {"name": call["schema"].__name__}},
+            "parallel_tool_calls": False,
+        }
+        if getattr(judge, "temperature", None) is not None:
+            body["temperature"] = judge.temperature
+        if call["prompt_cache_key"]:
+            body["prompt_cache_key"] = call["prompt_cache_key"]
+        return {"custom_id": custom_id, "method": "POST", "url": "/v1/chat/completions", "body": body}
+
+    def submit(self, lines: list[dict]) -> str:
+        payload = "".join(json.dumps(line) + "\n" for line in lines).encode("utf-8")
+        upload = self.session.post(f"{self.base_url}/files", headers=self.headers, files={"file": ("judge_batch.jsonl", payload)}, data={"purpose": "batch"})
+        upload.raise_for_status()
+        batch = self.session.post(
+            f"{self.base_url}/batches",
+            headers=self.headers,
+            json={"input_file_id": upload.json()["id"], "endpoint": "/v1/chat/completions", "completion_window": "24h"},
+        )
+        batch.raise_for_status()
+        return batch.json()["id"]
+
+    def _batch(self, batch_id: str) -> dict:
+        response = self.session.get(f"{self.base_url}/batches/{batch_id}", headers=self.headers)
+        response.raise_for_status()
+        return response.json()
+
+    def is_done(self, batch_id: str) -> bool:
+        # Expired and cancelled batches still carry the results that finished in time
+        return self._batch(batch_id)["status"] in ("completed", "failed", "expired", "cancelled")
+
+    def results(self, batch_id: str):
+        """Yield (custom_id, tool call arguments or None) for every request that finished."""
+        output_file_id = self._batch(batch_id).get("output_file_id")
+        if not output_file_id:
+            return
+        response = self.session.get(f"{self.base_url}/files/{output_file_id}/content", headers=self.headers)
+        response.raise_for_status()
+        for line in response.text.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            body = (record.get("response") or {}).get("body") or {}
+            try:
+                arguments = json.loads(body["choices"][0]["message"]["tool_calls"][0]["function"]["arguments"])
+            except (KeyError, IndexError, TypeError, json.JSONDecodeError):
+                arguments = None
+            yield record["custom_id"], arguments
+
+
+class AnthropicBatchAPI:
+    """Messages through /v1/messages/batches, with the judge's schema offered as a tool."""
+
+    provider = "anthropic"
+
+    def __init__(self, base_url: str, api_key: str, session: requests.Session):
+        self.base_url = base_url.rstrip("/")
+        self.headers = {"x-api-key": api_key, "anthropic-version": "2023-06-01"}
+        self.session = session
+
+    def request_line(self, custom_id: str, call: dict) -> dict:
+        judge = call["judge"]
+        system = [block for message in call["messages"] if message["role"] == "system" for block in _text_blocks(message["content"])]
+        params = {
+            "model": judge.model,
+            "max_tokens": judge.max_tokens,
+            "messages": [message for message in call["messages"] if message["role"] != "system"],
+            "tools": [
+                {"name": tool["function"]["name"], "description": tool["function"].get("description", ""), "input_schema": tool["function"]["parameters"]}
+                for tool in (convert_to_openai_tool(schema) for schema in call["tool_schemas"])
+            ],
+            "tool_choice": {"type": "tool", "name": call["schema"].__name__},
+        }
+        if system:
+            params["system"] = system
+        thinking = getattr(judge, "thinking", None)
+        if thinking and thinking.get("type") == "enabled":
+            # Extended thinking only allows automatic tool choice; a reply without the tool call counts as a failed attempt
+            params["thinking"] = thinking
+            params["tool_choice"] = {"type": "auto"}
+        elif getattr(judge, "temperature", None) is not None:
+            params["temperature"] = judge.temperature
+        return {"custom_id": custom_id, "params": params}
+
+    def submit(self, lines: list[dict]) -> str:
+        response = self.session.post(f"{self.base_url}/messages/batches", headers=self.headers, json={"requests": lines})
+        response.raise_for_status()
+        return response.json()["id"]
+
+    def _batch(self, batch_id: str) -> dict:
+        response = self.session.get(f"{self.base_url}/messages/batches/{batch_id}", headers=self.headers)
+        response.raise_for_status()
+        return response.json()
+
+    def is_done(self, batch_id: str) -> bool:
+        return self._batch(batch_id)["processing_status"] == "ended"
+
+    def results(self, batch_id: str):
+        """Yield (custom_id, tool input or None) for every request that finished."""
+        results_url = self._batch(batch_id).get("results_url")
+        if not results_url:
+            return
+        response = self.session.get(results_url, headers=self.headers)
+        response.raise_for_status()
+        for line in response.text.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            result = record.get("result") or {}
+            tool_inputs = [
+                block["input"] for block in (result.get("message") or {}).get("content", [])
+                if result.get("type") == "succeeded" and block.get("type") == "tool_use"
+            ]
+            yield record["custom_id"], tool_inputs[0] if tool_inputs else None
+
+
+def make_batch_apis(base_url: str | None = None) -> dict:
+    session = requests.Session()
+    return {
+        "openai": OpenAIBatchAPI(base_url or DEFAULT_BASE_URLS["openai"], os.getenv("OPENAI_API_KEY", ""), session),
+        "anthropic": AnthropicBatchAPI(base_url or DEFAULT_BASE_URLS["anthropic"], os.getenv("ANTHROPIC_API_KEY", ""), session),
+    }
+
+
+def chunk_requests(lines: list[dict], max_requests: int, max_bytes: int):
+    """Split request lines into batches that respect the provider's request count and size limits."""
+    chunk, size = [], 0
+    for line in lines:
+        line_bytes = len(json.dumps(line).encode("utf-8")) + 1
+        if chunk and (len(chunk) >= max_requests or size + line_bytes > max_bytes):
+            yield chunk
+            chunk, size = [], 0
+        chunk.append(line)
+        size += line_bytes
+    if chunk:
+        yield chunk
+
+
+def load_state(state_path: str) -> dict:
+    if not os.path.exists(state_path):
+        return {"batches": [], "attempts": {}}
+    with open(state_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_state(state_path: str, state: dict) -> None:
+    os.makedirs(os.path.dirname(state_path) or ".", exist_ok=True)
+    tmp_path = f"{state_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, state_path)
+
+
+def _collect(grade):
+    calls = {}
+    defer_judge_calls(calls)
+    try:
+        graded = grade()
+    finally:
+        defer_judge_calls(None)
+    return graded, calls
+
+
+def _submit(calls: dict, apis: dict, state: dict, state_path: str) -> None:
+    by_provider = {}
+    for key, call in calls.items():
+        api = apis["anthropic" if isinstance(call["judge"], ChatAnthropic) else "openai"]
+        by_provider.setdefault(api.provider, []).append(api.request_line(key, call))
+    for provider, lines in by_provider.items():
+        for chunk in chunk_requests(lines, **BATCH_LIMITS[provider]):
+            batch_id = apis[provider].submit(chunk)
+            custom_ids = [line["custom_id"] for line in chunk]
+            for custom_id in custom_ids:
+                state["attempts"][custom_id] = state["attempts"].get(custom_id, 0) + 1
+            state["batches"].append({"provider": provider, "id": batch_id, "custom_ids": custom_ids, "done": False})
+            # Record every batch as soon as it exists so a crash never resubmits it
+            save_state(state_path, state)
+            print(f"Submitted {provider} batch {batch_id} with {len(chunk)} judge calls")
+
+
+def _wait(calls: dict, apis: dict, state: dict, state_path: str, poll_seconds: float) -> None:
+    while pending := [batch for batch in state["batches"] if not batch["done"]]:
+        for batch in pending:
+            api = apis[batch["provider"]]
+            if not api.is_done(batch["id"]):
+                continue
+            parsed = 0
+            for custom_id, arguments in api.results(batch["id"]):
+                call = calls.get(custom_id)
+                if call is None or arguments is None:
+                    continue
+                try:
+                    judge_cache.put(custom_id, call["schema"].model_validate(arguments))
+                    parsed += 1
+                except ValueError:
+                    continue
+            batch["done"] = True
+            save_state(state_path, state)
+            print(f"{batch['provider']} batch {batch['id']} ended: {parsed}/{len(batch['custom_ids'])} results parsed")
+        if any(not batch["done"] for batch in state["batches"]):
+            time.sleep(poll_seconds)
+
+
+def run_batch_rounds(grade, apis: dict, state_path: str, poll_seconds: float = 60.0):
+    """Alternate deferred grading and batch jobs until every judge call has been answered or given up on.
+
+    grade() runs the evaluators and must be deterministic, since it is re-run every round and
+    after restarts. Returns what the last call to grade() returned.
+    """
+    if not judge_cache.enabled:
+        raise RuntimeError("Batch grading stores results in the judge cache; unset JUDGE_CACHE=off")
+    state = load_state(state_path)
+    while True:
+        graded, calls = _collect(grade)
+        in_flight = {custom_id for batch in state["batches"] if not batch["done"] for custom_id in batch["custom_ids"]}
+        to_submit = {
+            key: call for key, call in calls.items()
+            if key not in in_flight and state["attempts"].get(key, 0) < MAX_ATTEMPTS
+        }
+        if not to_submit and not in_flight:
+            return graded
+        _submit(to_submit, apis, state, state_path)
+        _wait(calls, apis, state, state_path, poll_seconds)
+
+
+def _run_evaluator(evaluator, inputs: dict, outputs: dict, reference_outputs: dict) -> list[dict]:
+    kwargs = {"inputs": inputs, "outputs": outputs}
+    if "reference_outputs" in inspect.signature(evaluator).parameters:
+        kwargs["reference_outputs"] = reference_outputs
+    try:
+        result = evaluator(**kwargs)
+    except JudgeCallDeferred as error:
+        return [{"key": f"{evaluator.__name__}_error", "score": None, "comment": f"No batch result for judge call {error}"}]
+    except Exception as error:
+        return [{"key": f"{evaluator.__name__}_error", "score": None, "comment": repr(error)}]
+    return result if isinstance(result, list) else [result]
+
+
+def load_experiment_examples(client, experiment_name: str) -> list[tuple]:
+    """(run id, inputs, outputs, reference outputs) for an experiment's finished root runs."""
+    runs = [
+        run for run in client.list_runs(project_name=experiment_name, is_root=True, select=["id", "inputs", "outputs", "reference_example_id"])
+        if run.outputs and run.outputs.get("final_report") is not None and run.reference_example_id is not None
+    ]
+    example_ids = [run.reference_example_id for run in runs]
+    references = {example.id: example.outputs for example in client.list_examples(example_ids=example_ids)} if example_ids else {}
+    return [(run.id, run.inputs.get("inputs", run.inputs), run.outputs, references.get(run.reference_example_id) or {}) for run in runs]
+
+
+def batch_grade_experiment(client, experiment_name: str, evaluators: list, apis: dict, state_path: str, poll_seconds: float = 60.0, upload: bool = True) -> dict:
+    """Grade an experiment's runs through batch jobs and attach the feedback to its runs."""
+    examples = load_experiment_examples(client, experiment_name)
+
+    def grade():
+        return {
+            run_id: [entry for evaluator in evaluators for entry in _run_evaluator(evaluator, inputs, outputs, reference_outputs)]
+            for run_id, inputs, outputs, reference_outputs in examples
+        }
+
+    feedback = run_batch_rounds(grade, apis, state_path, poll_seconds)
+    if upload:
+        for run_id, entries in feedback.items():
+            for entry in entries:
+                client.create_feedback(run_id, key=entry["key"], score=entry["score"], comment=entry.get("comment"))
+    return feedback
+
+
+def batch_compare_experiments(client, experiment_names: list[str], apis: dict, state_path: str, poll_seconds: float = 60.0, seed: int = 0) -> dict:
+    """Judge two (head to head) or three (free for all) experiments on their shared examples through batch jobs."""
+    evaluator = head_to_head_evaluator if len(experiment_names) == 2 else free_for_all_evaluator
+    experiment_outputs = {name: load_experiment_outputs(client, name) for name in experiment_names}
+    examples = sorted(set.intersection(*(set(outputs) for outputs in experiment_outputs.values())), key=str)
+    # Fix presentation orders up front: every round must ask for exactly the same judge calls
+    rng = random.Random(seed)
+    orders = {example_id: rng.sample(experiment_names, len(experiment_names)) for example_id in examples}
+
+    def grade():
+        totals = {name: 0.0 for name in experiment_names}
+        judged = 0
+        for example_id in examples:
+            order = orders[example_id]
+            try:
+                scores = evaluator(experiment_outputs[order[0]][example_id][0], [experiment_outputs[name][example_id][1] for name in order])
+            except JudgeCallDeferred:
+                continue
+            for name, score in zip(order, scores):
+                totals[name] += score
+            judged += 1
+        return {"scores": totals, "examples_judged": judged, "examples_shared": len(examples)}
+
+    return run_batch_rounds(grade, apis, state_path, poll_seconds)
+
+
+def _state_path_for(experiment_names: list[str], pairwise: bool) -> str:
+    name = re.sub(r"[^A-Za-z0-9_.-]+", "_", "__".join(experiment_names))[:150]
+    return os.path.join(STATE_DIR, f"{'pairwise_' if pairwise else ''}{name}.json")
+
+
+def _mean_scores(feedback: dict) -> dict:
+    scores = {}
+    for entries in feedback.values():
+        for entry in entries:
+            if entry["score"] is not None:
+                scores.setdefault(entry["key"], []).append(entry["score"])
+    return {key: round(sum(values) / len(values), 3) for key, values in sorted(scores.items())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Grade finished experiments offline through the provider batch APIs')
+    parser.add_argument('experiments', nargs='+', help='Experiment (project) names to grade')
+    parser.add_argument('--pairwise', action='store_true', help='Compare two (head to head) or three (free for all) experiments instead')
+    parser.add_argument('--groundedness-mode', choices=['chunked', 'full'], default='chunked')
+    parser.add_argument('--base-url', help='Send batch requests to this base URL (e.g. a local stand-in server) instead of the providers')
+    parser.add_argument('--state-file', help='Where submitted batches are tracked (default: derived from the experiment names)')
+    parser.add_argument('--poll-seconds', type=float, default=60.0)
+    parser.add_argument('--no-upload', action='store_true', help='Print the feedback instead of attaching it to the runs')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    if args.pairwise and len(args.experiments) not in (2, 3):
+        parser.error("Pairwise grading compares two or three experiments")
+
+    client = Client()
+    apis = make_batch_apis(args.base_url)
+    if args.pairwise:
+        state_path = args.state_file or _state_path_for(args.experiments, True)
+        result = batch_compare_experiments(client, args.experiments, apis, state_path, args.poll_seconds, args.seed)
+        print(f"Judged {result['examples_judged']}/{result['examples_shared']} shared examples")
+        for name, score in sorted(result["scores"].items(), key=lambda item: item[1], reverse=True):
+            print(f"{name}: {score:g}")
+        return
+
+    groundedness = eval_groundedness_chunked if args.groundedness_mode == "chunked" else eval_groundedness
+    evaluators = [eval_overall_quality, eval_relevance, eval_structure, eval_correctness, groundedness, eval_completeness]
+    for experiment_name in args.experiments:
+        state_path = args.state_file or _state_path_for([experiment_name], False)
+        feedback = batch_grade_experiment(client, experiment_name, evaluators, apis, state_path, args.poll_seconds, upload=not args.no_upload)
+        print(f"{experiment_name}: graded {len(feedback)} runs, mean scores {_mean_scores(feedback)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""Local stand-in for the OpenAI and Anthropic batch endpoints used by batch_grading.py.
+
+Serves both APIs under one base URL (use --base-url http://127.0.0.1:8765/v1). Batches end
+after --complete-after seconds and every request is answered with a call to the forced tool
+whose arguments are filled from the tool's JSON schema, so no tokens are spent.
+"""
+
+import argparse
+import email
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Placeholder values per JSON schema type; integer scores land mid-scale
+SCHEMA_PLACEHOLDERS = {"integer": 3, "number": 0.5, "string": "stand-in", "boolean": True}
+
+
+def placeholder_for(schema: dict, definitions: dict):
+    if "$ref" in schema:
+        return placeholder_for(definitions[schema["$ref"].split("/")[-1]], definitions)
+    if "anyOf" in schema:
+        return placeholder_for(schema["anyOf"][0], definitions)
+    if schema.get("type") == "object":
+        return {name: placeholder_for(prop, definitions) for name, prop in schema.get("properties", {}).items()}
+    if schema.get("type") == "array":
+        return [placeholder_for(schema.get("items", {}), definitions)]
+    return SCHEMA_PLACEHOLDERS.get(schema.get("type"), None)
+
+
+def _tool_arguments(tools: list[dict], name: str) -> dict:
+    schema = next(tool.get("input_schema") or tool["function"]["parameters"] for tool in tools if tool.get("name", tool.get("function", {}).get("name")) == name)
+    return placeholder_for(schema, schema.get("$defs", {}))
+
+
+def _forced_tool_name(tools: list[dict], tool_choice: dict) -> str:
+    if tool_choice.get("name"):
+        return tool_choice["name"]
+    if tool_choice.get("function"):
+        return tool_choice["function"]["name"]
+    first = tools[0]
+    return first.get("name", first.get("function", {}).get("name"))
+
+
+class StandInBatches:
+    def __init__(self, complete_after: float):
+        self.complete_after = complete_after
+        self.files: dict[str, str] = {}
+        self.batches: dict[str, dict] = {}
+        self.lock = threading.Lock()
+
+    def _ended(self, batch: dict) -> bool:
+        return time.time() - batch["created_at"] >= self.complete_after
+
+    def openai_result(self, line: dict) -> dict:
+        body = line["body"]
+        name = _forced_tool_name(body["tools"], body.get("tool_choice") or {})
+        tool_call = {"id": f"call_{uuid.uuid4().hex[:8]}", "type": "function", "function": {"name": name, "arguments": json.dumps(_tool_arguments(body["tools"], name))}}
+        return {
+            "id": f"batch_req_{uuid.uuid4().hex[:8]}",
+            "custom_id": line["custom_id"],
+            "response": {"status_code": 200, "body": {"choices": [{"index": 0, "message": {"role": "assistant", "content": None, "tool_calls": [tool_call]}}], "usage": {"prompt_tokens": 0, "completion_tokens": 0}}},
+            "error": None,
+        }
+
+    def anthropic_result(self, request: dict) -> dict:
+        params = request["params"]
+        name = _forced_tool_name(params["tools"], params.get("tool_choice") or {})
+        block = {"type": "tool_use", "id": f"toolu_{uuid.uuid4().hex[:8]}", "name": name, "input": _tool_arguments(params["tools"], name)}
+        return {"custom_id": request["custom_id"], "result": {"type": "succeeded", "message": {"role": "assistant", "content": [block], "usage": {"input_tokens": 0, "output_tokens": 0}}}}
+
+
+def make_handler(state: StandInBatches):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, payload, status=200, content_type="application/json"):
+            data = payload.encode("utf-8") if isinstance(payload, str) else json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _body(self) -> bytes:
+            return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        def do_POST(self):
+            body = self._body()
+            with state.lock:
+                if self.path == "/v1/files":
+                    message = email.message_from_bytes(f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode("utf-8") + body)
+                    part = next(part for part in message.get_payload() if part.get_param("name", header="content-disposition") == "file")
+                    file_id = f"file-{uuid.uuid4().hex[:12]}"
+                    state.files[file_id] = part.get_payload(decode=True).decode("utf-8")
+                    return self._send({"id": file_id, "object": "file", "purpose": "batch"})
+                if self.path == "/v1/batches":
+                    lines = [json.loads(line) for line in state.files[json.loads(body)["input_file_id"]].splitlines() if line.strip()]
+                    batch_id = f"batch_{uuid.uuid4().hex[:12]}"
+                    state.batches[batch_id] = {"kind": "openai", "created_at": time.time(), "requests": lines}
+                    return self._send({"id": batch_id, "object": "batch", "status": "validating"})
+                if self.path == "/v1/messages/batches":
+                    batch_id = f"msgbatch_{uuid.uuid4().hex[:12]}"
+                    state.batches[batch_id] = {"kind": "anthropic", "created_at": time.time(), "requests": json.loads(body)["requests"]}
+                    return self._send({"id": batch_id, "type": "message_batch", "processing_status": "in_progress"})
+            self._send({"error": "not found"}, status=404)
+
+        def do_GET(self):
+            parts = self.path.strip("/").split("/")
+            with state.lock:
+                if parts[:2] == ["v1", "batches"] and len(parts) == 3 and parts[2] in state.batches:
+                    batch = state.batches[parts[2]]
+                    if not state._ended(batch):
+                        return self._send({"id": parts[2], "status": "in_progress", "output_file_id": None})
+                    if "output_file_id" not in batch:
+                        batch["output_file_id"] = f"file-{uuid.uuid4().hex[:12]}"
+                        state.files[batch["output_file_id"]] = "".join(json.dumps(state.openai_result(line)) + "\n" for line in batch["requests"])
+                    return self._send({"id": parts[2], "status": "completed", "output_file_id": batch["output_file_id"]})
+                if parts[:2] == ["v1", "files"] and len(parts) == 4 and parts[2] in state.files:
+                    return self._send(state.files[parts[2]], content_type="application/jsonl")
+                if parts[:3] == ["v1", "messages", "batches"] and len(parts) >= 4 and parts[3] in state.batches:
+                    batch = state.batches[parts[3]]
+                    if len(parts) == 5 and parts[4] == "results" and state._ended(batch):
+                        return self._send("".join(json.dumps(state.anthropic_result(request)) + "\n" for request in batch["requests"]), content_type="application/jsonl")
+                    ended = state._ended(batch)
+                    results_url = f"http://{self.headers['Host']}/v1/messages/batches/{parts[3]}/results" if ended else None
+                    return self._send({"id": parts[3], "processing_status": "ended" if ended else "in_progress", "results_url": results_url})
+            self._send({"error": "not found"}, status=404)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve stand-in OpenAI and Anthropic batch endpoints for batch_grading.py')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--complete-after', type=float, default=2.0, help='Seconds before a submitted batch ends')
+    args = parser.parse_args()
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(StandInBatches(args.complete_after)))
+    print(f"Stand-in batch server on http://127.0.0.1:{args.port}/v1")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
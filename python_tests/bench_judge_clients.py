@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Micro-benchmark of per-call judge overhead: fresh clients per call versus the shared registry.
+
+By default only client construction and structured-output binding are timed, which needs no
+network. With --live, each path also makes real judge calls so connection reuse is included.
+"""
+
+import argparse
+import asyncio
+import time
+from dotenv import load_dotenv
+from langchain_openai import ChatOpenAI
+from langchain_anthropic import ChatAnthropic
+from tests.evaluators import RelevanceScore
+from tests.judges import get_judge, structured_judge
+
+load_dotenv("../.env")
+
+LIVE_PROMPT = "User input: What is 2 + 2?\n\nReport: \n\n2 + 2 = 4.\n\nScore the relevance of the report from 1-5."
+
+
+def _fresh(provider: str, model: str):
+    model_class = ChatOpenAI if provider == "openai" else ChatAnthropic
+    return model_class(model=model).with_structured_output(RelevanceScore)
+
+
+def _pooled(provider: str, model: str):
+    return structured_judge(get_judge(provider, model), RelevanceScore)
+
+
+def time_overhead(build, provider: str, model: str, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        build(provider, model)
+    return (time.perf_counter() - started) / calls
+
+
+async def time_live(build, provider: str, model: str, calls: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call():
+        async with semaphore:
+            await build(provider, model).ainvoke(LIVE_PROMPT)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(call() for _ in range(calls)))
+    return (time.perf_counter() - started) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare per-call judge overhead of fresh clients and the shared registry')
+    parser.add_argument('--provider', default='openai', choices=['openai', 'anthropic'])
+    parser.add_argument('--model', default='gpt-4.1-mini')
+    parser.add_argument('--examples', type=int, default=100, help='Dataset size to extrapolate to')
+    parser.add_argument('--evaluators', type=int, default=6, help='Judge calls per example')
+    parser.add_argument('--calls', type=int, default=200, help='Calls to time per path')
+    parser.add_argument('--live', action='store_true', help='Also time real judge calls (costs tokens)')
+    parser.add_argument('--concurrency', type=int, default=10, help='Concurrent live calls')
+    args = parser.parse_args()
+
+    total_calls = args.examples * args.evaluators
+    # Warm the registry so the pooled path measures steady-state cost
+    _pooled(args.provider, args.model)
+    fresh = time_overhead(_fresh, args.provider, args.model, args.calls)
+    pooled = time_overhead(_pooled, args.provider, args.model, args.calls)
+    print(f"Client setup per call: fresh {fresh * 1000:.2f} ms, pooled {pooled * 1000:.3f} ms")
+    print(f"Saved over {total_calls} judge calls: {(fresh - pooled) * total_calls:.1f}s of setup")
+
+    if args.live:
+        live_calls = min(args.calls, 50)
+        fresh_live = asyncio.run(time_live(_fresh, args.provider, args.model, live_calls, args.concurrency))
+        pooled_live = asyncio.run(time_live(_pooled, args.provider, args.model, live_calls, args.concurrency))
+        print(f"Live wall time per call: fresh {fresh_live * 1000:.0f} ms, pooled {pooled_live * 1000:.0f} ms")
+        print(f"Projected saving over {total_calls} judge calls: {(fresh_live - pooled_live) * total_calls:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
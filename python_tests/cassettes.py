@@ -0,0 +1,187 @@
+"""Record/replay cassettes for the chat model and search calls made by the eval target and evaluators.
+
+In record mode every chat model request/response (through LangChain's global LLM cache) and
+every Tavily search is captured to a compact SQLite cassette keyed by a canonical hash of the
+request. In replay mode those responses are served locally, optionally with simulated latency,
+and any request missing from the cassette fails loudly instead of reaching the network.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Optional
+from langchain_core.caches import BaseCache
+from langchain_core.globals import set_llm_cache
+from langchain_core.load import dumps, loads
+from tests.sqlite_db import connect
+
+RECORD = "record"
+REPLAY = "replay"
+OFF = "off"
+
+DEFAULT_CASSETTE_PATH = os.getenv("CASSETTE_PATH", "tests/.cache/cassettes/deep_research_bench.sqlite")
+
+# get_today_str() puts the current date in prompts; it must not change the request hash across days
+_TODAY_RE = re.compile(r"\b(?:Mon|Tue|Wed|Thu|Fri|Sat|Sun) (?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec) \d{1,2}, \d{4}\b")
+
+
+class CassetteMiss(KeyError):
+    """Raised in replay mode when a request was never recorded."""
+
+
+def _strip_message_ids(value):
+    if isinstance(value, dict):
+        return {
+            key: _strip_message_ids(item)
+            for key, item in value.items()
+            # Serialized messages carry per-run ids under kwargs; the class path under "id" is kept
+            if not (key == "id" and isinstance(item, str))
+        }
+    if isinstance(value, list):
+        return [_strip_message_ids(item) for item in value]
+    return value
+
+
+def _parse_json(value):
+    # LangChain hands the cache serialized prompts and model settings as JSON strings
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+
+def canonical_hash(kind: str, request: Any) -> str:
+    """Hash a request so that run-specific noise (dates, message ids, key order) does not affect the key."""
+    parts = request if isinstance(request, list) else [request]
+    text = json.dumps([_strip_message_ids(_parse_json(part)) for part in parts], sort_keys=True, default=str, ensure_ascii=False)
+    text = _TODAY_RE.sub("<today>", text)
+    return hashlib.sha256(f"{kind}\n{text}".encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """A SQLite file of zlib-compressed responses keyed by canonical request hash."""
+
+    def __init__(self, path: str = DEFAULT_CASSETTE_PATH, mode: str = REPLAY, simulated_latency: float = 0.0):
+        if mode not in (RECORD, REPLAY, OFF):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.simulated_latency = simulated_latency
+        self.recorded = 0
+        self.replayed = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = connect(self.path, ["CREATE TABLE IF NOT EXISTS interactions (key TEXT PRIMARY KEY, kind TEXT NOT NULL, response BLOB NOT NULL)"])
+        return self._conn
+
+    def get(self, kind: str, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection().execute("SELECT response FROM interactions WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            raise CassetteMiss(f"No recorded {kind} response for request {key[:12]} in {self.path}")
+        self.replayed += 1
+        return zlib.decompress(row[0]).decode("utf-8")
+
+    def put(self, kind: str, key: str, response: str) -> None:
+        with self._lock:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO interactions (key, kind, response) VALUES (?, ?, ?)",
+                (key, kind, zlib.compress(response.encode("utf-8"), 9)),
+            )
+        self.recorded += 1
+
+    def stats(self) -> dict:
+        return {"mode": self.mode, "recorded": self.recorded, "replayed": self.replayed}
+
+
+class CassetteLLMCache(BaseCache):
+    """LangChain LLM cache that records every chat model response to, or replays it from, a cassette."""
+
+    def __init__(self, cassette: Cassette):
+        self.cassette = cassette
+
+    def lookup(self, prompt: str, llm_string: str):
+        if self.cassette.mode != REPLAY:
+            return None
+        response = self.cassette.get("chat_model", canonical_hash("chat_model", [prompt, llm_string]))
+        if self.cassette.simulated_latency:
+            time.sleep(self.cassette.simulated_latency)
+        return loads(response)
+
+    async def alookup(self, prompt: str, llm_string: str):
+        if self.cassette.mode != REPLAY:
+            return None
+        response = self.cassette.get("chat_model", canonical_hash("chat_model", [prompt, llm_string]))
+        if self.cassette.simulated_latency:
+            await asyncio.sleep(self.cassette.simulated_latency)
+        return loads(response)
+
+    def update(self, prompt: str, llm_string: str, return_val) -> None:
+        if self.cassette.mode == RECORD:
+            self.cassette.put("chat_model", canonical_hash("chat_model", [prompt, llm_string]), dumps(return_val))
+
+    async def aupdate(self, prompt: str, llm_string: str, return_val) -> None:
+        self.update(prompt, llm_string, return_val)
+
+    def clear(self, **kwargs) -> None:
+        pass
+
+
+def _cassette_search(cassette: Cassette, search):
+    async def tavily_search_async(search_queries, max_results: int = 5, topic="general", include_raw_content: bool = True, config=None):
+        key = canonical_hash("tavily", {
+            "search_queries": search_queries,
+            "max_results": max_results,
+            "topic": topic,
+            "include_raw_content": include_raw_content,
+        })
+        if cassette.mode == REPLAY:
+            if cassette.simulated_latency:
+                await asyncio.sleep(cassette.simulated_latency)
+            return json.loads(cassette.get("tavily", key))
+        results = await search(search_queries, max_results=max_results, topic=topic, include_raw_content=include_raw_content, config=config)
+        cassette.put("tavily", key, json.dumps(results, ensure_ascii=False, default=str))
+        return results
+    return tavily_search_async
+
+
+def load_examples(cassette: Cassette, client, dataset_name: str) -> list:
+    """Read the dataset's examples, recording them so that replayed runs do not need LangSmith to read them."""
+    from langsmith.schemas import Example
+
+    key = canonical_hash("examples", dataset_name)
+    if cassette.mode == REPLAY:
+        return [Example(**example) for example in json.loads(cassette.get("examples", key))]
+    examples = list(client.list_examples(dataset_name=dataset_name))
+    if cassette.mode == RECORD:
+        cassette.put("examples", key, json.dumps([
+            {
+                "id": str(example.id),
+                "dataset_id": str(example.dataset_id),
+                "inputs": example.inputs,
+                "outputs": example.outputs,
+                "metadata": example.metadata,
+            } for example in examples
+        ], ensure_ascii=False, default=str))
+    return examples
+
+
+def install_cassette(cassette: Cassette) -> None:
+    """Route all chat model calls and Tavily searches in this process through the cassette."""
+    if cassette.mode == OFF:
+        return
+    from open_deep_research import utils
+
+    set_llm_cache(CassetteLLMCache(cassette))
+    utils.tavily_search_async = _cassette_search(cassette, utils.tavily_search_async)
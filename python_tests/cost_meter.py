@@ -0,0 +1,183 @@
+"""Token and cost metering shared by the eval target and the judge evaluators.
+
+Every chat model call that carries the meter in its callbacks is counted (input, output and
+cached input tokens per model) and priced with a configurable price table. A budget cap stops
+new examples from being scheduled once it is reached; examples already running finish normally.
+"""
+
+import json
+import os
+import threading
+from collections import defaultdict
+from typing import Any, Iterable, Iterator, Optional
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+
+# USD per million tokens: (input, cached input, output). Override with a JSON file via COST_PRICE_TABLE.
+DEFAULT_PRICES = {
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+    "gpt-5": (1.25, 0.125, 10.00),
+    "gpt-5-mini": (0.25, 0.025, 2.00),
+    "gpt-5-nano": (0.05, 0.005, 0.40),
+    "claude-sonnet-4": (3.00, 0.30, 15.00),
+    "claude-opus-4": (15.00, 1.50, 75.00),
+    "claude-3-5-haiku": (0.80, 0.08, 4.00),
+}
+
+
+def load_prices(path: Optional[str] = os.getenv("COST_PRICE_TABLE")) -> dict:
+    prices = dict(DEFAULT_PRICES)
+    if path:
+        with open(path, encoding="utf-8") as f:
+            prices.update({model: tuple(price) for model, price in json.load(f).items()})
+    return prices
+
+
+TOKEN_KEYS = ("input_tokens", "output_tokens", "cached_tokens")
+
+
+def token_usage(response) -> Optional[dict]:
+    """Input, output, cached input and total tokens summed over an LLMResult's generations.
+
+    None when a generation has no usage_metadata, i.e. the provider did not report usage.
+    """
+    usage = {"input_tokens": 0, "output_tokens": 0, "cached_tokens": 0, "total_tokens": 0}
+    for generations in response.generations:
+        for generation in generations:
+            usage_metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if not usage_metadata:
+                return None
+            usage["input_tokens"] += usage_metadata.get("input_tokens", 0)
+            usage["output_tokens"] += usage_metadata.get("output_tokens", 0)
+            usage["cached_tokens"] += (usage_metadata.get("input_token_details") or {}).get("cache_read", 0)
+            usage["total_tokens"] += usage_metadata.get("total_tokens", 0)
+    return usage
+
+
+class BudgetExceeded(RuntimeError):
+    """Raised when work is requested after the budget cap has been reached."""
+
+
+class CostMeter(BaseCallbackHandler):
+    """Callback handler that accumulates token usage and cost per model."""
+
+    def __init__(self, prices: Optional[dict] = None, budget_usd: Optional[float] = None):
+        self.prices = prices if prices is not None else load_prices()
+        self.budget_usd = budget_usd
+        self._lock = threading.Lock()
+        self._models: dict[UUID, tuple[str, Optional[str]]] = {}
+        self.usage = defaultdict(lambda: {"calls": 0, "input_tokens": 0, "output_tokens": 0, "cached_tokens": 0})
+        # Keyed by the "example_id" the eval target puts in its run metadata; judge calls carry none
+        self._example_usage: dict[str, dict] = {}
+
+    def _price(self, model: str) -> Optional[tuple]:
+        # Dated snapshots such as gpt-4.1-mini-2025-04-14 are priced as their longest matching prefix
+        matches = [name for name in self.prices if model == name or model.startswith(f"{name}-")]
+        return self.prices[max(matches, key=len)] if matches else None
+
+    def on_chat_model_start(self, serialized: Optional[dict], messages: list, *, run_id: UUID, metadata: Optional[dict] = None, **kwargs) -> None:
+        invocation_params = kwargs.get("invocation_params") or {}
+        model = (metadata or {}).get("ls_model_name") or invocation_params.get("model") or invocation_params.get("model_name") or "unknown"
+        with self._lock:
+            self._models[run_id] = (model, (metadata or {}).get("example_id"))
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs) -> None:
+        reported = token_usage(response) or {}
+        with self._lock:
+            model, example_id = self._models.pop(run_id, ("unknown", None))
+            usage = self.usage[model]
+            usage["calls"] += 1
+            for key in TOKEN_KEYS:
+                usage[key] += reported.get(key, 0)
+            if example_id is not None and reported:
+                example_usage = self._example_usage.setdefault(example_id, {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0})
+                for key in example_usage:
+                    example_usage[key] += reported[key]
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs) -> None:
+        with self._lock:
+            self._models.pop(run_id, None)
+
+    def pop_example_usage(self, example_id) -> Optional[dict]:
+        """Input, output and total tokens of one example's model calls so far, forgetting them."""
+        with self._lock:
+            return self._example_usage.pop(str(example_id), None)
+
+    def cost_usd(self) -> float:
+        total = 0.0
+        with self._lock:
+            for model, usage in self.usage.items():
+                price = self._price(model)
+                if price is None:
+                    continue
+                input_price, cached_price, output_price = price
+                # Reported input tokens include the cached ones
+                uncached = usage["input_tokens"] - usage["cached_tokens"]
+                total += (uncached * input_price + usage["cached_tokens"] * cached_price + usage["output_tokens"] * output_price) / 1e6
+        return total
+
+    @property
+    def exceeded(self) -> bool:
+        return self.budget_usd is not None and self.cost_usd() >= self.budget_usd
+
+    def check_budget(self) -> None:
+        if self.exceeded:
+            raise BudgetExceeded(f"Budget of ${self.budget_usd:.2f} reached (${self.cost_usd():.2f} spent)")
+
+    def cache_hit_rates(self) -> dict:
+        """Share of input tokens served from the provider's prompt cache, per model."""
+        with self._lock:
+            return {
+                model: round(usage["cached_tokens"] / usage["input_tokens"], 3) if usage["input_tokens"] else 0.0
+                for model, usage in self.usage.items()
+            }
+
+    def totals(self) -> dict:
+        with self._lock:
+            usage = {model: dict(counts) for model, counts in self.usage.items()}
+        input_tokens = sum(counts["input_tokens"] for counts in usage.values())
+        cached_tokens = sum(counts["cached_tokens"] for counts in usage.values())
+        return {
+            "total_cost_usd": round(self.cost_usd(), 4),
+            "input_tokens": input_tokens,
+            "output_tokens": sum(counts["output_tokens"] for counts in usage.values()),
+            "cached_tokens": cached_tokens,
+            "cached_token_rate": round(cached_tokens / input_tokens, 3) if input_tokens else 0.0,
+            "unpriced_models": sorted(model for model in usage if self._price(model) is None),
+            "usage_by_model": usage,
+        }
+
+
+def budgeted_examples(examples: Iterable[Any], meter: CostMeter, log_every: int = 5) -> Iterator[Any]:
+    """Yield examples until the meter's budget is reached, printing live totals along the way."""
+    for scheduled, example in enumerate(examples):
+        if meter.exceeded:
+            print(f"Budget of ${meter.budget_usd:.2f} reached after scheduling {scheduled} examples; not scheduling more")
+            return
+        if scheduled and scheduled % log_every == 0:
+            totals = meter.totals()
+            print(f"[cost] {scheduled} examples scheduled, ${totals['total_cost_usd']:.2f} spent, {totals['input_tokens']} input / {totals['output_tokens']} output tokens")
+        yield example
+
+
+def attach_to_experiment(client, experiment_name: str, meter: CostMeter, examples_run: int) -> dict:
+    """Merge the final cost totals into the experiment's metadata."""
+    totals = meter.totals()
+    cost_metadata = {
+        "total_cost_usd": totals["total_cost_usd"],
+        "cost_per_example_usd": round(totals["total_cost_usd"] / examples_run, 4) if examples_run else None,
+        "input_tokens": totals["input_tokens"],
+        "output_tokens": totals["output_tokens"],
+        "cached_tokens": totals["cached_tokens"],
+        "cached_token_rate": totals["cached_token_rate"],
+        "cache_hit_rate_by_model": meter.cache_hit_rates(),
+        "budget_usd": meter.budget_usd,
+    }
+    project = client.read_project(project_name=experiment_name)
+    client.update_project(project.id, metadata={**(project.metadata or {}), **cost_metadata})
+    return cost_metadata
+
+
+cost_meter = CostMeter(budget_usd=float(os.getenv("EVAL_BUDGET_USD", "0")) or None)
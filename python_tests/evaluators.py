@@ -1,13 +1,120 @@
+import asyncio
+import hashlib
+import inspect
+from concurrent.futures import ThreadPoolExecutor
 from typing import cast
 from pydantic import BaseModel, Field
 from langchain_openai import ChatOpenAI
 from langchain_anthropic import ChatAnthropic
 from open_deep_research.utils import get_today_str
-from tests.prompts import RELEVANCE_PROMPT, STRUCTURE_PROMPT, GROUNDEDNESS_PROMPT, OVERALL_QUALITY_PROMPT, CORRECTNESS_PROMPT, COMPLETENESS_PROMPT
+from tests.prompts import SHARED_REPORT_CONTEXT_PROMPT, SHARED_CONTEXT_REFERENCE, RELEVANCE_PROMPT, STRUCTURE_PROMPT, GROUNDEDNESS_PROMPT, OVERALL_QUALITY_PROMPT, CORRECTNESS_PROMPT, COMPLETENESS_PROMPT, CLAIM_EXTRACTION_PROMPT, CLAIM_VERIFICATION_PROMPT
+from tests.retrieval import BM25Index, LexicalGroundingIndex, chunk_notes
+from tests.judge_cache import judge_cache
+from tests.cost_meter import cost_meter
+from tests.rate_limits import rate_limiter
+from tests.judges import get_judge, structured_judge, prefix_cached_judge, defer_judge_call
+from tests.output_projection import resolve_output
+from tests.triage import triage_cascade
 
-eval_model = ChatOpenAI(
-    model="gpt-4.1",
-)
+eval_model = get_judge("openai", "gpt-4.1")
+
+# Maximum number of judge calls in flight per provider when grading with the async evaluators
+provider_max_concurrency = {
+    "openai": 10,
+    "anthropic": 5,
+}
+_provider_semaphores: dict[str, asyncio.Semaphore] = {}
+_provider_semaphores_loop = None
+
+def _model_provider(model) -> str:
+    if isinstance(model, ChatAnthropic):
+        return "anthropic"
+    if isinstance(model, ChatOpenAI):
+        return "openai"
+    return type(model).__name__.lower()
+
+def _provider_semaphore(provider: str) -> asyncio.Semaphore:
+    global _provider_semaphores_loop
+    loop = asyncio.get_running_loop()
+    if _provider_semaphores_loop is not loop:
+        # Semaphores are bound to the event loop they were first used on
+        _provider_semaphores.clear()
+        _provider_semaphores_loop = loop
+    if provider not in _provider_semaphores:
+        _provider_semaphores[provider] = asyncio.Semaphore(provider_max_concurrency.get(provider, 5))
+    return _provider_semaphores[provider]
+
+def _cacheable_content(text: str):
+    if isinstance(eval_model, ChatAnthropic):
+        return [{
+            "type": "text",
+            "text": text,
+            "cache_control": {"type": "ephemeral", "ttl": "1h"}
+        }]
+    return text
+
+def _prompt_cache_key(messages: list[dict]) -> str:
+    return hashlib.sha256(str(messages[0]["content"]).encode("utf-8")).hexdigest()[:32]
+
+def _judge(schema: type[BaseModel], messages: list[dict], retries: int = 1):
+    if schema in SHARED_PREFIX_SCHEMAS:
+        return prefix_cached_judge(eval_model, schema, SHARED_PREFIX_SCHEMAS, retries, prompt_cache_key=_prompt_cache_key(messages))
+    return structured_judge(eval_model, schema, retries)
+
+def _defer_judge_call(key: str, schema: type[BaseModel], messages: list[dict]):
+    if schema in SHARED_PREFIX_SCHEMAS:
+        defer_judge_call(key, eval_model, schema, messages, SHARED_PREFIX_SCHEMAS, _prompt_cache_key(messages))
+    else:
+        defer_judge_call(key, eval_model, schema, messages)
+
+def _invoke_full_judge(schema: type[BaseModel], messages: list[dict], key: str, retries: int = 1):
+    cached = judge_cache.get(key, schema)
+    if cached is not None:
+        return cached
+    _defer_judge_call(key, schema, messages)
+    result = _judge(schema, messages, retries).invoke(messages, config={"callbacks": [cost_meter, rate_limiter]})
+    judge_cache.put(key, result)
+    return result
+
+async def _ainvoke_full_judge(schema: type[BaseModel], messages: list[dict], key: str, retries: int = 1):
+    cached = judge_cache.get(key, schema)
+    if cached is not None:
+        return cached
+    _defer_judge_call(key, schema, messages)
+    async with _provider_semaphore(_model_provider(eval_model)):
+        result = await _judge(schema, messages, retries).ainvoke(messages, config={"callbacks": [cost_meter, rate_limiter]})
+    judge_cache.put(key, result)
+    return result
+
+# NOTE: With JUDGE_CASCADE=on a cheap model answers first and only unsure verdicts reach eval_model (see tests/triage.py)
+def _invoke_judge(schema: type[BaseModel], request: tuple[list[dict], str, dict], retries: int = 1):
+    messages, template, fields = request
+    key = judge_cache.key(schema, eval_model, template, fields)
+    return triage_cascade.run(schema, eval_model, request, key, lambda: _invoke_full_judge(schema, messages, key, retries))
+
+async def _ainvoke_judge(schema: type[BaseModel], request: tuple[list[dict], str, dict], retries: int = 1):
+    messages, template, fields = request
+    key = judge_cache.key(schema, eval_model, template, fields)
+    return await triage_cascade.arun(schema, eval_model, request, key, lambda: _ainvoke_full_judge(schema, messages, key, retries))
+
+# Judge requests are (messages, prompt template, exact input fields); the latter two key the judge cache
+REPORT_REVIEW_INSTRUCTION = "\n\nEvaluate whether the report meets the criteria and provide detailed justification for your evaluation."
+CORRECTNESS_ANSWER_TEMPLATE = "\n<answer>\n{answer}\n</answer>\n"
+# Recorded in experiment metadata per feedback key; scores are only comparable between experiments with the same
+# version. Version 2 moved the question and report into the shared system block and the rubric into the user
+# message; correctness version 3 also shows the judge the authority's answer, which version 2 and earlier dropped.
+JUDGE_PROMPT_VERSIONS = {
+    "research_depth_score": 2,
+    "source_quality_score": 2,
+    "analytical_rigor_score": 2,
+    "practical_value_score": 2,
+    "balance_and_objectivity_score": 2,
+    "writing_quality_score": 2,
+    "relevance_score": 2,
+    "structure_and_cohesiveness_score": 2,
+    "completeness_score": 2,
+    "correctness_score": 3,
+}
 
 def _format_input_query(inputs: dict) -> str:
     messages = inputs["messages"]
@@ -21,6 +128,15 @@ def _format_input_query(inputs: dict) -> str:
 
     return "\n\n".join([role_to_string_format_map[message["role"]].format(content=message["content"]) for message in messages])
 
+def _shared_prefix_request(query: str, final_report: str, rubric: str, rubric_template: str, fields: dict | None = None):
+    """Build a judge request that opens with the shared question and report and ends with the rubric."""
+    shared_context = SHARED_REPORT_CONTEXT_PROMPT.format(user_question=query, report=final_report)
+    messages = [
+        {"role": "system", "content": _cacheable_content(shared_context)},
+        {"role": "user", "content": rubric},
+    ]
+    return messages, SHARED_REPORT_CONTEXT_PROMPT + rubric_template, {"query": query, "final_report": final_report, **(fields or {})}
+
 
 class OverallQualityScore(BaseModel):
     """Score the overall quality of the report against specific criteria."""
@@ -31,20 +147,13 @@ class OverallQualityScore(BaseModel):
     balance_and_objectivity: int = Field(description="Integer score 1-5 showing whether the report meets the provided criteria (1 = doesn't meet at all, 5 = meets all criteria).")
     writing_quality: int = Field(description="Integer score 1-5 showing whether the report meets the provided criteria (1 = doesn't meet at all, 5 = meets all criteria).")
 
-def eval_overall_quality(inputs: dict, outputs: dict):
+def _overall_quality_request(inputs: dict, outputs: dict):
     query = _format_input_query(inputs)
     final_report = outputs["final_report"]
-    user_input_content = f"""User input: {query}\n\nReport: \n\n{final_report}\n\nEvaluate whether the report meets the criteria and provide detailed justification for your evaluation."""
-    if isinstance(eval_model, ChatAnthropic):
-        user_input_content = [{
-            "type": "text",
-            "text": user_input_content,
-            "cache_control": {"type": "ephemeral", "ttl": "1h"}
-        }]
-    eval_result = cast(OverallQualityScore, eval_model.with_structured_output(OverallQualityScore).invoke([
-        {"role": "system", "content": OVERALL_QUALITY_PROMPT.format(today=get_today_str())},
-        {"role": "user", "content": user_input_content}
-    ]))
+    rubric = OVERALL_QUALITY_PROMPT.format(today=get_today_str()) + REPORT_REVIEW_INSTRUCTION
+    return _shared_prefix_request(query, final_report, rubric, OVERALL_QUALITY_PROMPT + REPORT_REVIEW_INSTRUCTION)
+
+def _overall_quality_feedback(eval_result: OverallQualityScore) -> list[dict]:
     return [
         {"key": "research_depth_score", "score": eval_result.research_depth / 5},
         {"key": "source_quality_score", "score": eval_result.source_quality / 5},
@@ -54,27 +163,32 @@ def eval_overall_quality(inputs: dict, outputs: dict):
         {"key": "writing_quality_score", "score": eval_result.writing_quality / 5},
     ]
 
+def eval_overall_quality(inputs: dict, outputs: dict):
+    eval_result = cast(OverallQualityScore, _invoke_judge(OverallQualityScore, _overall_quality_request(inputs, outputs)))
+    return _overall_quality_feedback(eval_result)
+
+async def aeval_overall_quality(inputs: dict, outputs: dict):
+    eval_result = cast(OverallQualityScore, await _ainvoke_judge(OverallQualityScore, _overall_quality_request(inputs, outputs)))
+    return _overall_quality_feedback(eval_result)
+
 
 class RelevanceScore(BaseModel):
     """Score the report relevance against specific criteria."""
     reasoning: str = Field(description="The reason for the score, including specific examples from the report.")
     score: int = Field(description="Integer score 1-5 showing whether the report meets the provided criteria for relevance (1 = doesn't meet at all, 5 = meets all criteria).")
 
-def eval_relevance(inputs: dict, outputs: dict):
+def _relevance_request(inputs: dict, outputs: dict):
     query = _format_input_query(inputs)
     final_report = outputs["final_report"]
-    user_input_content = f"""User input: {query}\n\nReport: \n\n{final_report}\n\nEvaluate whether the report meets the criteria and provide detailed justification for your evaluation."""
-    if isinstance(eval_model, ChatAnthropic):
-        user_input_content = [{
-            "type": "text",
-            "text": user_input_content,
-            "cache_control": {"type": "ephemeral", "ttl": "1h"}
-        }]
+    rubric = RELEVANCE_PROMPT.format(today=get_today_str()) + REPORT_REVIEW_INSTRUCTION
+    return _shared_prefix_request(query, final_report, rubric, RELEVANCE_PROMPT + REPORT_REVIEW_INSTRUCTION)
+
+def eval_relevance(inputs: dict, outputs: dict):
+    eval_result = cast(RelevanceScore, _invoke_judge(RelevanceScore, _relevance_request(inputs, outputs)))
+    return {"key": "relevance_score", "score": eval_result.score / 5, "comment": eval_result.reasoning}
 
-    eval_result = cast(RelevanceScore, eval_model.with_structured_output(RelevanceScore).invoke([
-        {"role": "system", "content": RELEVANCE_PROMPT.format(today=get_today_str())},
-        {"role": "user", "content": user_input_content}
-    ]))
+async def aeval_relevance(inputs: dict, outputs: dict):
+    eval_result = cast(RelevanceScore, await _ainvoke_judge(RelevanceScore, _relevance_request(inputs, outputs)))
     return {"key": "relevance_score", "score": eval_result.score / 5, "comment": eval_result.reasoning}
 
 
@@ -83,20 +197,18 @@ class StructureScore(BaseModel):
     reasoning: str = Field(description="The reason for the score, including specific examples from the report.")
     score: int = Field(description="Integer score 1-5 showing whether the report meets the provided criteria for structure and flow (1 = doesn't meet at all, 5 = meets all criteria).")
 
-def eval_structure(inputs: dict, outputs: dict):
+def _structure_request(inputs: dict, outputs: dict):
     query = _format_input_query(inputs)
     final_report = outputs["final_report"]
-    user_input_content = STRUCTURE_PROMPT.format(user_question=query, report=final_report, today=get_today_str())
-    if isinstance(eval_model, ChatAnthropic):
-        user_input_content = [{
-            "type": "text",
-            "text": user_input_content,
-            "cache_control": {"type": "ephemeral", "ttl": "1h"}
-        }]
+    rubric = STRUCTURE_PROMPT.format(user_question=SHARED_CONTEXT_REFERENCE, report=SHARED_CONTEXT_REFERENCE, today=get_today_str())
+    return _shared_prefix_request(query, final_report, rubric, STRUCTURE_PROMPT)
 
-    eval_result = cast(StructureScore, eval_model.with_structured_output(StructureScore).invoke([
-        {"role": "user", "content": user_input_content}
-    ]))
+def eval_structure(inputs: dict, outputs: dict):
+    eval_result = cast(StructureScore, _invoke_judge(StructureScore, _structure_request(inputs, outputs)))
+    return {"key": "structure_and_cohesiveness_score", "score": eval_result.score / 5, "comment": eval_result.reasoning}
+
+async def aeval_structure(inputs: dict, outputs: dict):
+    eval_result = cast(StructureScore, await _ainvoke_judge(StructureScore, _structure_request(inputs, outputs)))
     return {"key": "structure_and_cohesiveness_score", "score": eval_result.score / 5, "comment": eval_result.reasoning}
 
 
@@ -105,21 +217,20 @@ class CorrectnessScore(BaseModel):
     reasoning: str = Field(description="The reason for the score, including specific examples from the report.")
     score: int = Field(description="Integer score 1-5 showing whether the report meets the provided criteria for correctness (1 = doesn't meet at all, 5 = meets all criteria).")
 
-def eval_correctness(inputs: dict, outputs: dict, reference_outputs: dict):
+def _correctness_request(inputs: dict, outputs: dict, reference_outputs: dict):
     query = _format_input_query(inputs)
     final_report = outputs["final_report"]
     answer = reference_outputs["answer"]
-    user_input_content = CORRECTNESS_PROMPT.format(user_question=query, report=final_report, answer=answer, today=get_today_str())
-    if isinstance(eval_model, ChatAnthropic):
-        user_input_content = [{
-            "type": "text",
-            "text": user_input_content,
-            "cache_control": {"type": "ephemeral", "ttl": "1h"}
-        }]
+    # CORRECTNESS_PROMPT has no placeholders, so the authority's answer is appended after the rubric
+    rubric = CORRECTNESS_PROMPT + CORRECTNESS_ANSWER_TEMPLATE.format(answer=answer)
+    return _shared_prefix_request(query, final_report, rubric, CORRECTNESS_PROMPT + CORRECTNESS_ANSWER_TEMPLATE, {"answer": answer})
+
+def eval_correctness(inputs: dict, outputs: dict, reference_outputs: dict):
+    eval_result = cast(CorrectnessScore, _invoke_judge(CorrectnessScore, _correctness_request(inputs, outputs, reference_outputs)))
+    return {"key": "correctness_score", "score": eval_result.score / 5, "comment": eval_result.reasoning}
 
-    eval_result = cast(CorrectnessScore, eval_model.with_structured_output(CorrectnessScore).invoke([
-        {"role": "user", "content": user_input_content}
-    ]))
+async def aeval_correctness(inputs: dict, outputs: dict, reference_outputs: dict):
+    eval_result = cast(CorrectnessScore, await _ainvoke_judge(CorrectnessScore, _correctness_request(inputs, outputs, reference_outputs)))
     return {"key": "correctness_score", "score": eval_result.score / 5, "comment": eval_result.reasoning}
 
 class GroundednessClaim(BaseModel):
@@ -131,44 +242,193 @@ class GroundednessScore(BaseModel):
     """Extract the claims and whether they are grounded in the context"""
     claims: list[GroundednessClaim] = Field(description="All claims extracted from the report, and whether or not they are grounded in the context.")
 
-def eval_groundedness(inputs: dict, outputs: dict):
+def _groundedness_request(inputs: dict, outputs: dict):
     final_report = outputs["final_report"]
-    context = str(outputs["raw_notes"])
-
+    context = str(resolve_output(outputs, "raw_notes"))
     user_input_content = GROUNDEDNESS_PROMPT.format(context=context, report=final_report, today=get_today_str())
-    if isinstance(eval_model, ChatAnthropic):
-        user_input_content = [{
-            "type": "text",
-            "text": user_input_content,
-            "cache_control": {"type": "ephemeral", "ttl": "1h"}
-        }]
+    messages = [
+        {"role": "user", "content": _cacheable_content(user_input_content)},
+    ]
+    return messages, GROUNDEDNESS_PROMPT, {"raw_notes": context, "final_report": final_report}
 
-    eval_result = cast(GroundednessScore, eval_model.with_structured_output(GroundednessScore).with_retry(stop_after_attempt=3).invoke([
-        {"role": "user", "content": user_input_content},
-    ]))
+def _groundedness_feedback(eval_result: GroundednessScore) -> dict:
     # normalize to 0-1
     grounded_claims = [claim for claim in eval_result.claims if claim.grounded]
     return {"key": "groundedness_score", "score": len(grounded_claims) / len(eval_result.claims), "comment": str(eval_result.claims)}
 
+def eval_groundedness(inputs: dict, outputs: dict):
+    eval_result = cast(GroundednessScore, _invoke_judge(GroundednessScore, _groundedness_request(inputs, outputs), retries=3))
+    return _groundedness_feedback(eval_result)
+
+async def aeval_groundedness(inputs: dict, outputs: dict):
+    eval_result = cast(GroundednessScore, await _ainvoke_judge(GroundednessScore, _groundedness_request(inputs, outputs), retries=3))
+    return _groundedness_feedback(eval_result)
+
+
+# Chunked groundedness: extract claims once, then verify each claim against its top-k retrieved note chunks
+groundedness_chunk_chars = 2000
+groundedness_top_k = 4
+# Settle claims quoted verbatim and contiguously from a single note locally, sending every other claim to the judge
+groundedness_lexical_precheck = True
+
+class ExtractedClaims(BaseModel):
+    """Extract the factual claims made in the report"""
+    claims: list[str] = Field(description="All factual claims extracted from the report, each understandable on its own.")
+
+class ClaimVerification(BaseModel):
+    """Whether a single claim is grounded in the supporting context"""
+    grounded: bool = Field(description="Whether the claim is grounded in the context.")
+
+def _claim_extraction_request(outputs: dict):
+    final_report = outputs["final_report"]
+    messages = [
+        {"role": "user", "content": _cacheable_content(CLAIM_EXTRACTION_PROMPT.format(report=final_report))},
+    ]
+    return messages, CLAIM_EXTRACTION_PROMPT, {"final_report": final_report}
+
+def _claim_verification_request(claim: str, index: BM25Index):
+    context = "\n\n---\n\n".join(index.search(claim, top_k=groundedness_top_k))
+    messages = [
+        {"role": "user", "content": CLAIM_VERIFICATION_PROMPT.format(claim=claim, context=context)},
+    ]
+    return messages, CLAIM_VERIFICATION_PROMPT, {"claim": claim, "context": context}
+
+def _split_locally_grounded(claims: list[str], raw_notes) -> tuple[list[str], set[str]]:
+    """Split claims into those the lexical pre-check settles as grounded and those that need the judge."""
+    if not groundedness_lexical_precheck:
+        return claims, set()
+    lexical_index = LexicalGroundingIndex(raw_notes)
+    settled = {claim for claim in claims if lexical_index.is_grounded(claim)}
+    return [claim for claim in claims if claim not in settled], settled
+
+def _chunked_groundedness_feedback(claims: list[str], settled: set[str], verified: dict[str, ClaimVerification]) -> list[dict]:
+    graded_claims = [GroundednessClaim(claim=claim, grounded=claim in settled or verified[claim].grounded) for claim in claims]
+    grounded_claims = [claim for claim in graded_claims if claim.grounded]
+    score = len(grounded_claims) / len(graded_claims) if graded_claims else None
+    settled_count = sum(1 for claim in claims if claim in settled)
+    return [
+        {"key": "groundedness_score", "score": score, "comment": str(graded_claims)},
+        {
+            "key": "groundedness_locally_settled",
+            "score": settled_count / len(claims) if claims else None,
+            "comment": f"{settled_count}/{len(claims)} claims settled by the lexical pre-check without a judge call",
+        },
+    ]
+
+def eval_groundedness_chunked(inputs: dict, outputs: dict):
+    extracted = cast(ExtractedClaims, _invoke_judge(ExtractedClaims, _claim_extraction_request(outputs), retries=3))
+    raw_notes = resolve_output(outputs, "raw_notes")
+    ambiguous, settled = _split_locally_grounded(extracted.claims, raw_notes)
+    index = BM25Index(chunk_notes(raw_notes, chunk_chars=groundedness_chunk_chars))
+    with ThreadPoolExecutor(max_workers=provider_max_concurrency.get(_model_provider(eval_model), 5)) as executor:
+        verifications = list(executor.map(
+            lambda claim: _invoke_judge(ClaimVerification, _claim_verification_request(claim, index), retries=3),
+            ambiguous,
+        ))
+    return _chunked_groundedness_feedback(extracted.claims, settled, dict(zip(ambiguous, verifications)))
+
+async def aeval_groundedness_chunked(inputs: dict, outputs: dict):
+    extracted = cast(ExtractedClaims, await _ainvoke_judge(ExtractedClaims, _claim_extraction_request(outputs), retries=3))
+    raw_notes = resolve_output(outputs, "raw_notes")
+    ambiguous, settled = _split_locally_grounded(extracted.claims, raw_notes)
+    index = BM25Index(chunk_notes(raw_notes, chunk_chars=groundedness_chunk_chars))
+    verifications = await asyncio.gather(*(
+        _ainvoke_judge(ClaimVerification, _claim_verification_request(claim, index), retries=3)
+        for claim in ambiguous
+    ))
+    return _chunked_groundedness_feedback(extracted.claims, settled, dict(zip(ambiguous, verifications)))
+
 
 class CompletenessScore(BaseModel):
     """Score the report completeness against specific criteria."""
     reasoning: str = Field(description="The reason for the score, including specific examples from the report.")
     score: int = Field(description="Integer score 1-5 showing whether the report meets the provided criteria for completeness (1 = doesn't meet at all, 5 = meets all criteria).")
 
-def eval_completeness(inputs: dict, outputs: dict):
+def _completeness_request(inputs: dict, outputs: dict):
     query = _format_input_query(inputs)
     final_report = outputs["final_report"]
     research_brief = outputs["research_brief"]
-    user_input_content = COMPLETENESS_PROMPT.format(user_question=query, research_brief=research_brief, report=final_report, today=get_today_str())
-    if isinstance(eval_model, ChatAnthropic):
-        user_input_content = [{
-            "type": "text",
-            "text": user_input_content,
-            "cache_control": {"type": "ephemeral", "ttl": "1h"}
-        }]
+    rubric = COMPLETENESS_PROMPT.format(user_question=SHARED_CONTEXT_REFERENCE, research_brief=research_brief, report=SHARED_CONTEXT_REFERENCE, today=get_today_str())
+    return _shared_prefix_request(query, final_report, rubric, COMPLETENESS_PROMPT, {"research_brief": research_brief})
+
+def eval_completeness(inputs: dict, outputs: dict):
+    eval_result = cast(CompletenessScore, _invoke_judge(CompletenessScore, _completeness_request(inputs, outputs)))
+    return {"key": "completeness_score", "score": eval_result.score / 5, "comment": eval_result.reasoning}
+
+async def aeval_completeness(inputs: dict, outputs: dict):
+    eval_result = cast(CompletenessScore, await _ainvoke_judge(CompletenessScore, _completeness_request(inputs, outputs)))
+    return {"key": "completeness_score", "score": eval_result.score / 5, "comment": eval_result.reasoning}
+
+
+# Report evaluators built with _shared_prefix_request all offer the judge these tools in this order,
+# since tool definitions precede the shared question and report in the provider's cached prefix
+SHARED_PREFIX_SCHEMAS = [OverallQualityScore, RelevanceScore, StructureScore, CorrectnessScore, CompletenessScore]
+
+# NOTE: "chunked" verifies each report claim against its top retrieved raw_notes chunks, "full" sends all notes in one prompt
+groundedness_mode = "chunked"
+
+def default_evaluators() -> list:
+    """Every report evaluator, with groundedness graded once, in groundedness_mode."""
+    groundedness = eval_groundedness_chunked if groundedness_mode == "chunked" else eval_groundedness
+    return [eval_overall_quality, eval_relevance, eval_structure, eval_correctness, groundedness, eval_completeness]
+
+# Async counterpart of every sync evaluator, used when grading concurrently
+ASYNC_EVALUATORS = {
+    eval_overall_quality: aeval_overall_quality,
+    eval_relevance: aeval_relevance,
+    eval_structure: aeval_structure,
+    eval_correctness: aeval_correctness,
+    eval_groundedness: aeval_groundedness,
+    eval_groundedness_chunked: aeval_groundedness_chunked,
+    eval_completeness: aeval_completeness,
+}
+
+# Target output fields each evaluator reads; the target returns only these for the selected evaluators
+EVALUATOR_OUTPUT_FIELDS = {
+    eval_overall_quality: ("final_report",),
+    eval_relevance: ("final_report",),
+    eval_structure: ("final_report",),
+    eval_correctness: ("final_report",),
+    eval_groundedness: ("final_report", "raw_notes"),
+    eval_groundedness_chunked: ("final_report", "raw_notes"),
+    eval_completeness: ("final_report", "research_brief"),
+}
+
+def output_fields_for(evaluators: list) -> set[str] | None:
+    """Union of the output fields the evaluators read, or None (keep everything) if one has not declared them."""
+    if any(evaluator not in EVALUATOR_OUTPUT_FIELDS for evaluator in evaluators):
+        return None
+    return {field for evaluator in evaluators for field in EVALUATOR_OUTPUT_FIELDS[evaluator]}
+
+async def _arun_evaluator(evaluator, inputs: dict, outputs: dict, reference_outputs: dict | None):
+    async_evaluator = ASYNC_EVALUATORS.get(evaluator, evaluator)
+    kwargs = {"inputs": inputs, "outputs": outputs}
+    if "reference_outputs" in inspect.signature(async_evaluator).parameters:
+        kwargs["reference_outputs"] = reference_outputs
+    if inspect.iscoroutinefunction(async_evaluator):
+        return await async_evaluator(**kwargs)
+    return await asyncio.to_thread(async_evaluator, **kwargs)
+
+async def agrade_example(inputs: dict, outputs: dict, reference_outputs: dict | None = None, evaluators: list | None = None) -> list[dict]:
+    """Grade one example with all evaluators (default_evaluators() if None) at the same time, returning the flattened feedback."""
+    evaluators = evaluators if evaluators is not None else default_evaluators()
+    results = await asyncio.gather(
+        *(_arun_evaluator(evaluator, inputs, outputs, reference_outputs) for evaluator in evaluators),
+        return_exceptions=True,
+    )
+    feedback = []
+    for evaluator, result in zip(evaluators, results):
+        if isinstance(result, BaseException):
+            # Keep the other evaluators' scores when a single judge call fails
+            feedback.append({"key": f"{evaluator.__name__}_error", "score": None, "comment": repr(result)})
+        elif isinstance(result, list):
+            feedback.extend(result)
+        else:
+            feedback.append(result)
+    return feedback
 
-    eval_result = cast(CompletenessScore, eval_model.with_structured_output(CompletenessScore).invoke([
-        {"role": "user", "content": user_input_content}
-    ]))
-    return {"key": "completeness_score", "score": eval_result.score / 5, "comment": eval_result.reasoning}
\ No newline at end of file
+def make_concurrent_evaluator(evaluators: list):
+    """Combine evaluators into a single LangSmith evaluator that runs them concurrently per example."""
+    async def concurrent_evaluators(inputs: dict, outputs: dict, reference_outputs: dict):
+        return {"results": await agrade_example(inputs, outputs, reference_outputs, evaluators)}
+    return concurrent_evaluators
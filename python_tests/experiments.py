@@ -0,0 +1,11 @@
+"""Read the finished outputs of existing experiments for offline comparison and re-grading."""
+
+
+def load_experiment_outputs(client, experiment_name):
+    """Map reference example id -> (inputs, outputs) for an experiment's finished root runs."""
+    results = {}
+    for run in client.list_runs(project_name=experiment_name, is_root=True, select=["inputs", "outputs", "reference_example_id"]):
+        if run.outputs is None or run.outputs.get("final_report") is None or run.reference_example_id is None:
+            continue
+        results[run.reference_example_id] = (run.inputs.get("inputs", run.inputs), run.outputs)
+    return results
@@ -2,68 +2,268 @@
 """Extract data from LangSmith and save to JSONL file with configurable dataset."""
 
 import os
+import re
 import json
+import time
+import fnmatch
 import argparse
+import contextlib
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import requests
 from langsmith import Client
 from dotenv import load_dotenv
+from tests.results_store import results_store, row_from_run
+from tests.record_archive import ArchiveWriter, archive_path_for, index_path_for
 
 load_dotenv()
 
 
-def extract_langsmith_data(project_name, model_name, dataset_name, api_key):
-    """Extract data from LangSmith and save to JSONL file."""
+# Only fetch the run fields that end up in the export or the results store
+RUN_FIELDS = ["id", "inputs", "outputs", "reference_example_id", "start_time", "end_time", "feedback_stats", "prompt_tokens", "completion_tokens", "total_tokens"]
+# Results store rows are written in transactions of this many during the scan
+STORE_BATCH_SIZE = 500
+
+
+def load_example_ids(client, dataset_id):
+    """Map reference example ids to their benchmark ids, holding only the ids rather than whole examples."""
+    return {example.id: example.metadata["id"] for example in client.list_examples(dataset_id=dataset_id)}
+
+
+def to_output_record(run, example_ids):
+    """Build the export record for a root run, or None if the run has no final report."""
+    if run.outputs is None or run.outputs.get("final_report") is None:
+        return None
+    return {
+        "id": example_ids[run.reference_example_id],
+        "prompt": run.inputs["inputs"]["messages"][0]["content"],
+        "article": run.outputs["final_report"],
+    }
+
+
+def watermark_path_for(output_file_path):
+    return f"{output_file_path}.watermark.json"
+
+
+def load_watermark(watermark_path, project_name):
+    """Return the start time from which runs still need to be fetched, or None to fetch everything."""
+    if not os.path.exists(watermark_path):
+        return None
+    with open(watermark_path, encoding='utf-8') as f:
+        watermark = json.load(f)
+    if watermark.get("project_name") != project_name:
+        return None
+    return datetime.fromisoformat(watermark["start_time"])
+
+
+def save_watermark(watermark_path, project_name, start_time, last_run_id):
+    tmp_path = f"{watermark_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"project_name": project_name, "start_time": start_time.isoformat(), "last_run_id": str(last_run_id)}, f)
+    os.replace(tmp_path, watermark_path)
+
+
+def load_exported_ids(output_file_path):
+    """Read the example ids already exported, dropping a partially written last line left by a crash."""
+    exported_ids = set()
+    if not os.path.exists(output_file_path):
+        return exported_ids
+    complete_bytes = 0
+    with open(output_file_path, 'rb') as f:
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            complete_bytes += len(line)
+            try:
+                exported_ids.add(json.loads(line)["id"])
+            except (ValueError, KeyError):
+                continue
+    if complete_bytes < os.path.getsize(output_file_path):
+        with open(output_file_path, 'r+b') as f:
+            f.truncate(complete_bytes)
+    return exported_ids
+
+
+def export_project(client, project_name, output_file_path, example_ids, flush_every=50, incremental=False, store=None, output_format="jsonl"):
+    """Stream one project's finished root runs to a JSONL file, a compressed indexed archive, or both.
+
+    In incremental mode only runs started since the stored watermark are fetched, and new
+    records are appended to the existing outputs, de-duplicated by example id. The watermark is
+    only advanced once a pass completes, so an interrupted pass is simply resumed by the next one.
+    Every finished run read is also upserted into store, when given.
+    """
+    watermark_path = watermark_path_for(output_file_path)
+    os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
+    write_jsonl = output_format in ("jsonl", "both")
+    write_archive = output_format in ("indexed", "both")
+    outputs_exist = (not write_jsonl or os.path.exists(output_file_path)) and (not write_archive or os.path.exists(index_path_for(archive_path_for(output_file_path))))
+    # An output that does not exist yet needs every run, not only those since the watermark
+    watermark = load_watermark(watermark_path, project_name) if incremental and outputs_exist else None
+    archive = ArchiveWriter(archive_path_for(output_file_path), append=incremental) if write_archive else None
+    # Tracked per output and compared as strings, the archive index's key type, so each output
+    # gets exactly the records it is missing, even when the other output already has them
+    jsonl_ids = {str(record_id) for record_id in load_exported_ids(output_file_path)} if incremental and write_jsonl else set()
+    archive_ids = archive.ids() if archive is not None else set()
+    if watermark is not None:
+        print(f"[{project_name}] Fetching runs started since {watermark.isoformat()} ({len(jsonl_ids | archive_ids)} records already exported)")
+
+    newest_run = None
+    oldest_pending_start = None
+    runs_read = 0
+    total_records = 0
+    store_rows = []
+    with (open(output_file_path, 'a' if incremental else 'w', encoding='utf-8') if write_jsonl else contextlib.nullcontext()) as f, (archive or contextlib.nullcontext()):
+        start_offset = f.tell() if f else 0
+        for run in client.list_runs(project_name=project_name, is_root=True, select=RUN_FIELDS, start_time=watermark):
+            runs_read += 1
+            item = to_output_record(run, example_ids)
+            if item is None:
+                # Runs still in progress must be fetched again by the next incremental pass
+                if run.end_time is None and (oldest_pending_start is None or run.start_time < oldest_pending_start):
+                    oldest_pending_start = run.start_time
+                continue
+            if newest_run is None or run.start_time > newest_run.start_time:
+                newest_run = run
+            if store is not None:
+                store_rows.append(row_from_run(run, item["prompt"]))
+                if len(store_rows) >= STORE_BATCH_SIZE:
+                    store.record_results(project_name, store_rows)
+                    store_rows = []
+            record_id = str(item["id"])
+            written = False
+            if f and record_id not in jsonl_ids:
+                jsonl_ids.add(record_id)
+                f.write(json.dumps(item, ensure_ascii=False) + '\n')
+                written = True
+            if archive is not None and record_id not in archive_ids:
+                archive_ids.add(record_id)
+                archive.write(item)
+                written = True
+            if not written:
+                continue
+            total_records += 1
+            if total_records % flush_every == 0:
+                if f:
+                    f.flush()
+                if archive is not None:
+                    archive.flush()
+        bytes_written = (f.tell() - start_offset if f else 0) + (archive.bytes_written if archive is not None else 0)
+
+    if store_rows:
+        store.record_results(project_name, store_rows)
+    if newest_run is not None:
+        next_start = newest_run.start_time if oldest_pending_start is None else min(oldest_pending_start, newest_run.start_time)
+        save_watermark(watermark_path, project_name, next_start, newest_run.id)
+    return {"records": total_records, "runs": runs_read, "bytes": bytes_written}
+
+
+def extract_langsmith_data(project_name, model_name, dataset_name, api_key, flush_every=50, incremental=False, api_url=None, store=results_store, output_format="jsonl"):
+    """Extract data from LangSmith and stream it to a JSONL file."""
     print(f"Extracting data from LangSmith project: {project_name}")
     print(f"Using dataset: {dataset_name}")
     
-    client = Client(api_key=api_key)
+    client = Client(api_key=api_key, api_url=api_url)
     
     # Read project to get reference dataset id
     project_data = client.read_project(project_name=project_name)
+    example_ids = load_example_ids(client, project_data.reference_dataset_id)
+    if store is not None:
+        store.record_experiment(project_name, project_data.metadata, dataset_name)
     
-    # Read reference dataset to get examples
-    examples_gen = client.list_examples(dataset_id=project_data.reference_dataset_id)
-    examples = []
-    for example in examples_gen:
-        examples.append(example)
-    examples_dict = {example.id: example for example in examples}
-    
-    # Read project runs to get runs inputs and outputs and reference_example_ids
-    output_runs = client.list_runs(
-        project_name=project_name,
-        is_root=True
-    )
-    
-    runs = []
-    for run in output_runs:
-        if run.outputs is not None and run.outputs.get("final_report") is not None:
-            runs.append(run)
-    
-    output_jsonl = [
-        {
-            "id": examples_dict[run.reference_example_id].metadata["id"],
-            "prompt": run.inputs["inputs"]["messages"][0]["content"],
-            "article": run.outputs["final_report"],
-        } for run in runs
-    ]
-    
-    # Write output_jsonl to JSONL file in tests/expt_results directory
+    # Write each record to the JSONL file in tests/expt_results as soon as its run is read
     output_file_path = f"tests/expt_results/{dataset_name}_{model_name}.jsonl"
-    os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
-    with open(output_file_path, 'w', encoding='utf-8') as f:
-        for item in output_jsonl:
-            f.write(json.dumps(item, ensure_ascii=False) + '\n')
+    stats = export_project(client, project_name, output_file_path, example_ids, flush_every=flush_every, incremental=incremental, store=store, output_format=output_format)
     
-    print(f"Data written to {output_file_path}")
-    print(f"Total records: {len(output_jsonl)}")
+    print(f"Data written to {_written_paths(output_file_path, output_format)}")
+    print(f"{'New records' if incremental else 'Total records'}: {stats['records']}")
     return output_file_path
 
 
+class ExampleIdCache:
+    """Load each reference dataset's example ids once, however many projects share it."""
+
+    def __init__(self, client):
+        self.client = client
+        self._example_ids = {}
+        self._locks = defaultdict(threading.Lock)
+        self._guard = threading.Lock()
+
+    def get(self, dataset_id):
+        with self._guard:
+            lock = self._locks[dataset_id]
+        with lock:
+            if dataset_id not in self._example_ids:
+                self._example_ids[dataset_id] = load_example_ids(self.client, dataset_id)
+            return self._example_ids[dataset_id]
+
+
+def _written_paths(output_file_path, output_format):
+    paths = [output_file_path] if output_format in ("jsonl", "both") else []
+    if output_format in ("indexed", "both"):
+        paths.append(archive_path_for(output_file_path))
+    return " and ".join(paths)
+
+
+def _output_name(project_name):
+    return re.sub(r"[^A-Za-z0-9._-]+", "-", project_name).strip("-")
+
+
+def bulk_extract_langsmith_data(project_names, dataset_name, api_key, project_glob=None, max_workers=4, incremental=False, api_url=None, store=results_store, output_format="jsonl"):
+    """Export many projects concurrently, one JSONL file per project, over a shared connection pool."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    client = Client(api_key=api_key, api_url=api_url, session=session)
+
+    project_names = list(project_names or [])
+    if project_glob:
+        project_names += [project.name for project in client.list_projects() if fnmatch.fnmatch(project.name, project_glob)]
+    project_names = list(dict.fromkeys(project_names))
+    if not project_names:
+        raise ValueError("No projects to export; pass --project-name or a --project-glob that matches existing projects")
+
+    example_id_cache = ExampleIdCache(client)
+
+    def export(project_name):
+        project_data = client.read_project(project_name=project_name)
+        example_ids = example_id_cache.get(project_data.reference_dataset_id)
+        if store is not None:
+            store.record_experiment(project_name, project_data.metadata, dataset_name)
+        output_file_path = f"tests/expt_results/{dataset_name}_{_output_name(project_name)}.jsonl"
+        stats = export_project(client, project_name, output_file_path, example_ids, incremental=incremental, store=store, output_format=output_format)
+        print(f"[{project_name}] {stats['records']} records written to {_written_paths(output_file_path, output_format)}")
+        return output_file_path, stats
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = dict(zip(project_names, executor.map(export, project_names)))
+    elapsed = time.perf_counter() - started
+
+    runs = sum(stats["runs"] for _, stats in results.values())
+    megabytes = sum(stats["bytes"] for _, stats in results.values()) / 1024 ** 2
+    records = sum(stats["records"] for _, stats in results.values())
+    print(
+        f"Exported {len(results)} projects, {records} records in {elapsed:.1f}s "
+        f"({runs / elapsed:.1f} runs/sec, {megabytes / elapsed:.2f} MB/sec)"
+    )
+    return {project_name: output_file_path for project_name, (output_file_path, _) in results.items()}
+
+
 def main():
     parser = argparse.ArgumentParser(description='Extract data from LangSmith project')
-    parser.add_argument('--project-name', required=True, help='LangSmith project name')
-    parser.add_argument('--model-name', required=True, help='Model name for output filename')
+    parser.add_argument('--project-name', action='append', help='LangSmith project name (repeat to export several projects concurrently)')
+    parser.add_argument('--project-glob', help='Also export every project whose name matches this glob')
+    parser.add_argument('--model-name', help='Model name for output filename (single project only; bulk exports are named after each project)')
     parser.add_argument('--dataset-name', required=True, help='Dataset name for output filename')
     parser.add_argument('--api-key', help='LangSmith API key (defaults to LANGSMITH_API_KEY env var)')
+    parser.add_argument('--api-url', help='LangSmith API URL (defaults to LANGSMITH_ENDPOINT env var)')
+    parser.add_argument('--incremental', action='store_true', help='Only fetch runs newer than the stored watermark and append them to the existing output')
+    parser.add_argument('--workers', type=int, default=4, help='Number of projects exported concurrently in bulk mode')
+    parser.add_argument('--no-store', action='store_true', help='Do not record the runs in the local results store')
+    parser.add_argument('--format', choices=['jsonl', 'indexed', 'both'], default='jsonl', help='Plain JSONL, a compressed archive indexed by example id (see tests/record_archive.py), or both')
     
     args = parser.parse_args()
     
@@ -71,13 +271,33 @@ def main():
     if not api_key:
         raise ValueError("API key must be provided via --api-key or LANGSMITH_API_KEY environment variable")
     
+    if args.project_glob or len(args.project_name or []) > 1:
+        bulk_extract_langsmith_data(
+            project_names=args.project_name,
+            dataset_name=args.dataset_name,
+            api_key=api_key,
+            project_glob=args.project_glob,
+            max_workers=args.workers,
+            incremental=args.incremental,
+            api_url=args.api_url,
+            store=None if args.no_store else results_store,
+            output_format=args.format,
+        )
+        return
+
+    if not args.project_name or not args.model_name:
+        parser.error("--project-name and --model-name are required when exporting a single project")
     extract_langsmith_data(
-        project_name=args.project_name,
+        project_name=args.project_name[0],
         model_name=args.model_name,
         dataset_name=args.dataset_name,
-        api_key=api_key
+        api_key=api_key,
+        incremental=args.incremental,
+        api_url=args.api_url,
+        store=None if args.no_store else results_store,
+        output_format=args.format,
     )
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,154 @@
+"""On-disk, content-addressed cache for LLM-judge results.
+
+Judge results are keyed by a hash of the prompt template, the judge model and its
+settings, the output schema, and the exact input text that was graded. Re-running a
+bench only pays for the reports that changed since the last run.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+from pydantic import BaseModel
+from tests.sqlite_db import connect
+
+DEFAULT_CACHE_PATH = os.getenv("JUDGE_CACHE_PATH", "tests/.cache/judge_cache.sqlite")
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+DEFAULT_MAX_AGE_DAYS = 90
+# Run eviction every N writes instead of on every write
+EVICT_EVERY = 100
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS judge_results ("
+    "key TEXT PRIMARY KEY, schema TEXT NOT NULL, result TEXT NOT NULL, "
+    "size INTEGER NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS judge_results_accessed_at ON judge_results (accessed_at)",
+]
+
+
+def model_fingerprint(model) -> dict:
+    """Identify a chat model by its type and the settings that affect its output."""
+    return {
+        "type": getattr(model, "_llm_type", type(model).__name__),
+        "params": getattr(model, "_identifying_params", {}),
+    }
+
+
+class JudgeCache:
+    """SQLite-backed cache of structured judge outputs with size and age based eviction."""
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_age_days: float = DEFAULT_MAX_AGE_DAYS,
+        enabled: bool = os.getenv("JUDGE_CACHE", "on").lower() not in ("0", "off", "false"),
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_days * 24 * 3600
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = connect(self.path, SCHEMA)
+        return self._conn
+
+    def key(self, schema: type[BaseModel], model, template: str, fields: dict) -> str:
+        """Hash everything that determines a judge result into a cache key."""
+        payload = json.dumps(
+            {
+                "schema": schema.__name__,
+                "json_schema": schema.model_json_schema(),
+                "model": model_fingerprint(model),
+                "template": template,
+                "fields": fields,
+            },
+            sort_keys=True,
+            default=str,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, schema: type[BaseModel]) -> Optional[BaseModel]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT result, created_at FROM judge_results WHERE key = ?", (key,)
+            ).fetchone()
+            now = time.time()
+            if row is None or now - row[1] > self.max_age_seconds:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE judge_results SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return schema.model_validate_json(row[0])
+
+    def contains(self, key: str) -> bool:
+        """Whether get(key) would hit, without counting a lookup or refreshing the entry's access time."""
+        if not self.enabled:
+            return False
+        with self._lock:
+            row = self._connection().execute("SELECT created_at FROM judge_results WHERE key = ?", (key,)).fetchone()
+        return row is not None and time.time() - row[0] <= self.max_age_seconds
+
+    def put(self, key: str, result: BaseModel) -> None:
+        if not self.enabled:
+            return
+        data = result.model_dump_json()
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO judge_results (key, schema, result, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, type(result).__name__, data, len(data), now, now),
+            )
+            self._writes += 1
+            if self._writes % EVICT_EVERY == 0:
+                self._evict(conn)
+
+    def evict(self) -> None:
+        """Drop expired entries, then the least recently used ones until under the size cap."""
+        with self._lock:
+            self._evict(self._connection())
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        conn.execute("DELETE FROM judge_results WHERE created_at < ?", (time.time() - self.max_age_seconds,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM judge_results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        freed = 0
+        stale_keys = []
+        for key, size in conn.execute("SELECT key, size FROM judge_results ORDER BY accessed_at"):
+            stale_keys.append((key,))
+            freed += size
+            if total - freed <= self.max_bytes:
+                break
+        conn.executemany("DELETE FROM judge_results WHERE key = ?", stale_keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection().execute("DELETE FROM judge_results")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "enabled": self.enabled,
+        }
+
+
+judge_cache = JudgeCache()
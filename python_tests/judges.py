@@ -0,0 +1,128 @@
+"""Shared registry of judge chat models.
+
+One client is built per (provider, model, settings) and reused by every evaluator, so judge
+calls share HTTP keep-alive connections instead of paying client construction, TLS handshakes
+and structured-output binding on every call. Returned models support both invoke and ainvoke.
+"""
+
+import importlib.util
+import json
+import threading
+from typing import Optional
+import httpx
+from pydantic import BaseModel
+from langchain_core.output_parsers.openai_tools import PydanticToolsParser
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from langchain_openai import ChatOpenAI
+from langchain_anthropic import ChatAnthropic
+
+# Connection pool shared by all OpenAI judges; HTTP/2 multiplexes concurrent calls when h2 is installed
+HTTP2 = importlib.util.find_spec("h2") is not None
+POOL_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50, keepalive_expiry=120)
+JUDGE_TIMEOUT = httpx.Timeout(600.0, connect=10.0)
+
+_lock = threading.Lock()
+_judges: dict[tuple, object] = {}
+_structured: dict[tuple, object] = {}
+_http_clients: dict[str, object] = {}
+_tool_specs: dict[tuple, list[dict]] = {}
+_deferred_calls: Optional[dict] = None
+
+
+def _shared_http_client(kind: str):
+    with _lock:
+        if kind not in _http_clients:
+            client_class = httpx.AsyncClient if kind == "async" else httpx.Client
+            _http_clients[kind] = client_class(http2=HTTP2, limits=POOL_LIMITS, timeout=JUDGE_TIMEOUT)
+        return _http_clients[kind]
+
+
+def _build_judge(provider: str, model: str, settings: dict):
+    if provider == "openai":
+        return ChatOpenAI(
+            model=model,
+            http_client=_shared_http_client("sync"),
+            http_async_client=_shared_http_client("async"),
+            **settings,
+        )
+    if provider == "anthropic":
+        # langchain_anthropic keeps its own pooled httpx clients per base URL; reusing the instance keeps them warm
+        return ChatAnthropic(model=model, **settings)
+    raise ValueError(f"Unsupported judge provider: {provider}")
+
+
+def get_judge(provider: str, model: str, **settings):
+    """Return the shared judge for (provider, model, settings), building it on first use."""
+    key = (provider, model, json.dumps(settings, sort_keys=True, default=str))
+    judge = _judges.get(key)
+    if judge is None:
+        built = _build_judge(provider, model, settings)
+        with _lock:
+            judge = _judges.setdefault(key, built)
+    return judge
+
+
+def structured_judge(judge, schema: type[BaseModel], retries: int = 1):
+    """Return the judge bound to a structured output schema, reusing the binding across calls."""
+    key = (id(judge), schema, retries)
+    entry = _structured.get(key)
+    if entry is None:
+        runnable = judge.with_structured_output(schema)
+        if retries > 1:
+            runnable = runnable.with_retry(stop_after_attempt=retries)
+        with _lock:
+            # Keep the judge alive alongside its binding so its id cannot be reused
+            entry = _structured.setdefault(key, (judge, runnable))
+    return entry[1]
+
+
+def prefix_cached_judge(judge, schema: type[BaseModel], tool_schemas: list[type[BaseModel]], retries: int = 1, prompt_cache_key: str | None = None):
+    """Return the judge forced to answer with schema while offering every schema in tool_schemas.
+
+    Tool definitions sit at the very start of the provider's cached prompt prefix, so judge calls
+    that should share a cached prefix must offer identical tools and differ only in tool_choice.
+    For OpenAI, prompt_cache_key routes calls sharing a prefix to the same cache.
+    """
+    key = tuple(tool_schemas)
+    tools = _tool_specs.get(key)
+    if tools is None:
+        with _lock:
+            tools = _tool_specs.setdefault(key, [convert_to_openai_tool(tool_schema) for tool_schema in tool_schemas])
+    request_kwargs = {}
+    if isinstance(judge, ChatOpenAI):
+        request_kwargs["parallel_tool_calls"] = False
+        if prompt_cache_key:
+            request_kwargs["prompt_cache_key"] = prompt_cache_key
+    runnable = judge.bind_tools(tools, tool_choice=schema.__name__, **request_kwargs) | PydanticToolsParser(tools=[schema], first_tool_only=True)
+    if retries > 1:
+        runnable = runnable.with_retry(stop_after_attempt=retries)
+    return runnable
+
+
+class JudgeCallDeferred(Exception):
+    """Raised in place of a judge call while judge calls are being deferred (see batch_grading.py)."""
+
+
+def defer_judge_calls(calls: Optional[dict]) -> None:
+    """Record judge calls in calls, keyed by judge cache key, instead of making them; None turns deferral off."""
+    global _deferred_calls
+    _deferred_calls = calls
+
+
+def judge_calls_deferred() -> bool:
+    return _deferred_calls is not None
+
+
+def defer_judge_call(key: str, judge, schema: type[BaseModel], messages: list[dict], tool_schemas: Optional[list] = None, prompt_cache_key: Optional[str] = None) -> None:
+    """Call on a judge cache miss: while deferral is on, record the call and raise JudgeCallDeferred."""
+    if _deferred_calls is None:
+        return
+    with _lock:
+        _deferred_calls[key] = {
+            "judge": judge,
+            "schema": schema,
+            "messages": messages,
+            "tool_schemas": tool_schemas or [schema],
+            "prompt_cache_key": prompt_cache_key,
+        }
+    raise JudgeCallDeferred(key)
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""Local stand-in for the LangSmith read endpoints used by extract_langsmith_data.py.
+
+Serves synthetic projects, datasets, examples and finished root runs, so a bulk export can be
+run end to end without an account (use --api-url http://127.0.0.1:8766). Every run query is held
+for --latency seconds, and /stand-in/stats reports how many run queries overlapped and how many
+times each dataset's examples were listed from the start.
+
+    python tests/langsmith_standin_server.py --projects 8 --datasets 2
+    python tests/extract_langsmith_data.py --project-glob 'stand-in-*' --dataset-name stand_in --api-key stand-in --api-url http://127.0.0.1:8766
+"""
+
+import argparse
+import json
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Fixed so ids are the same every time the server starts
+STANDIN_NAMESPACE = uuid.UUID("0b9e6f1c-53d2-4a8e-b7c4-2f6a91d0e5c8")
+TENANT_ID = str(uuid.uuid5(STANDIN_NAMESPACE, "tenant"))
+PAGE_SIZE = 100
+STARTED = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+class StandInLangSmith:
+    def __init__(self, projects: int, datasets: int, examples: int, latency: float):
+        self.latency = latency
+        self.datasets = {str(uuid.uuid5(STANDIN_NAMESPACE, f"dataset-{d}")): [
+            {"id": str(uuid.uuid5(STANDIN_NAMESPACE, f"dataset-{d}-example-{e}")), "metadata": {"id": d * examples + e}}
+            for e in range(examples)
+        ] for d in range(datasets)}
+        dataset_ids = list(self.datasets)
+        self.projects = []
+        self.runs: dict[str, list[dict]] = {}
+        for p in range(projects):
+            project_id = str(uuid.uuid5(STANDIN_NAMESPACE, f"project-{p}"))
+            dataset_id = dataset_ids[p % len(dataset_ids)]
+            self.projects.append({
+                "id": project_id, "name": f"stand-in-{p}", "tenant_id": TENANT_ID, "start_time": STARTED.isoformat(),
+                "reference_dataset_id": dataset_id, "extra": {"metadata": {"model": f"stand-in-{p}"}},
+            })
+            self.runs[project_id] = [self._run(project_id, p, index, example) for index, example in enumerate(self.datasets[dataset_id])]
+        self.example_listings: dict[str, int] = {dataset_id: 0 for dataset_id in self.datasets}
+        self.run_queries = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _run(project_id: str, project_index: int, index: int, example: dict) -> dict:
+        run_id = str(uuid.uuid5(STANDIN_NAMESPACE, f"{project_id}-run-{index}"))
+        start = STARTED + timedelta(minutes=index)
+        return {
+            "id": run_id, "trace_id": run_id, "name": "stand-in", "run_type": "chain", "session_id": project_id,
+            "start_time": start.isoformat(), "end_time": (start + timedelta(seconds=30)).isoformat(),
+            "inputs": {"inputs": {"messages": [{"role": "user", "content": f"Question {example['metadata']['id']}"}]}},
+            "outputs": {"final_report": f"Report {example['metadata']['id']} from stand-in-{project_index}"},
+            "reference_example_id": example["id"], "feedback_stats": {"groundedness": {"n": 1, "avg": 0.5}},
+            "prompt_tokens": 100, "completion_tokens": 50, "total_tokens": 150,
+        }
+
+    def sessions(self, params: dict) -> list[dict]:
+        projects = self.projects
+        if "name" in params:
+            projects = [project for project in projects if project["name"] == params["name"][0]]
+        offset, limit = int(params.get("offset", ["0"])[0]), int(params.get("limit", [str(PAGE_SIZE)])[0])
+        return projects[offset:offset + limit]
+
+    def examples(self, params: dict) -> list[dict]:
+        dataset_id = params["dataset"][0]
+        offset, limit = int(params.get("offset", ["0"])[0]), int(params.get("limit", [str(PAGE_SIZE)])[0])
+        if offset == 0:
+            with self.lock:
+                self.example_listings[dataset_id] += 1
+        return [{**example, "dataset_id": dataset_id} for example in self.datasets[dataset_id][offset:offset + limit]]
+
+    def query_runs(self, body: dict) -> dict:
+        with self.lock:
+            self.run_queries += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.latency)
+            runs = [run for project_id in body.get("session") or [] for run in self.runs.get(project_id, [])]
+            if body.get("start_time"):
+                since = datetime.fromisoformat(body["start_time"])
+                runs = [run for run in runs if datetime.fromisoformat(run["start_time"]) >= since]
+            offset = int(body.get("cursor") or 0)
+            page = runs[offset:offset + PAGE_SIZE]
+            fields = body.get("select")
+            if fields:
+                page = [{key: value for key, value in run.items() if key in fields or key in ("name", "run_type", "trace_id")} for run in page]
+            next_cursor = str(offset + PAGE_SIZE) if offset + PAGE_SIZE < len(runs) else None
+            return {"runs": page, "cursors": {"next": next_cursor}}
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"run_queries": self.run_queries, "max_concurrent_run_queries": self.max_in_flight, "example_listings": dict(self.example_listings)}
+
+
+def make_handler(state: StandInLangSmith):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, payload, status=200):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = parse_qs(url.query)
+            parts = url.path.strip("/").split("/")
+            if parts == ["info"]:
+                return self._send({"version": "stand-in"})
+            if parts == ["sessions"]:
+                return self._send(state.sessions(params))
+            if parts[0] == "sessions" and len(parts) == 2:
+                project = next((project for project in state.projects if project["id"] == parts[1]), None)
+                return self._send(project) if project else self._send({"detail": "not found"}, status=404)
+            if parts == ["examples"]:
+                return self._send(state.examples(params))
+            if parts == ["stand-in", "stats"]:
+                return self._send(state.stats())
+            self._send({"detail": "not found"}, status=404)
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if urlparse(self.path).path.strip("/") == "runs/query":
+                return self._send(state.query_runs(body))
+            self._send({"detail": "not found"}, status=404)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(port: int = 0, projects: int = 8, datasets: int = 2, examples: int = 150, latency: float = 0.05) -> tuple[ThreadingHTTPServer, StandInLangSmith]:
+    """Start the stand-in on a background thread; port 0 picks a free port (see server.server_address)."""
+    state = StandInLangSmith(projects, datasets, examples, latency)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve stand-in LangSmith read endpoints for extract_langsmith_data.py')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--projects', type=int, default=8, help='Number of projects, named stand-in-0, stand-in-1, ...')
+    parser.add_argument('--datasets', type=int, default=2, help='Number of reference datasets the projects are spread over')
+    parser.add_argument('--examples', type=int, default=150, help='Examples per dataset, each with one finished run per project')
+    parser.add_argument('--latency', type=float, default=0.05, help='Seconds every run query is held')
+    args = parser.parse_args()
+    server, _ = serve(args.port, args.projects, args.datasets, args.examples, args.latency)
+    print(f"Stand-in LangSmith on http://127.0.0.1:{server.server_address[1]} (stats at /stand-in/stats)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
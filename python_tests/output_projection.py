@@ -0,0 +1,69 @@
+"""Keep only the target outputs the evaluators read, with large fields spilled to local disk.
+
+The target's final state carries the full message history and every raw note. project_outputs
+drops the fields no selected evaluator declared and replaces large blobs with a small reference
+to a gzip-compressed, content-addressed JSON file, so neither the in-flight examples nor the
+uploaded runs hold them. resolve_output loads a spilled field back when an evaluator needs it.
+"""
+
+import functools
+import gzip
+import hashlib
+import json
+import os
+import threading
+from typing import Iterable, Optional
+
+SPILL_DIR = os.getenv("SPILL_DIR", "tests/.cache/spill")
+# Fields that are spilled when their JSON encoding is at least SPILL_MIN_BYTES
+SPILL_FIELDS = {"raw_notes"}
+SPILL_MIN_BYTES = 16 * 1024
+SPILL_REF_KEY = "$spilled"
+
+
+def _spill_path(digest: str) -> str:
+    return os.path.join(SPILL_DIR, digest[:2], f"{digest}.json.gz")
+
+
+def spill(value, min_bytes: int = 0):
+    """Write value to its content-addressed file (once) and return the reference that replaces it.
+
+    Values whose JSON encoding is shorter than min_bytes are returned unchanged.
+    """
+    data = json.dumps(value, ensure_ascii=False, default=str).encode("utf-8")
+    if len(data) < min_bytes:
+        return value
+    digest = hashlib.sha256(data).hexdigest()
+    path = _spill_path(digest)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, "wb", compresslevel=6) as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    return {SPILL_REF_KEY: digest, "bytes": len(data)}
+
+
+def is_spilled(value) -> bool:
+    return isinstance(value, dict) and SPILL_REF_KEY in value
+
+
+@functools.lru_cache(maxsize=8)
+def _load_spilled(digest: str):
+    with gzip.open(_spill_path(digest), "rb") as f:
+        return json.loads(f.read())
+
+
+def resolve_output(outputs: dict, field: str):
+    """outputs[field], loading it from disk if it was spilled."""
+    value = outputs[field]
+    return _load_spilled(value[SPILL_REF_KEY]) if is_spilled(value) else value
+
+
+def project_outputs(state: dict, fields: Optional[Iterable[str]], spill_fields: set[str] = SPILL_FIELDS) -> dict:
+    """Project state onto fields (all of them when fields is None) and spill the large spill_fields."""
+    projected = dict(state) if fields is None else {field: state[field] for field in fields if field in state}
+    for field in spill_fields & projected.keys():
+        if not is_spilled(projected[field]):
+            projected[field] = spill(projected[field], SPILL_MIN_BYTES)
+    return projected
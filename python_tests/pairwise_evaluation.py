@@ -1,6 +1,11 @@
-from langchain_anthropic import ChatAnthropic
+import hashlib
 from langsmith.evaluation import evaluate_comparative
 from pydantic import BaseModel, Field
+from tests.judge_cache import judge_cache
+from tests.cost_meter import cost_meter
+from tests.rate_limits import rate_limiter
+from tests.judges import get_judge, structured_judge, defer_judge_call
+from tests.triage import triage_cascade
 
 HEAD_TO_HEAD_PROMPT = """
 We are testing out two different implementations of a deep research agent. This research agent is designed to conduct deep research on a given question.
@@ -27,23 +32,80 @@ Which agent was able to find better sources and better answer the question? The
 With those criteria in mind, please select which response you prefer, and explain why!
 """
 
+ANSWER_FIELDS = ("answer_a", "answer_b", "answer_c")
+# Verdict fields that hold a 1-based answer position
+POSITION_FIELDS = ("preferred_answer", "second_best_answer", "worst_answer")
+# Prefixed to the reasoning of a verdict whose positions were remapped, since the text still numbers the answers as the judge saw them
+REMAPPED_REASONING_NOTE = "[Answer numbers in this reasoning follow the order the judge saw, not the order of the scores.] "
+
+
+def _canonical_order(answers: list[str]) -> list[int]:
+    """Shown positions sorted by answer hash, so every presentation order of the same answers agrees."""
+    return sorted(range(len(answers)), key=lambda position: (hashlib.sha256(answers[position].encode("utf-8")).hexdigest(), position))
+
+
+def _remap_positions(verdict: BaseModel, mapping: list[int]) -> BaseModel:
+    """Rewrite each 1-based position p in verdict as mapping[p - 1] + 1; out-of-range values are kept.
+
+    Unless mapping is the identity, the free-text reasoning is flagged with REMAPPED_REASONING_NOTE.
+    """
+    if mapping == list(range(len(mapping))):
+        return verdict
+    updates = {}
+    for field in POSITION_FIELDS:
+        value = getattr(verdict, field, None)
+        if isinstance(value, int) and 1 <= value <= len(mapping):
+            updates[field] = mapping[value - 1] + 1
+    reasoning = getattr(verdict, "reasoning", None)
+    if isinstance(reasoning, str) and not reasoning.startswith(REMAPPED_REASONING_NOTE):
+        updates["reasoning"] = REMAPPED_REASONING_NOTE + reasoning
+    return verdict.model_copy(update=updates)
+
+
+def _cached_judge(grader_llm, schema: type[BaseModel], template: str, fields: dict):
+    answer_fields = [field for field in ANSWER_FIELDS if field in fields]
+    order = _canonical_order([str(fields[field]) for field in answer_fields])
+    # canonical position -> shown position, and shown position -> canonical position
+    to_shown = order
+    to_canonical = [order.index(position) for position in range(len(order))]
+    canonical_fields = {**fields, **{field: fields[answer_fields[position]] for field, position in zip(answer_fields, order)}}
+    # The cache holds verdicts in canonical order, so a pair judged as (A, B) is reused for (B, A)
+    key = judge_cache.key(schema, grader_llm, template, canonical_fields)
+    messages = [{"role": "user", "content": template.format(**fields)}]
+
+    def full_judge():
+        cached = judge_cache.get(key, schema)
+        if cached is not None:
+            return _remap_positions(cached, to_shown)
+        # A deferred call is answered straight into the cache, so it is asked in canonical order
+        defer_judge_call(key, grader_llm, schema, [{"role": "user", "content": template.format(**canonical_fields)}])
+        response = structured_judge(grader_llm, schema).invoke(messages, config={"callbacks": [cost_meter, rate_limiter]})
+        judge_cache.put(key, _remap_positions(response, to_canonical))
+        return response
+
+    # NOTE: With JUDGE_CASCADE=on a cheap model picks first and only unsure picks reach the thinking judge
+    return triage_cascade.run(schema, grader_llm, (messages, template, fields), key, full_judge)
+
+
 class HeadToHeadRanking(BaseModel):
     reasoning: str = Field(description="The reasoning for why you selected the preferred answer. This should be a detailed explanation!")
     preferred_answer: int = Field(description="The preferred answer between 1 and 2, where 1 is the first response, 2 is the second response.")
 
 
 def head_to_head_evaluator(inputs: dict, outputs: list[dict]) -> list:
-    grader_llm = ChatAnthropic(
-        model="claude-opus-4-20250514",
+    grader_llm = get_judge(
+        "anthropic",
+        "claude-opus-4-20250514",
         max_tokens=20000,
         thinking={"type": "enabled", "budget_tokens": 16000},
     )
 
-    response = grader_llm.with_structured_output(HeadToHeadRanking).invoke(HEAD_TO_HEAD_PROMPT.format(
-        question=inputs["messages"][0]["content"],
-        answer_a=outputs[0].get("final_report", "N/A"),
-        answer_b=outputs[1].get("final_report", "N/A"),
-    ))
+    fields = {
+        "question": inputs["messages"][0]["content"],
+        "answer_a": outputs[0].get("final_report", "N/A"),
+        "answer_b": outputs[1].get("final_report", "N/A"),
+    }
+    response = _cached_judge(grader_llm, HeadToHeadRanking, HEAD_TO_HEAD_PROMPT, fields)
 
     if response.preferred_answer == 1:
         scores = [1, 0]
@@ -90,18 +152,20 @@ class Rankings(BaseModel):
     worst_answer: int = Field(description="The worst answer between 1 and 3, where 1 is the first response, 2 is the second response, and 3 is the third response.")
 
 def free_for_all_evaluator(inputs: dict, outputs: list[dict]) -> list:
-    grader_llm = ChatAnthropic(
-        model="claude-opus-4-20250514",
+    grader_llm = get_judge(
+        "anthropic",
+        "claude-opus-4-20250514",
         max_tokens=20000,
         thinking={"type": "enabled", "budget_tokens": 16000},
     )
 
-    response = grader_llm.with_structured_output(Rankings).invoke(ALL_THREE_PROMPT.format(
-        question=inputs["messages"][0]["content"],
-        answer_a=outputs[0].get("final_report", "N/A"),
-        answer_b=outputs[1].get("final_report", "N/A"),
-        answer_c=outputs[2].get("final_report", "N/A"),
-    ))
+    fields = {
+        "question": inputs["messages"][0]["content"],
+        "answer_a": outputs[0].get("final_report", "N/A"),
+        "answer_b": outputs[1].get("final_report", "N/A"),
+        "answer_c": outputs[2].get("final_report", "N/A"),
+    }
+    response = _cached_judge(grader_llm, Rankings, ALL_THREE_PROMPT, fields)
 
     scores = [0, 0, 0]
     scores[response.preferred_answer - 1] = 1
@@ -121,8 +185,12 @@ multi_agent_workflow = "DR MAW - Tavily #-c6818a83"
 #     randomize_order=True,
 # )
 
-evaluate_comparative(
-    (single_agent, multi_agent_supervisor_v2),  # Replace with the names/IDs of your experiments
-    evaluators=[head_to_head_evaluator],
-    randomize_order=True,
-)
\ No newline at end of file
+if __name__ == "__main__":
+    evaluate_comparative(
+        (single_agent, multi_agent_supervisor_v2),  # Replace with the names/IDs of your experiments
+        evaluators=[head_to_head_evaluator],
+        randomize_order=True,
+    )
+    print(f"Judge cache: {judge_cache.stats()}")
+    print(f"Judge cost: {cost_meter.totals()}")
+    print(f"Triage cascade: {triage_cascade.summary()}")
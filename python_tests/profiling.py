@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""Per-node latency and per-model-call token profiling for the deep researcher eval target.
+
+Attach a ProfilingCallbackHandler to the graph config to append one JSONL record per graph
+node, chat model call and tool call. Run this file on a trace to print p50/p95/p99 per node.
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Optional
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from tests.cost_meter import TOKEN_KEYS, token_usage
+
+
+def _qualified_node_name(metadata: dict) -> str:
+    # Checkpoint namespaces look like "supervisor:<task id>|researcher:<task id>"
+    namespace = metadata.get("langgraph_checkpoint_ns") or metadata.get("checkpoint_ns") or ""
+    parents = [part.split(":")[0] for part in namespace.split("|") if part]
+    node = metadata["langgraph_node"]
+    if not parents or parents[-1] != node:
+        parents.append(node)
+    return "/".join(parents)
+
+
+class ProfilingCallbackHandler(BaseCallbackHandler):
+    """Append node, model and tool timings to a JSONL trace file.
+
+    The example a record belongs to is read from the "example_id" key of the run metadata,
+    which LangChain propagates from the graph config to every child run.
+    """
+
+    def __init__(self, trace_path: str):
+        self.trace_path = trace_path
+        os.makedirs(os.path.dirname(trace_path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._started: dict[UUID, tuple[float, dict]] = {}
+
+    def _start(self, run_id: UUID, record: dict) -> None:
+        with self._lock:
+            self._started[run_id] = (time.perf_counter(), record)
+
+    def _end(self, run_id: UUID, **fields) -> None:
+        with self._lock:
+            started = self._started.pop(run_id, None)
+            if started is None:
+                return
+            start_time, record = started
+            record.update(fields, duration_s=time.perf_counter() - start_time)
+            with open(self.trace_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def on_chain_start(self, serialized: Optional[dict], inputs: Any, *, run_id: UUID, metadata: Optional[dict] = None, **kwargs) -> None:
+        metadata = metadata or {}
+        # Runnables inside a node inherit its metadata; only the node's own run carries its name
+        if "langgraph_node" not in metadata or kwargs.get("name") != metadata["langgraph_node"]:
+            return
+        self._start(run_id, {"example_id": metadata.get("example_id"), "kind": "node", "name": _qualified_node_name(metadata)})
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs) -> None:
+        self._end(run_id, error=False)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs) -> None:
+        # Graph interrupts and cancellations also surface here
+        self._end(run_id, error=True)
+
+    def on_chat_model_start(self, serialized: Optional[dict], messages: list, *, run_id: UUID, metadata: Optional[dict] = None, **kwargs) -> None:
+        metadata = metadata or {}
+        self._start(run_id, {
+            "example_id": metadata.get("example_id"),
+            "kind": "model",
+            "name": metadata.get("ls_model_name") or kwargs.get("name") or "chat_model",
+            "node": _qualified_node_name(metadata) if "langgraph_node" in metadata else None,
+        })
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs) -> None:
+        usage = token_usage(response) or {}
+        self._end(run_id, error=False, **{key: usage.get(key, 0) for key in TOKEN_KEYS})
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs) -> None:
+        self._end(run_id, error=True)
+
+    def on_tool_start(self, serialized: Optional[dict], input_str: str, *, run_id: UUID, metadata: Optional[dict] = None, **kwargs) -> None:
+        metadata = metadata or {}
+        self._start(run_id, {
+            "example_id": metadata.get("example_id"),
+            "kind": "tool",
+            "name": kwargs.get("name") or (serialized or {}).get("name") or "tool",
+            "node": _qualified_node_name(metadata) if "langgraph_node" in metadata else None,
+        })
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs) -> None:
+        self._end(run_id, error=False)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs) -> None:
+        self._end(run_id, error=True)
+
+
+def _percentile(sorted_values: list[float], percentile: float) -> float:
+    # Nearest-rank percentile
+    index = max(0, min(len(sorted_values) - 1, int(round(percentile / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize_trace(trace_path: str) -> list[dict]:
+    """Aggregate a trace into latency percentiles and token totals per (kind, name)."""
+    durations = defaultdict(list)
+    tokens = defaultdict(lambda: {"input_tokens": 0, "output_tokens": 0, "cached_tokens": 0, "errors": 0})
+    examples = set()
+    with open(trace_path, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            key = (record["kind"], record["name"])
+            durations[key].append(record["duration_s"])
+            examples.add(record.get("example_id"))
+            for field in ("input_tokens", "output_tokens", "cached_tokens"):
+                tokens[key][field] += record.get(field, 0)
+            tokens[key]["errors"] += int(record.get("error", False))
+    summary = []
+    for (kind, name), values in durations.items():
+        values.sort()
+        summary.append({
+            "kind": kind,
+            "name": name,
+            "count": len(values),
+            "p50_s": _percentile(values, 50),
+            "p95_s": _percentile(values, 95),
+            "p99_s": _percentile(values, 99),
+            "total_s": sum(values),
+            "examples": len(examples),
+            **tokens[(kind, name)],
+        })
+    return sorted(summary, key=lambda row: (row["kind"], -row["total_s"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Print per-node latency percentiles and token usage from a profiling trace')
+    parser.add_argument('trace_path', help='JSONL trace written by ProfilingCallbackHandler')
+    args = parser.parse_args()
+
+    summary = summarize_trace(args.trace_path)
+    print(f"{'kind':<6} {'name':<45} {'count':>6} {'p50_s':>8} {'p95_s':>8} {'p99_s':>8} {'total_s':>9} {'in_tok':>10} {'out_tok':>9} {'errors':>6}")
+    for row in summary:
+        print(
+            f"{row['kind']:<6} {row['name']:<45} {row['count']:>6} {row['p50_s']:>8.2f} {row['p95_s']:>8.2f} "
+            f"{row['p99_s']:>8.2f} {row['total_s']:>9.1f} {row['input_tokens']:>10} {row['output_tokens']:>9} {row['errors']:>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
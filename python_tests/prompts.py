@@ -92,6 +92,23 @@ Now, please evaluate the research report.
 """
 
 
+# Shared prefix for the report evaluators: the same question and report open every judge call, so the
+# provider can serve them from its prompt cache, and each evaluator's rubric follows as the variable suffix
+SHARED_REPORT_CONTEXT_PROMPT = """You will evaluate the research report below, which a research agent wrote in response to the user's question. The evaluation criteria follow after the report.
+
+<user_question>
+{user_question}
+</user_question>
+
+<report>
+{report}
+</report>
+"""
+
+# Stands in for the question and report when a rubric that embeds them is placed after the shared prefix
+SHARED_CONTEXT_REFERENCE = "(provided at the start of this conversation)"
+
+
 CORRECTNESS_PROMPT = """You are evaluating the correctness of a research report that was generated by a research agent.
 
 You will be provided with the question, the report, and the answer from an independent authority.
@@ -212,6 +229,46 @@ Use the following format for your evaluation:
 """
 
 
+CLAIM_EXTRACTION_PROMPT = """
+You are extracting the factual claims made in a research report so that each one can be checked against the research notes separately.
+
+<Instruction>
+- Identify the factual claims, statements, and assertions made in the report
+- Write each claim so that it can be understood on its own, without the rest of the report
+- Keep the numbers, names, dates and citations that the claim relies on
+- Do not include opinions, recommendations, or section headings
+</Instruction>
+
+<report>
+{report}
+</report>
+"""
+
+
+CLAIM_VERIFICATION_PROMPT = """
+You are checking whether a single claim from a research report is supported by excerpts of the context retrieved from the web.
+
+<Rubric>
+A grounded claim:
+- Is directly supported by the excerpts
+- Maintains the same meaning and intent as the source material
+
+An ungrounded claim:
+- Has no support in the excerpts
+- Contradicts or distorts the excerpts
+- Relies on speculation or external knowledge outside of basic facts (2 + 2 = 4)
+</Rubric>
+
+<claim>
+{claim}
+</claim>
+
+<context>
+{context}
+</context>
+"""
+
+
 COMPLETENESS_PROMPT = """You are evaluating the completeness of a research report. Your evaluation should focus on the following criteria:
 
 <Rubric>
@@ -0,0 +1,230 @@
+"""Adaptive, per-provider concurrency control for model calls made by the eval target and the judges.
+
+Each provider gets token buckets for requests and tokens per minute plus an AIMD concurrency
+limit: the limit grows by one slot per window of successful calls and halves on a 429 or a
+latency spike. A single RateLimitCallbackHandler is shared by the graph's model calls and the
+judge calls, so both draw from the same budget. Admission happens in on_chat_model_start, which
+LangChain awaits before sending the request. A cancelled call gives its slot back through
+on_llm_error, or after STALE_CALL_SECONDS when no callback arrives at all.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from typing import Optional
+from uuid import UUID
+from langchain_core.callbacks import AsyncCallbackHandler
+from tests.cost_meter import token_usage
+
+# Requests and tokens per minute per provider; set these to your account's tier limits
+PROVIDER_LIMITS = {
+    "openai": {"rpm": 5000, "tpm": 2_000_000, "initial_concurrency": 16, "max_concurrency": 64},
+    "anthropic": {"rpm": 2000, "tpm": 400_000, "initial_concurrency": 8, "max_concurrency": 32},
+}
+DEFAULT_LIMITS = {"rpm": 500, "tpm": 200_000, "initial_concurrency": 4, "max_concurrency": 16}
+# A call slower than this multiple of the provider's smoothed latency counts as a spike
+LATENCY_SPIKE_FACTOR = 3.0
+_POLL_SECONDS = 0.05
+# A call with no end or error callback after this long was cancelled; its slot is taken back
+STALE_CALL_SECONDS = 900
+# Queue waits kept for the percentiles in summary(); the count and maximum cover every call
+QUEUE_WAIT_SAMPLES = 10_000
+
+
+def share_limits(share_count: int) -> None:
+    """Give this process 1/share_count of every provider's rpm and tpm, for processes sharing one account."""
+    for limits in [*PROVIDER_LIMITS.values(), DEFAULT_LIMITS]:
+        limits["rpm"] /= share_count
+        limits["tpm"] /= share_count
+
+
+# NOTE: Set RATE_LIMIT_SHARE=N when N evaluation processes run against the same provider accounts
+if int(os.getenv("RATE_LIMIT_SHARE", "1")) > 1:
+    share_limits(int(os.getenv("RATE_LIMIT_SHARE")))
+
+
+class TokenBucket:
+    """Refills continuously at rate_per_minute up to one minute's worth of capacity."""
+
+    def __init__(self, rate_per_minute: float):
+        self.rate_per_second = rate_per_minute / 60
+        self.capacity = rate_per_minute
+        self.available = rate_per_minute
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self._updated) * self.rate_per_second)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount is available; 0 means it can be taken now."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.rate_per_second
+
+    def take(self, amount: float) -> None:
+        # May go negative when actual usage exceeds the estimate; later callers wait it out
+        self._refill()
+        self.available -= amount
+
+
+class ProviderController:
+    """Token buckets plus an AIMD concurrency limit for one provider."""
+
+    def __init__(self, provider: str, rpm: float, tpm: float, initial_concurrency: int, max_concurrency: int, min_concurrency: int = 1):
+        self.provider = provider
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.limit = float(initial_concurrency)
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.smoothed_latency: Optional[float] = None
+        self.queue_waits: deque[float] = deque(maxlen=QUEUE_WAIT_SAMPLES)
+        self.calls = 0
+        self.max_queue_wait = 0.0
+        self.throttled = 0
+        self.abandoned = 0
+        self.decreases = 0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def try_admit(self, estimated_tokens: int) -> float:
+        """Admit a call if a slot and bucket capacity are free, otherwise return how long to wait."""
+        with self._lock:
+            if self.in_flight >= int(self.limit):
+                return _POLL_SECONDS
+            wait = max(self.requests.wait_time(1), self.tokens.wait_time(estimated_tokens))
+            if wait > 0:
+                return wait
+            self.requests.take(1)
+            self.tokens.take(estimated_tokens)
+            self.in_flight += 1
+            return 0.0
+
+    def release(self, latency: float, estimated_tokens: int, actual_tokens: Optional[int], throttled: bool = False) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            if actual_tokens is not None:
+                self.tokens.take(actual_tokens - estimated_tokens)
+            spike = self.smoothed_latency is not None and latency > LATENCY_SPIKE_FACTOR * self.smoothed_latency
+            if throttled or spike:
+                self.throttled += int(throttled)
+                # Decrease at most once per smoothed latency window so one burst of errors halves once
+                window = self.smoothed_latency or 1.0
+                if time.monotonic() - self._last_decrease > window:
+                    self.limit = max(self.min_concurrency, self.limit / 2)
+                    self.decreases += 1
+                    self._last_decrease = time.monotonic()
+            else:
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            if not throttled:
+                self.smoothed_latency = latency if self.smoothed_latency is None else 0.9 * self.smoothed_latency + 0.1 * latency
+
+    def abandon(self) -> None:
+        """Free the slot of a call that was cancelled, without treating its latency as a signal."""
+        with self._lock:
+            self.in_flight -= 1
+            self.abandoned += 1
+
+    def record_queue_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.queue_waits.append(seconds)
+            self.calls += 1
+            self.max_queue_wait = max(self.max_queue_wait, seconds)
+
+    def summary(self) -> dict:
+        with self._lock:
+            waits = sorted(self.queue_waits)
+            calls, max_wait = self.calls, self.max_queue_wait
+        return {
+            "concurrency_limit": round(self.limit, 1),
+            "calls": calls,
+            "throttled": self.throttled,
+            "decreases": self.decreases,
+            "abandoned": self.abandoned,
+            "queue_wait_p50_s": round(waits[len(waits) // 2], 3) if waits else 0.0,
+            "queue_wait_p95_s": round(waits[int(len(waits) * 0.95)], 3) if waits else 0.0,
+            "queue_wait_max_s": round(max_wait, 3),
+        }
+
+
+def _is_throttle(error: BaseException) -> bool:
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status in (429, 529) or "RateLimit" in type(error).__name__ or "Overloaded" in type(error).__name__
+
+
+def _estimate_tokens(messages: list) -> int:
+    # Roughly four characters per token; corrected with the reported usage once the call ends
+    return sum(len(str(getattr(message, "content", message))) for batch in messages for message in batch) // 4 + 1
+
+
+class RateLimitCallbackHandler(AsyncCallbackHandler):
+    """Admits chat model calls through their provider's controller and feeds back latency and errors."""
+
+    def __init__(self, limits: Optional[dict] = None):
+        self.limits = limits if limits is not None else PROVIDER_LIMITS
+        self.controllers: dict[str, ProviderController] = {}
+        self._calls: dict[UUID, tuple[ProviderController, float, int]] = {}
+        self._lock = threading.Lock()
+
+    def controller(self, provider: str) -> ProviderController:
+        with self._lock:
+            if provider not in self.controllers:
+                self.controllers[provider] = ProviderController(provider, **self.limits.get(provider, DEFAULT_LIMITS))
+            return self.controllers[provider]
+
+    async def on_chat_model_start(self, serialized: Optional[dict], messages: list, *, run_id: UUID, metadata: Optional[dict] = None, **kwargs) -> None:
+        controller = self.controller((metadata or {}).get("ls_provider", "unknown"))
+        estimated_tokens = _estimate_tokens(messages)
+        queued = time.monotonic()
+        while (wait := controller.try_admit(estimated_tokens)) > 0:
+            self._expire_stale()
+            await asyncio.sleep(wait)
+        admitted = time.monotonic()
+        controller.record_queue_wait(admitted - queued)
+        with self._lock:
+            self._calls[run_id] = (controller, admitted, estimated_tokens)
+
+    def _finish(self, run_id: UUID, actual_tokens: Optional[int], throttled: bool) -> None:
+        with self._lock:
+            call = self._calls.pop(run_id, None)
+        if call is None:
+            return
+        controller, admitted, estimated_tokens = call
+        controller.release(time.monotonic() - admitted, estimated_tokens, actual_tokens, throttled)
+
+    def _abandon(self, run_id: UUID) -> None:
+        with self._lock:
+            call = self._calls.pop(run_id, None)
+        if call is not None:
+            call[0].abandon()
+
+    def _expire_stale(self) -> None:
+        # A cancelled call may never get on_llm_end or on_llm_error, which would hold its slot forever
+        cutoff = time.monotonic() - STALE_CALL_SECONDS
+        with self._lock:
+            stale = [run_id for run_id, (_, admitted, _) in self._calls.items() if admitted < cutoff]
+        for run_id in stale:
+            self._abandon(run_id)
+
+    async def on_llm_end(self, response, *, run_id: UUID, **kwargs) -> None:
+        usage = token_usage(response)
+        self._finish(run_id, usage["total_tokens"] if usage else None, throttled=False)
+
+    async def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs) -> None:
+        if isinstance(error, asyncio.CancelledError):
+            self._abandon(run_id)
+        else:
+            self._finish(run_id, None, throttled=_is_throttle(error))
+
+    def summary(self) -> dict:
+        return {provider: controller.summary() for provider, controller in self.controllers.items()}
+
+
+rate_limiter = RateLimitCallbackHandler()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""Compressed, indexed export archives with random access by example id.
+
+An archive is a data file of independently compressed frames, one per record, plus a sidecar
+JSON index of id -> (offset, length). Frames are zstd when the zstandard package is installed and
+zlib otherwise; the index records which. Looking up one article seeks straight to its frame,
+iteration streams frames in file order, and batches of frames are decompressed on a thread pool.
+
+    python tests/record_archive.py stats tests/expt_results/deep_research_bench_gpt-5.records.zst
+    python tests/record_archive.py get tests/expt_results/deep_research_bench_gpt-5.records.zst 17
+    python tests/record_archive.py to-jsonl tests/expt_results/deep_research_bench_gpt-5.records.zst
+"""
+
+import argparse
+import json
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DEFAULT_CODEC = "zstd" if zstandard is not None else "zlib"
+ARCHIVE_SUFFIXES = {"zstd": ".records.zst", "zlib": ".records.zz"}
+INDEX_VERSION = 1
+ZSTD_LEVEL = 10
+ZLIB_LEVEL = 9
+
+
+def archive_path_for(jsonl_path: str, codec: str = DEFAULT_CODEC) -> str:
+    base = jsonl_path[:-len(".jsonl")] if jsonl_path.endswith(".jsonl") else jsonl_path
+    return base + ARCHIVE_SUFFIXES[codec]
+
+
+def index_path_for(archive_path: str) -> str:
+    return f"{archive_path}.idx.json"
+
+
+def _compress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return zlib.compress(data, ZLIB_LEVEL)
+
+
+def _decompress(codec: str, frame: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("This archive is zstd-compressed; install the zstandard package to read it")
+        return zstandard.ZstdDecompressor().decompress(frame)
+    return zlib.decompress(frame)
+
+
+def _load_index(archive_path: str) -> Optional[dict]:
+    index_path = index_path_for(archive_path)
+    if not os.path.exists(index_path):
+        return None
+    with open(index_path, encoding="utf-8") as f:
+        index = json.load(f)
+    if index.get("version") != INDEX_VERSION:
+        raise ValueError(f"Unsupported archive index version {index.get('version')} in {index_path}")
+    return index
+
+
+class ArchiveWriter:
+    """Append records as compressed frames; the index is saved on flush() and close().
+
+    In append mode the existing index is loaded and any frames written after it was last saved
+    (by a crashed writer) are truncated away, so the data file and the index always agree.
+    """
+
+    def __init__(self, path: str, codec: Optional[str] = None, append: bool = False):
+        index = _load_index(path) if append else None
+        self.path = path
+        self.codec = index["codec"] if index else (codec or DEFAULT_CODEC)
+        if self.codec == "zstd" and zstandard is None:
+            raise RuntimeError("Writing zstd archives needs the zstandard package")
+        self.entries: dict[str, tuple[int, int]] = {str(key): (offset, length) for key, offset, length in index["entries"]} if index else {}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        end = max((offset + length for offset, length in self.entries.values()), default=0)
+        self._file = open(path, "r+b" if index and os.path.exists(path) else "wb")
+        self._file.truncate(end)
+        self._file.seek(end)
+        self.bytes_written = 0
+
+    def ids(self) -> set[str]:
+        return set(self.entries)
+
+    def write(self, record: dict) -> None:
+        frame = _compress(self.codec, json.dumps(record, ensure_ascii=False).encode("utf-8"))
+        offset = self._file.tell()
+        self._file.write(frame)
+        self.bytes_written += len(frame)
+        # A rewritten id points at its newest frame; the old frame stays in the file unreferenced
+        self.entries[str(record["id"])] = (offset, len(frame))
+
+    def flush(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        index_path = index_path_for(self.path)
+        tmp_path = f"{index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "codec": self.codec, "entries": [[key, offset, length] for key, (offset, length) in self.entries.items()]}, f)
+        os.replace(tmp_path, index_path)
+
+    def close(self) -> None:
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ArchiveReader:
+    """Random access by id, streaming iteration and parallel decompression over one archive."""
+
+    def __init__(self, path: str, workers: int = 4):
+        index = _load_index(path)
+        if index is None:
+            raise FileNotFoundError(f"No index for archive {path}")
+        self.path = path
+        self.codec = index["codec"]
+        self.workers = workers
+        self.entries: dict[str, tuple[int, int]] = {str(key): (offset, length) for key, offset, length in index["entries"]}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, record_id) -> bool:
+        return str(record_id) in self.entries
+
+    def ids(self) -> list[str]:
+        return list(self.entries)
+
+    def _read_frame(self, f, record_id) -> bytes:
+        offset, length = self.entries[str(record_id)]
+        f.seek(offset)
+        return f.read(length)
+
+    def get(self, record_id) -> dict:
+        """One record by id: a dict lookup, one seek and one frame decompressed."""
+        with open(self.path, "rb") as f:
+            return self._decode(self._read_frame(f, record_id))
+
+    def get_many(self, record_ids: Iterable) -> dict[str, dict]:
+        """Records for several ids, decompressed in parallel."""
+        record_ids = [str(record_id) for record_id in record_ids]
+        return dict(zip(record_ids, self._decode_frames(self._frames(record_ids))))
+
+    def _frames(self, record_ids: list[str]) -> Iterator[bytes]:
+        with open(self.path, "rb") as f:
+            for record_id in record_ids:
+                yield self._read_frame(f, record_id)
+
+    def _decode(self, frame: bytes) -> dict:
+        return json.loads(_decompress(self.codec, frame))
+
+    def _decode_frames(self, frames: Iterator[bytes]) -> Iterator[dict]:
+        # Frames are read sequentially and decompressed a bounded batch at a time, so memory stays flat
+        batch_size = self.workers * 8
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            batch = []
+            for frame in frames:
+                batch.append(frame)
+                if len(batch) == batch_size:
+                    yield from executor.map(self._decode, batch)
+                    batch = []
+            yield from executor.map(self._decode, batch)
+
+    def __iter__(self) -> Iterator[dict]:
+        """Every record in file order."""
+        ordered = sorted(self.entries, key=lambda record_id: self.entries[record_id][0])
+        return self._decode_frames(self._frames(ordered))
+
+    def to_jsonl(self, output_path: str) -> int:
+        tmp_path = f"{output_path}.tmp"
+        count = 0
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for record in self:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                count += 1
+        os.replace(tmp_path, output_path)
+        return count
+
+    def stats(self) -> dict:
+        compressed = sum(length for _, length in self.entries.values())
+        return {"records": len(self.entries), "codec": self.codec, "compressed_bytes": compressed, "file_bytes": os.path.getsize(self.path)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Read compressed, indexed export archives')
+    commands = parser.add_subparsers(dest='command', required=True)
+    stats = commands.add_parser('stats', help='Record count and sizes')
+    stats.add_argument('archive')
+    get = commands.add_parser('get', help='Print one record by example id')
+    get.add_argument('archive')
+    get.add_argument('id')
+    to_jsonl = commands.add_parser('to-jsonl', help='Write the records as the plain JSONL export')
+    to_jsonl.add_argument('archive')
+    to_jsonl.add_argument('--output', help='Output path (default: the archive path with .jsonl)')
+    args = parser.parse_args()
+
+    reader = ArchiveReader(args.archive)
+    if args.command == 'stats':
+        print(json.dumps(reader.stats(), indent=2))
+    elif args.command == 'get':
+        print(json.dumps(reader.get(args.id), ensure_ascii=False, indent=2))
+    else:
+        output_path = args.output or args.archive.rsplit(".records.", 1)[0] + ".jsonl"
+        print(f"{reader.to_jsonl(output_path)} records written to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
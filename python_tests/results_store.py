@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""Local SQLite store of experiment results for fast cross-experiment queries.
+
+run_evaluate.py (and so sweep.py) and extract_langsmith_data.py write one row per
+(experiment, example) with latency and token counts, plus one score row per evaluator key.
+Scores are clustered by (experiment, key, example), so aggregates, per-example diffs and
+regression checks between experiments are index range scans rather than LangSmith pulls.
+
+    python tests/results_store.py experiments
+    python tests/results_store.py aggregate --experiment "v1 #..." --key groundedness_score
+    python tests/results_store.py diff "v1 #..." "v2 #..." --key groundedness_score
+    python tests/results_store.py regressions "v1 #..." "v2 #..."
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Awaitable, Callable, Iterable, Optional
+from tests.sqlite_db import connect
+
+DEFAULT_RESULTS_PATH = os.getenv("RESULTS_STORE_PATH", "tests/expt_results/results.sqlite")
+# Questions are stored truncated, only to make diffs readable
+QUESTION_CHARS = 120
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS experiments ("
+    "experiment_name TEXT PRIMARY KEY, dataset_name TEXT, config TEXT NOT NULL, recorded_at REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS results ("
+    "experiment_name TEXT NOT NULL, example_id TEXT NOT NULL, run_id TEXT, question TEXT, "
+    "latency_s REAL, input_tokens INTEGER, output_tokens INTEGER, total_tokens INTEGER, "
+    "PRIMARY KEY (experiment_name, example_id)) WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS scores ("
+    "experiment_name TEXT NOT NULL, key TEXT NOT NULL, example_id TEXT NOT NULL, score REAL, "
+    "PRIMARY KEY (experiment_name, key, example_id)) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS scores_key ON scores (key, experiment_name)",
+]
+
+
+class ResultsStore:
+    def __init__(self, path: str = DEFAULT_RESULTS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = connect(self.path, SCHEMA)
+        return self._conn
+
+    def record_experiment(self, experiment_name: str, config: Optional[dict] = None, dataset_name: Optional[str] = None) -> None:
+        with self._lock:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO experiments (experiment_name, dataset_name, config, recorded_at) VALUES (?, ?, ?, ?)",
+                (experiment_name, dataset_name, json.dumps(config or {}, sort_keys=True, default=str), time.time()),
+            )
+
+    def record_results(self, experiment_name: str, rows: Iterable[dict]) -> int:
+        """Upsert result rows: dicts with example_id, optional run_id, question, latency_s, token counts and a scores dict."""
+        rows = list(rows)
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN")
+            try:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO results (experiment_name, example_id, run_id, question, latency_s, input_tokens, output_tokens, total_tokens) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            experiment_name, str(row["example_id"]), str(row["run_id"]) if row.get("run_id") else None,
+                            (row.get("question") or "")[:QUESTION_CHARS] or None, row.get("latency_s"),
+                            row.get("input_tokens"), row.get("output_tokens"), row.get("total_tokens"),
+                        )
+                        for row in rows
+                    ],
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO scores (experiment_name, key, example_id, score) VALUES (?, ?, ?, ?)",
+                    [
+                        (experiment_name, key, str(row["example_id"]), float(score) if score is not None else None)
+                        for row in rows for key, score in row.get("scores", {}).items()
+                    ],
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    def _query(self, sql: str, parameters: tuple = ()) -> list[tuple]:
+        with self._lock:
+            return self._connection().execute(sql, parameters).fetchall()
+
+    def experiments(self) -> list[dict]:
+        rows = self._query(
+            "SELECT e.experiment_name, e.dataset_name, e.recorded_at, COUNT(r.example_id) FROM experiments e "
+            "LEFT JOIN results r ON r.experiment_name = e.experiment_name GROUP BY e.experiment_name ORDER BY e.recorded_at"
+        )
+        return [{"experiment_name": name, "dataset_name": dataset, "recorded_at": recorded_at, "examples": examples} for name, dataset, recorded_at, examples in rows]
+
+    def config(self, experiment_name: str) -> dict:
+        rows = self._query("SELECT config FROM experiments WHERE experiment_name = ?", (experiment_name,))
+        return json.loads(rows[0][0]) if rows else {}
+
+    def aggregates(self, experiment_names: Optional[list[str]] = None, keys: Optional[list[str]] = None) -> list[dict]:
+        """Count, mean, min and max of every score key per experiment, plus mean latency and tokens."""
+        conditions, parameters = [], []
+        if experiment_names:
+            conditions.append(f"s.experiment_name IN ({','.join('?' * len(experiment_names))})")
+            parameters += experiment_names
+        if keys:
+            conditions.append(f"s.key IN ({','.join('?' * len(keys))})")
+            parameters += keys
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self._query(
+            f"SELECT s.experiment_name, s.key, COUNT(s.score), AVG(s.score), MIN(s.score), MAX(s.score) FROM scores s {where} "
+            "GROUP BY s.experiment_name, s.key ORDER BY s.experiment_name, s.key",
+            tuple(parameters),
+        )
+        return [{"experiment_name": name, "key": key, "n": n, "mean": mean, "min": low, "max": high} for name, key, n, mean, low, high in rows]
+
+    def run_stats(self, experiment_name: str) -> dict:
+        row = self._query(
+            "SELECT COUNT(*), AVG(latency_s), MAX(latency_s), AVG(input_tokens), AVG(output_tokens) FROM results WHERE experiment_name = ?",
+            (experiment_name,),
+        )[0]
+        return {"examples": row[0], "latency_mean_s": row[1], "latency_max_s": row[2], "input_tokens_mean": row[3], "output_tokens_mean": row[4]}
+
+    def diff(self, baseline: str, candidate: str, key: str) -> list[dict]:
+        """Per-example scores for key in both experiments, largest drop first."""
+        rows = self._query(
+            "SELECT a.example_id, r.question, a.score, b.score, b.score - a.score AS delta FROM scores a "
+            "JOIN scores b ON b.experiment_name = ? AND b.key = a.key AND b.example_id = a.example_id "
+            "LEFT JOIN results r ON r.experiment_name = a.experiment_name AND r.example_id = a.example_id "
+            "WHERE a.experiment_name = ? AND a.key = ? ORDER BY delta",
+            (candidate, baseline, key),
+        )
+        return [{"example_id": example_id, "question": question, "baseline": score_a, "candidate": score_b, "delta": delta} for example_id, question, score_a, score_b, delta in rows]
+
+    def regressions(self, baseline: str, candidate: str, keys: Optional[list[str]] = None, threshold: float = 0.0) -> list[dict]:
+        """Per key, how many shared examples got worse (by more than threshold), better or stayed the same."""
+        key_filter = f"AND a.key IN ({','.join('?' * len(keys))})" if keys else ""
+        rows = self._query(
+            "SELECT a.key, COUNT(*), SUM(b.score - a.score < -?), SUM(b.score - a.score > ?), AVG(b.score - a.score) FROM scores a "
+            "JOIN scores b ON b.experiment_name = ? AND b.key = a.key AND b.example_id = a.example_id "
+            f"WHERE a.experiment_name = ? AND a.score IS NOT NULL AND b.score IS NOT NULL {key_filter} GROUP BY a.key ORDER BY AVG(b.score - a.score)",
+            (threshold, threshold, candidate, baseline, *(keys or [])),
+        )
+        return [
+            {"key": key, "shared": shared, "worse": worse, "better": better, "unchanged": shared - worse - better, "mean_delta": mean_delta}
+            for key, shared, worse, better, mean_delta in rows
+        ]
+
+
+def _row_from_evaluation(row: dict, usage: Optional[dict] = None) -> dict:
+    run, example = row["run"], row["example"]
+    latency = (run.end_time - run.start_time).total_seconds() if run.start_time and run.end_time else None
+    inputs = example.inputs.get("inputs", example.inputs) if example.inputs else {}
+    messages = inputs.get("messages") or [{}]
+    # The local run tree has no token counts (LangSmith adds them server-side), so they come from usage
+    usage = usage or {}
+    return {
+        "example_id": example.id,
+        "run_id": run.id,
+        "question": messages[0].get("content"),
+        "latency_s": latency,
+        "input_tokens": usage.get("input_tokens"),
+        "output_tokens": usage.get("output_tokens"),
+        "total_tokens": usage.get("total_tokens"),
+        "scores": {
+            result.key: result.score for result in row["evaluation_results"]["results"]
+            if isinstance(result.score, (int, float))
+        },
+    }
+
+
+async def arecord_experiment(
+    store: ResultsStore,
+    results,
+    config: dict,
+    dataset_name: Optional[str] = None,
+    on_row: Optional[Callable[[dict], Awaitable[None]]] = None,
+    usage_for: Optional[Callable[[str], Optional[dict]]] = None,
+) -> list[dict]:
+    """Record every row of a client.aevaluate(...) experiment, await on_row(row) for it, and return the recorded rows.
+
+    With aevaluate(..., blocking=False) the rows arrive as examples finish, so an interrupted run
+    keeps the rows it got through. results can only be iterated once, so callers that need the
+    rows use the returned ones.
+    usage_for(example_id) supplies each example's token counts (see CostMeter.pop_example_usage).
+    """
+    store.record_experiment(results.experiment_name, config, dataset_name)
+    rows = []
+    async for row in results:
+        recorded = _row_from_evaluation(row, usage_for(str(row["example"].id)) if usage_for else None)
+        store.record_results(results.experiment_name, [recorded])
+        rows.append(recorded)
+        if on_row is not None:
+            await on_row(row)
+    return rows
+
+
+def row_from_run(run, question: Optional[str] = None) -> dict:
+    """Result row for a LangSmith root run fetched with feedback_stats and token counts."""
+    latency = (run.end_time - run.start_time).total_seconds() if run.start_time and run.end_time else None
+    return {
+        "example_id": run.reference_example_id,
+        "run_id": run.id,
+        "question": question,
+        "latency_s": latency,
+        "input_tokens": getattr(run, "prompt_tokens", None),
+        "output_tokens": getattr(run, "completion_tokens", None),
+        "total_tokens": getattr(run, "total_tokens", None),
+        "scores": {
+            key: stats.get("avg") for key, stats in (getattr(run, "feedback_stats", None) or {}).items()
+            if isinstance(stats, dict) and isinstance(stats.get("avg"), (int, float))
+        },
+    }
+
+
+results_store = ResultsStore()
+
+
+def _format(value) -> str:
+    if isinstance(value, float):
+        return f"{value:.3f}"
+    return "-" if value is None else str(value)
+
+
+def _print_table(rows: list[dict], columns: list[str]) -> None:
+    cells = [[_format(row[column]) for column in columns] for row in rows]
+    widths = [max([len(column), *(len(line[i]) for line in cells)]) for i, column in enumerate(columns)]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    for line in cells:
+        print("  ".join(cell.ljust(width) for cell, width in zip(line, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query the local experiment results store')
+    parser.add_argument('--path', default=DEFAULT_RESULTS_PATH, help='Results store path')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('experiments', help='List recorded experiments')
+    aggregate = commands.add_parser('aggregate', help='Score aggregates per experiment and key')
+    aggregate.add_argument('--experiment', action='append', help='Limit to these experiments (repeatable)')
+    aggregate.add_argument('--key', action='append', help='Limit to these score keys (repeatable)')
+    diff = commands.add_parser('diff', help='Per-example score changes between two experiments')
+    diff.add_argument('baseline')
+    diff.add_argument('candidate')
+    diff.add_argument('--key', required=True, help='Score key to compare, e.g. groundedness_score')
+    diff.add_argument('--limit', type=int, default=20, help='Show this many examples, largest drop first')
+    regressions = commands.add_parser('regressions', help='Examples that got worse per score key between two experiments')
+    regressions.add_argument('baseline')
+    regressions.add_argument('candidate')
+    regressions.add_argument('--key', action='append', help='Limit to these score keys (repeatable)')
+    regressions.add_argument('--threshold', type=float, default=0.0, help='Ignore changes of at most this much')
+    args = parser.parse_args()
+
+    store = ResultsStore(args.path)
+    started = time.perf_counter()
+    if args.command == 'experiments':
+        _print_table(store.experiments(), ["experiment_name", "dataset_name", "examples"])
+    elif args.command == 'aggregate':
+        _print_table(store.aggregates(args.experiment, args.key), ["experiment_name", "key", "n", "mean", "min", "max"])
+    elif args.command == 'diff':
+        _print_table(store.diff(args.baseline, args.candidate, args.key)[:args.limit], ["example_id", "baseline", "candidate", "delta", "question"])
+    else:
+        _print_table(store.regressions(args.baseline, args.candidate, args.key, args.threshold), ["key", "shared", "worse", "better", "unchanged", "mean_delta"])
+    print(f"({(time.perf_counter() - started) * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""Resumable evaluation runs: an on-disk graph checkpointer plus a ledger of finished examples.
+
+`python tests/run_evaluate.py --resume` checkpoints the graph to SQLite under a thread id derived
+from the run key (a hash of the dataset and experiment metadata) and the example id. Rerunning the
+same command after a crash continues the same LangSmith experiment: examples in the ledger are
+skipped, and interrupted examples pick up from their last completed graph node. A finished
+example's checkpoints are deleted as soon as it is recorded in the ledger, and the remaining
+history is pruned to the latest checkpoint per thread when the run ends.
+
+    python tests/resumable.py status
+    python tests/resumable.py prune
+    python tests/resumable.py forget <run_key>
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Optional
+from tests.sqlite_db import connect
+
+RESUME_DIR = os.getenv("RESUME_DIR", "tests/.cache/resume")
+CHECKPOINT_PATH = os.path.join(RESUME_DIR, "checkpoints.sqlite")
+LEDGER_PATH = os.path.join(RESUME_DIR, "ledger.sqlite")
+# Fixed so thread ids stay the same across processes and machines
+THREAD_NAMESPACE = uuid.UUID("6f0c3d5e-2b1a-4f7e-9a44-1d2c8e0b7a31")
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS runs ("
+    "run_key TEXT PRIMARY KEY, experiment_name TEXT, config TEXT NOT NULL, started_at REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS completed ("
+    "run_key TEXT NOT NULL, example_id TEXT NOT NULL, completed_at REAL NOT NULL, "
+    "PRIMARY KEY (run_key, example_id)) WITHOUT ROWID",
+]
+
+
+def run_key_for(dataset_name: str, metadata: dict) -> str:
+    payload = json.dumps({"dataset": dataset_name, "metadata": metadata}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def thread_id_for(run_key: str, example_id) -> str:
+    return str(uuid.uuid5(THREAD_NAMESPACE, f"{run_key}:{example_id}"))
+
+
+class RunLedger:
+    """Which (run key, example) pairs finished, and which experiment each run key writes to."""
+
+    def __init__(self, path: str = LEDGER_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = connect(self.path, SCHEMA)
+        return self._conn
+
+    def start_run(self, run_key: str, config: dict) -> None:
+        with self._lock:
+            self._connection().execute(
+                "INSERT OR IGNORE INTO runs (run_key, config, started_at) VALUES (?, ?, ?)",
+                (run_key, json.dumps(config, sort_keys=True, default=str), time.time()),
+            )
+
+    def experiment_for(self, run_key: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection().execute("SELECT experiment_name FROM runs WHERE run_key = ?", (run_key,)).fetchone()
+        return row[0] if row else None
+
+    def set_experiment(self, run_key: str, experiment_name: str) -> None:
+        with self._lock:
+            self._connection().execute("UPDATE runs SET experiment_name = ? WHERE run_key = ?", (experiment_name, run_key))
+
+    def completed(self, run_key: str) -> set[str]:
+        with self._lock:
+            return {row[0] for row in self._connection().execute("SELECT example_id FROM completed WHERE run_key = ?", (run_key,))}
+
+    def mark_completed(self, run_key: str, example_id) -> None:
+        with self._lock:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO completed (run_key, example_id, completed_at) VALUES (?, ?, ?)",
+                (run_key, str(example_id), time.time()),
+            )
+
+    def runs(self) -> list[dict]:
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT r.run_key, r.experiment_name, r.started_at, COUNT(c.example_id) FROM runs r "
+                "LEFT JOIN completed c ON c.run_key = r.run_key GROUP BY r.run_key ORDER BY r.started_at"
+            ).fetchall()
+        return [{"run_key": key, "experiment_name": name, "started_at": started, "completed": count} for key, name, started, count in rows]
+
+    def forget(self, run_key: str) -> None:
+        with self._lock:
+            connection = self._connection()
+            connection.execute("DELETE FROM completed WHERE run_key = ?", (run_key,))
+            connection.execute("DELETE FROM runs WHERE run_key = ?", (run_key,))
+
+
+def prune_checkpoints(path: str = CHECKPOINT_PATH, finished_thread_ids: tuple[str, ...] = ()) -> dict:
+    """Drop finished threads and all but the latest checkpoint of every other thread, then reclaim the space.
+
+    The SQLite saver stores full channel values in every checkpoint, so an interrupted example
+    still resumes from its latest one. Call this while no run is using the checkpoint file.
+    """
+    if not os.path.exists(path):
+        return {"threads_deleted": 0, "checkpoints_deleted": 0, "bytes_before": 0, "bytes_after": 0}
+    bytes_before = os.path.getsize(path)
+    connection = sqlite3.connect(path, isolation_level=None, timeout=30)
+    try:
+        connection.execute("BEGIN")
+        threads_deleted = 0
+        for thread_id in finished_thread_ids:
+            threads_deleted += connection.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,)).rowcount > 0
+            connection.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+        # checkpoint ids are time-ordered, so the maximum per thread and namespace is the latest
+        checkpoints_deleted = connection.execute(
+            "DELETE FROM checkpoints WHERE checkpoint_id < "
+            "(SELECT MAX(latest.checkpoint_id) FROM checkpoints latest "
+            "WHERE latest.thread_id = checkpoints.thread_id AND latest.checkpoint_ns = checkpoints.checkpoint_ns)"
+        ).rowcount
+        connection.execute(
+            "DELETE FROM writes WHERE NOT EXISTS (SELECT 1 FROM checkpoints c WHERE c.thread_id = writes.thread_id "
+            "AND c.checkpoint_ns = writes.checkpoint_ns AND c.checkpoint_id = writes.checkpoint_id)"
+        )
+        connection.execute("COMMIT")
+        connection.execute("VACUUM")
+    finally:
+        connection.close()
+    return {"threads_deleted": threads_deleted, "checkpoints_deleted": checkpoints_deleted, "bytes_before": bytes_before, "bytes_after": os.path.getsize(path)}
+
+
+run_ledger = RunLedger()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect and clean up resumable run_evaluate.py runs')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('status', help='List resumable runs and how many examples each finished')
+    commands.add_parser('prune', help='Keep only the latest checkpoint per thread and reclaim disk space')
+    forget = commands.add_parser('forget', help='Drop a run from the ledger so its next --resume starts a new experiment')
+    forget.add_argument('run_key')
+    args = parser.parse_args()
+
+    if args.command == 'status':
+        for run in run_ledger.runs():
+            started = time.strftime('%Y-%m-%d %H:%M', time.localtime(run["started_at"]))
+            print(f"{run['run_key']}  {started}  {run['completed']:>5} done  {run['experiment_name'] or '-'}")
+    elif args.command == 'prune':
+        print(prune_checkpoints())
+    else:
+        finished = tuple(thread_id_for(args.run_key, example_id) for example_id in run_ledger.completed(args.run_key))
+        run_ledger.forget(args.run_key)
+        print(prune_checkpoints(finished_thread_ids=finished))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Local chunking and BM25 retrieval over research notes, used by the chunked groundedness evaluator."""
+
+import math
+import re
+from collections import Counter
+
+# CJK characters are indexed one at a time since those scripts do not separate words with spaces
+_TOKEN_RE = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]|[^\W_]+")
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def chunk_notes(notes, chunk_chars: int = 2000, overlap_chars: int = 200) -> list[str]:
+    """Split research notes into overlapping chunks, preferring to break on whitespace."""
+    if isinstance(notes, str):
+        notes = [notes]
+    chunks = []
+    for note in notes:
+        note = str(note)
+        start = 0
+        while start < len(note):
+            end = min(start + chunk_chars, len(note))
+            if end < len(note):
+                boundary = max(note.rfind("\n", start, end), note.rfind(" ", start, end))
+                if boundary > start + chunk_chars // 2:
+                    end = boundary
+            chunk = note[start:end].strip()
+            if chunk:
+                chunks.append(chunk)
+            if end >= len(note):
+                break
+            start = max(end - overlap_chars, start + 1)
+    return chunks
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of documents."""
+
+    def __init__(self, documents: list[str], k1: float = 1.5, b: float = 0.75):
+        self.documents = documents
+        self.k1 = k1
+        self.b = b
+        self._term_freqs = [Counter(tokenize(document)) for document in documents]
+        self._lengths = [sum(term_freqs.values()) for term_freqs in self._term_freqs]
+        self._avg_length = sum(self._lengths) / len(self._lengths) if self._lengths else 0.0
+        document_freqs = Counter(term for term_freqs in self._term_freqs for term in term_freqs)
+        n = len(documents)
+        self._idf = {
+            term: math.log(1 + (n - freq + 0.5) / (freq + 0.5))
+            for term, freq in document_freqs.items()
+        }
+
+    def scores(self, query: str) -> list[float]:
+        query_terms = [term for term in set(tokenize(query)) if term in self._idf]
+        scores = []
+        for term_freqs, length in zip(self._term_freqs, self._lengths):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * length / self._avg_length) if self._avg_length else self.k1
+            for term in query_terms:
+                freq = term_freqs.get(term)
+                if freq:
+                    score += self._idf[term] * freq * (self.k1 + 1) / (freq + norm)
+            scores.append(score)
+        return scores
+
+    def search(self, query: str, top_k: int = 4) -> list[str]:
+        """Return the top_k documents for the query, best first."""
+        scores = self.scores(query)
+        ranked = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
+        return [self.documents[i] for i in ranked[:top_k] if scores[i] > 0]
+
+
+_URL_RE = re.compile(r"https?://[^\s<>\"'()\[\]]+")
+_CITATION_MARKER_RE = re.compile(r"\[\d+(?:\s*,\s*\d+)*\]")
+_NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)*")
+
+
+def _urls(text: str) -> set[str]:
+    return {url.rstrip(".,;:!?").rstrip("/").lower() for url in _URL_RE.findall(text)}
+
+
+def _numbers(text: str) -> set[str]:
+    text = _CITATION_MARKER_RE.sub(" ", _URL_RE.sub(" ", text))
+    return {number.replace(",", "") for number in _NUMBER_RE.findall(text)}
+
+
+# Claims with these are always judged: a verbatim quote can still drop the context that qualifies it
+_NEGATION_RE = re.compile(r"\b(?:not|no|never|nor|none|neither|nobody|nothing|without|cannot|except|excluding|unlike|instead)\b|n['’]t\b", re.IGNORECASE)
+_COMPARATIVE_RE = re.compile(
+    r"\b(?:than|more|less|fewer|most|least|higher|lower|greater|larger|smaller|bigger|better|worse|faster|slower"
+    r"|exceed\w*|outperform\w*|surpass\w*)\b",
+    re.IGNORECASE,
+)
+_STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "in", "on", "at", "to", "for", "from", "by", "with", "as", "is", "are",
+    "was", "were", "be", "been", "it", "its", "this", "that", "these", "those", "which", "who", "has", "have", "had",
+}
+
+
+def _prose_tokens(text: str) -> list[str]:
+    return tokenize(_CITATION_MARKER_RE.sub(" ", _URL_RE.sub(" ", text)))
+
+
+class LexicalGroundingIndex:
+    """Exact-match index over research notes for settling verbatim claims without an LLM.
+
+    A claim counts as grounded only when its words appear contiguously, in order, inside a
+    single note, every number and URL it mentions appears verbatim, and it contains no negation
+    or comparative. Anything else is left to the judge; this index never marks a claim as ungrounded.
+    """
+
+    def __init__(self, notes, min_tokens: int = 5):
+        notes = [notes] if isinstance(notes, str) else [str(note) for note in notes]
+        self.min_tokens = min_tokens
+        # One line per note, so a match can never stitch together the end of one note and the start of the next
+        self._text = "\n".join(f" {' '.join(_prose_tokens(note))} " for note in notes)
+        self._vocabulary = set(self._text.split())
+        self._numbers = set().union(*(_numbers(note) for note in notes))
+        self._urls = set().union(*(_urls(note) for note in notes))
+
+    def is_grounded(self, claim: str) -> bool:
+        if _NEGATION_RE.search(claim) or _COMPARATIVE_RE.search(claim):
+            return False
+        if not _urls(claim) <= self._urls or not _numbers(claim) <= self._numbers:
+            return False
+        tokens = _prose_tokens(claim)
+        if len(tokens) < self.min_tokens:
+            return False
+        if any(token not in self._vocabulary for token in tokens if token not in _STOPWORDS):
+            return False
+        return f" {' '.join(tokens)} " in self._text
@@ -1,10 +1,24 @@
 from langsmith import Client
-from tests.evaluators import eval_overall_quality, eval_relevance, eval_structure, eval_correctness, eval_groundedness, eval_completeness
+from tests.evaluators import default_evaluators, groundedness_mode, make_concurrent_evaluator, provider_max_concurrency, groundedness_lexical_precheck, output_fields_for, JUDGE_PROMPT_VERSIONS
+from tests.output_projection import project_outputs
+from tests.triage import triage_cascade
+from tests.judge_cache import judge_cache
+from tests.cassettes import Cassette, REPLAY, OFF, install_cassette, load_examples
+from tests.profiling import ProfilingCallbackHandler
+from tests.cost_meter import cost_meter, budgeted_examples, attach_to_experiment
+from tests.rate_limits import rate_limiter
+from tests.results_store import results_store, arecord_experiment
+from tests.sharding import parse_shard, shard_examples, shard_group_for
+from tests.resumable import run_ledger, run_key_for, thread_id_for, prune_checkpoints, CHECKPOINT_PATH
+from langsmith.run_helpers import get_current_run_tree
 from dotenv import load_dotenv
+import argparse
 import asyncio
 from open_deep_research.deep_researcher import deep_researcher_builder
 from langgraph.checkpoint.memory import MemorySaver
+import os
 import uuid
+import time
 
 load_dotenv("../.env")
 
@@ -12,79 +26,200 @@ client = Client()
 
 # NOTE: Configure the right dataset and evaluators
 dataset_name = "Deep Research Bench"
-evaluators = [eval_overall_quality, eval_relevance, eval_structure, eval_correctness, eval_groundedness, eval_completeness]
+# NOTE: Every report evaluator, grading groundedness once in the groundedness_mode set in tests/evaluators.py
+evaluators = default_evaluators()
+# NOTE: Evaluators run concurrently per example, capped per judge provider across all examples
+provider_max_concurrency.update({"openai": 10, "anthropic": 5})
 # NOTE: Configure the right parameters for the experiment, these will be logged in the metadata
-max_structured_output_retries = 3
-allow_clarification = False
-max_concurrent_research_units = 10
-search_api = "tavily" # NOTE: We use Tavily to stay consistent
-max_researcher_iterations = 6
-max_react_tool_calls = 10
-summarization_model = "openai:gpt-4.1-mini"
-summarization_model_max_tokens = 8192
-research_model = "openai:gpt-5" # "anthropic:claude-sonnet-4-20250514"
-research_model_max_tokens = 10000
-compression_model = "openai:gpt-4.1"
-compression_model_max_tokens = 10000
-final_report_model = "openai:gpt-4.1"
-final_report_model_max_tokens = 10000
+# NOTE: tests/sweep.py overrides any of these per configuration
+experiment_config = {
+    "max_structured_output_retries": 3,
+    "allow_clarification": False,
+    "max_concurrent_research_units": 10,
+    "search_api": "tavily", # NOTE: We use Tavily to stay consistent
+    "max_researcher_iterations": 6,
+    "max_react_tool_calls": 10,
+    "summarization_model": "openai:gpt-4.1-mini",
+    "summarization_model_max_tokens": 8192,
+    "research_model": "openai:gpt-5", # "anthropic:claude-sonnet-4-20250514"
+    "research_model_max_tokens": 10000,
+    "compression_model": "openai:gpt-4.1",
+    "compression_model_max_tokens": 10000,
+    "final_report_model": "openai:gpt-4.1",
+    "final_report_model_max_tokens": 10000,
+}
 
-async def target(
-    inputs: dict,
-):
-    graph = deep_researcher_builder.compile(checkpointer=MemorySaver())
-    config = {
-        "configurable": {
-            "thread_id": str(uuid.uuid4()),
+# NOTE: CASSETTE_MODE=record captures every model and search call to a local cassette, replay serves them offline
+cassette = Cassette(mode=os.getenv("CASSETTE_MODE", OFF), simulated_latency=float(os.getenv("CASSETTE_LATENCY", "0")))
+install_cassette(cassette)
+if cassette.mode == "record":
+    # Judge cache hits would never reach the cassette
+    judge_cache.enabled = False
+
+# NOTE: Per-node, per-model-call and per-tool timings are appended here; summarize with `python tests/profiling.py <trace>`
+profile_trace_path = os.getenv("PROFILE_TRACE_PATH", f"tests/.cache/profiles/{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.jsonl")
+profiler = ProfilingCallbackHandler(profile_trace_path)
+
+# The graph is compiled once per process and shared by all examples; thread ids keep their state isolated
+checkpointer = MemorySaver()
+_compile_started = time.perf_counter()
+graph = deep_researcher_builder.compile(checkpointer=checkpointer)
+compile_seconds = time.perf_counter() - _compile_started
+examples_run = 0
+
+def make_target(experiment_config: dict, example_slots=None, run_key: str | None = None, graph=graph, checkpointer=checkpointer):
+    """Build the eval target for one configuration; example_slots optionally caps examples in flight across processes.
+
+    With a run_key the thread id is derived from it and the example id, so a rerun finds the
+    example's checkpoints and resumes from them instead of starting over.
+    """
+    async def target(
+        inputs: dict,
+    ):
+        global examples_run
+        run_tree = get_current_run_tree()
+        example_id = run_tree.reference_example_id if run_tree and run_tree.reference_example_id else None
+        thread_id = thread_id_for(run_key, example_id) if run_key and example_id else str(uuid.uuid4())
+        config = {
+            "configurable": {
+                "thread_id": thread_id,
+            },
+            # NOTE: rate_limiter adapts model call concurrency per provider, shared with the judge calls
+            "callbacks": [profiler, cost_meter, rate_limiter],
+            "metadata": {
+                "example_id": str(example_id) if example_id else thread_id,
+            },
         }
+        config["configurable"].update(experiment_config)
+        # NOTE: We do not use MCP tools to stay consistent
+        if example_slots is not None:
+            await asyncio.to_thread(example_slots.acquire)
+        try:
+            snapshot = await graph.aget_state(config) if run_key else None
+            if snapshot and snapshot.next:
+                # Interrupted last time: continue from the last completed node
+                final_state = await graph.ainvoke(None, config)
+            elif snapshot and snapshot.values:
+                # Finished last time but was never recorded as done
+                final_state = snapshot.values
+            else:
+                final_state = await graph.ainvoke(
+                    {"messages": [{"role": "user", "content": inputs["messages"][0]["content"]}]},
+                    config
+                )
+        finally:
+            if example_slots is not None:
+                example_slots.release()
+            # The output has been captured, so the example's checkpoints are no longer needed;
+            # resumable runs keep them until the example is in the ledger, and after failures
+            if not run_key:
+                await checkpointer.adelete_thread(thread_id)
+        examples_run += 1
+        # NOTE: Only the fields the evaluators read are kept and uploaded; raw_notes are spilled to tests/.cache/spill/
+        return project_outputs(final_state, output_fields_for(evaluators))
+    return target
+
+async def run_experiment(overrides: dict | None = None, experiment_prefix: str = "ODR GPT-5, Tavily Search", max_concurrency: int = 10, example_slots=None, shard: tuple[int, int] | None = None, shard_group: str | None = None, resume: bool = False):
+    """Evaluate one configuration; shard=(i, N) runs only the i-th of N hash partitions of the dataset.
+
+    resume=True checkpoints the graph to disk and continues this configuration's earlier
+    experiment, skipping examples the ledger has as finished (see tests/resumable.py).
+    Returns the experiment results and the rows recorded in the results store; the results
+    have already been iterated, so use the rows.
+    """
+    unknown = set(overrides or {}) - set(experiment_config)
+    if unknown:
+        raise ValueError(f"Unknown experiment settings: {sorted(unknown)}")
+    configuration = {**experiment_config, **(overrides or {})}
+    # NOTE: Set EVAL_BUDGET_USD to stop scheduling new examples once the target and judges have spent that much
+    examples = client.list_examples(dataset_name=dataset_name) if cassette.mode == OFF else load_examples(cassette, client, dataset_name)
+    metadata = {
+        "groundedness_mode": groundedness_mode,
+        "groundedness_lexical_precheck": groundedness_lexical_precheck,
+        "budget_usd": cost_meter.budget_usd,
+        "judge_cascade": triage_cascade.mode,
+        **{f"{key}_prompt_version": version for key, version in JUDGE_PROMPT_VERSIONS.items()},
+        **configuration,
     }
-    # NOTE: Configure the right dataset and evaluators
-    config["configurable"]["max_structured_output_retries"] = max_structured_output_retries
-    config["configurable"]["allow_clarification"] = allow_clarification
-    config["configurable"]["max_concurrent_research_units"] = max_concurrent_research_units
-    config["configurable"]["search_api"] = search_api
-    config["configurable"]["max_researcher_iterations"] = max_researcher_iterations
-    config["configurable"]["max_react_tool_calls"] = max_react_tool_calls
-    config["configurable"]["summarization_model"] = summarization_model
-    config["configurable"]["summarization_model_max_tokens"] = summarization_model_max_tokens
-    config["configurable"]["research_model"] = research_model
-    config["configurable"]["research_model_max_tokens"] = research_model_max_tokens
-    config["configurable"]["compression_model"] = compression_model
-    config["configurable"]["compression_model_max_tokens"] = compression_model_max_tokens
-    config["configurable"]["final_report_model"] = final_report_model
-    config["configurable"]["final_report_model_max_tokens"] = final_report_model_max_tokens
-    # NOTE: We do not use MCP tools to stay consistent
-    final_state = await graph.ainvoke(
-        {"messages": [{"role": "user", "content": inputs["messages"][0]["content"]}]},
-        config
-    )
-    return final_state
+    if shard is not None:
+        shard_index, shard_count = shard
+        examples = shard_examples(examples, shard_index, shard_count)
+        experiment_prefix = f"{experiment_prefix} shard {shard_index}/{shard_count}"
+        # NOTE: Every shard must get the same group so tests/sharding.py can merge them
+        shard_group = shard_group or shard_group_for(dataset_name, metadata, shard_count)
+        metadata.update({"dataset_name": dataset_name, "shard_index": shard_index, "shard_count": shard_count, "shard_group": shard_group})
+        print(f"Shard group: {shard_group}", flush=True)
+    if not resume:
+        results = await client.aevaluate(
+            make_target(configuration, example_slots),
+            data=budgeted_examples(examples, cost_meter),
+            evaluators=[make_concurrent_evaluator(evaluators)],
+            experiment_prefix=experiment_prefix,
+            max_concurrency=max_concurrency,
+            upload_results=cassette.mode != REPLAY,
+            metadata=metadata,
+            # Return once the experiment exists; rows are then recorded as each example finishes
+            blocking=False,
+        )
+        # NOTE: Every example's scores, latency and tokens also go to the local results store; query it with `python tests/results_store.py`
+        rows = await arecord_experiment(results_store, results, metadata, dataset_name, usage_for=cost_meter.pop_example_usage)
+        return results, rows
 
-async def main():
-    return await client.aevaluate(
-        target,
-        data=dataset_name,
-        evaluators=evaluators,
-        experiment_prefix=f"ODR GPT-5, Tavily Search",
-        max_concurrency=10,
-        metadata={
-            "max_structured_output_retries": max_structured_output_retries,
-            "allow_clarification": allow_clarification,
-            "max_concurrent_research_units": max_concurrent_research_units,
-            "search_api": search_api,
-            "max_researcher_iterations": max_researcher_iterations,
-            "max_react_tool_calls": max_react_tool_calls,
-            "summarization_model": summarization_model,
-            "summarization_model_max_tokens": summarization_model_max_tokens,
-            "research_model": research_model,
-            "research_model_max_tokens": research_model_max_tokens,
-            "compression_model": compression_model,
-            "compression_model_max_tokens": compression_model_max_tokens,
-            "final_report_model": final_report_model,
-            "final_report_model_max_tokens": final_report_model_max_tokens,
-        }
-    )
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+    run_key = run_key_for(dataset_name, metadata)
+    run_ledger.start_run(run_key, metadata)
+    completed = run_ledger.completed(run_key)
+    # Replayed runs are not uploaded, so there is no experiment to continue
+    experiment = run_ledger.experiment_for(run_key) if cassette.mode != REPLAY else None
+    print(f"Resumable run {run_key}: {len(completed)} examples already finished" + (f", continuing {experiment}" if experiment else ""), flush=True)
+    pending = (example for example in examples if str(example.id) not in completed)
+    os.makedirs(os.path.dirname(CHECKPOINT_PATH), exist_ok=True)
+    async with AsyncSqliteSaver.from_conn_string(CHECKPOINT_PATH) as saver:
+        resumable_graph = deep_researcher_builder.compile(checkpointer=saver)
+
+        async def on_row(row: dict) -> None:
+            # Failed examples keep their checkpoints and run again on the next --resume
+            if row["run"].error:
+                return
+            # Scores are logged before the row is yielded, so the example is done
+            run_ledger.mark_completed(run_key, row["example"].id)
+            completed.add(str(row["example"].id))
+            await saver.adelete_thread(thread_id_for(run_key, row["example"].id))
+
+        results = await client.aevaluate(
+            make_target(configuration, example_slots, run_key, resumable_graph, saver),
+            data=budgeted_examples(pending, cost_meter),
+            evaluators=[make_concurrent_evaluator(evaluators)],
+            **({"experiment": experiment} if experiment else {"experiment_prefix": experiment_prefix}),
+            max_concurrency=max_concurrency,
+            upload_results=cassette.mode != REPLAY,
+            metadata=metadata,
+            blocking=False,
+        )
+        # Saved before any example finishes, so a crash at any point continues this experiment
+        run_ledger.set_experiment(run_key, results.experiment_name)
+        rows = await arecord_experiment(results_store, results, metadata, dataset_name, on_row=on_row, usage_for=cost_meter.pop_example_usage)
+    # NOTE: Bounds the checkpoint file: only interrupted examples keep a checkpoint, and only their latest
+    print(f"Checkpoint pruning: {prune_checkpoints(CHECKPOINT_PATH, tuple(thread_id_for(run_key, example_id) for example_id in completed))}")
+    return results, rows
+
+async def main(shard: tuple[int, int] | None = None, shard_group: str | None = None, resume: bool = False):
+    return await run_experiment(shard=shard, shard_group=shard_group, resume=resume)
 
 if __name__ == "__main__":
-    results = asyncio.run(main())
-    print(results)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Run the Deep Research Bench experiment')
+    parser.add_argument('--shard', type=parse_shard, help='Run only shard i of N, e.g. 0/4; merge the shards with tests/sharding.py')
+    parser.add_argument('--shard-group', help='Name shared by the shards to merge (default: derived from the dataset, settings and shard count)')
+    parser.add_argument('--resume', action='store_true', help='Checkpoint to disk and continue this configuration\'s interrupted run, skipping finished examples')
+    args = parser.parse_args()
+    results, rows = asyncio.run(main(args.shard, args.shard_group, args.resume))
+    print(results)
+    print(f"Judge cache: {judge_cache.stats()}")
+    print(f"Cassette: {cassette.stats()}")
+    print(f"Profiling trace written to {profile_trace_path}")
+    print(f"Rate limiting: {rate_limiter.summary()}")
+    print(f"Prompt cache hit rate by model: {cost_meter.cache_hit_rates()}")
+    print(f"Triage cascade: {triage_cascade.summary()}")
+    if cassette.mode != REPLAY:
+        print(f"Cost: {attach_to_experiment(client, results.experiment_name, cost_meter, examples_run)}")
+    print(f"Graph compiled once in {compile_seconds:.2f}s, saving ~{compile_seconds * max(examples_run - 1, 0):.1f}s of compile/setup across {examples_run} examples")
\ No newline at end of file
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""Head-to-head comparison of two experiments that stops as soon as the outcome is decided.
+
+Examples are judged in random order with head_to_head_evaluator (ties count half a win each)
+and fed to Sobel and Wald's three-decision sequential test: two Wald SPRTs on the first
+experiment's win rate, one testing 0.5 against 0.5 + tie_margin and one against 0.5 - tie_margin.
+A winner is declared when either SPRT accepts its alternative, which keeps the chance of naming a
+winner between equal experiments at most alpha however often the test is checked; a tie is
+declared once both accept 0.5. Tests that run out of examples first are reported as undecided.
+"""
+
+import argparse
+import math
+import random
+from concurrent.futures import ThreadPoolExecutor
+from langsmith import Client
+from tests.pairwise_evaluation import head_to_head_evaluator
+from tests.experiments import load_experiment_outputs
+
+
+class SequentialComparison:
+    """Sobel-Wald three-decision test on how often experiment A beats experiment B."""
+
+    def __init__(self, alpha=0.05, beta=0.2, tie_margin=0.15, min_examples=10):
+        if not 0 < tie_margin < 0.5:
+            raise ValueError(f"tie_margin must be in (0, 0.5), got {tie_margin}")
+        self.alpha = alpha
+        self.beta = beta
+        self.tie_margin = tie_margin
+        self.min_examples = min_examples
+        # Wald's boundaries, with alpha split between the two directions
+        self.upper = math.log((1 - beta) / (alpha / 2))
+        self.lower = math.log(beta / (1 - alpha / 2))
+        self._win_step = math.log(1 + 2 * tie_margin)
+        self._loss_step = math.log(1 - 2 * tie_margin)
+        self.wins_a = 0.0
+        self.wins_b = 0.0
+
+    @property
+    def judged(self) -> int:
+        return round(self.wins_a + self.wins_b)
+
+    def record(self, scores):
+        if scores[0] == scores[1]:
+            self.wins_a += 0.5
+            self.wins_b += 0.5
+        elif scores[0] > scores[1]:
+            self.wins_a += 1
+        else:
+            self.wins_b += 1
+
+    def log_likelihood_ratios(self) -> tuple[float, float]:
+        """Evidence for "A wins at rate 0.5 + tie_margin" and for "B does", each against 0.5."""
+        return (
+            self.wins_a * self._win_step + self.wins_b * self._loss_step,
+            self.wins_b * self._win_step + self.wins_a * self._loss_step,
+        )
+
+    def expected_examples_to_tie(self) -> int:
+        """Average number of examples the test needs to declare a tie between equal experiments."""
+        drift = (self._win_step + self._loss_step) / 2
+        return math.ceil(self.lower / drift)
+
+    def decision(self):
+        """Return "A", "B", "tie", or None while the outcome is still open."""
+        if self.judged < self.min_examples:
+            return None
+        evidence_a, evidence_b = self.log_likelihood_ratios()
+        if evidence_a >= self.upper:
+            return "A"
+        if evidence_b >= self.upper:
+            return "B"
+        if evidence_a <= self.lower and evidence_b <= self.lower:
+            return "tie"
+        return None
+
+
+def compare_sequentially(outputs_a, outputs_b, judge=head_to_head_evaluator, alpha=0.05, beta=0.2, tie_margin=0.15, min_examples=10, max_workers=4, seed=0):
+    """Judge shared examples in random order until the comparison is decided or the examples run out."""
+    rng = random.Random(seed)
+    examples = sorted(set(outputs_a) & set(outputs_b), key=str)
+    rng.shuffle(examples)
+    swapped = {example_id: rng.random() < 0.5 for example_id in examples}
+    comparison = SequentialComparison(alpha=alpha, beta=beta, tie_margin=tie_margin, min_examples=min_examples)
+
+    def judge_example(example_id):
+        first, second = (outputs_b, outputs_a) if swapped[example_id] else (outputs_a, outputs_b)
+        try:
+            scores = judge(first[example_id][0], [first[example_id][1], second[example_id][1]])
+        except Exception as error:
+            # A failed judge call skips that one example; the verdicts gathered so far still count
+            print(f"Judge call failed on {example_id}: {error!r}")
+            return None
+        return list(reversed(scores)) if swapped[example_id] else scores
+
+    decision = None
+    skipped = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for start in range(0, len(examples), max_workers):
+            for scores in executor.map(judge_example, examples[start:start + max_workers]):
+                if scores is None:
+                    skipped += 1
+                else:
+                    comparison.record(scores)
+            decision = comparison.decision()
+            if decision is not None:
+                break
+    return {
+        "decision": decision or "undecided",
+        "examples_judged": comparison.judged,
+        "examples_available": len(examples),
+        "examples_skipped": skipped,
+        "wins_a": comparison.wins_a,
+        "wins_b": comparison.wins_b,
+        "log_likelihood_ratios": comparison.log_likelihood_ratios(),
+        "boundaries": (comparison.lower, comparison.upper),
+        "expected_examples_to_tie": comparison.expected_examples_to_tie(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare two experiments head to head, stopping as soon as the winner is decided')
+    parser.add_argument('experiment_a', help='First experiment (project) name')
+    parser.add_argument('experiment_b', help='Second experiment (project) name')
+    parser.add_argument('--alpha', type=float, default=0.05, help='Chance of declaring a winner between equally good experiments')
+    parser.add_argument('--beta', type=float, default=0.2, help='Chance of missing a winner whose win rate is 0.5 + tie margin, or a tie')
+    parser.add_argument('--tie-margin', type=float, default=0.15, help='Win rates this far from 0.5 count as a real difference; smaller margins need more examples')
+    parser.add_argument('--min-examples', type=int, default=10, help='Never stop before judging this many examples')
+    parser.add_argument('--workers', type=int, default=4, help='Concurrent judge calls between stopping checks')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    client = Client()
+    result = compare_sequentially(
+        load_experiment_outputs(client, args.experiment_a),
+        load_experiment_outputs(client, args.experiment_b),
+        alpha=args.alpha,
+        beta=args.beta,
+        tie_margin=args.tie_margin,
+        min_examples=args.min_examples,
+        max_workers=args.workers,
+        seed=args.seed,
+    )
+    winner = {"A": args.experiment_a, "B": args.experiment_b}.get(result["decision"], result["decision"])
+    lower, upper = result["boundaries"]
+    evidence_a, evidence_b = result["log_likelihood_ratios"]
+    print(f"Decision: {winner}")
+    print(f"Judged {result['examples_judged']}/{result['examples_available']} examples "
+          f"({result['examples_judged'] / max(result['examples_available'], 1):.0%}); "
+          f"{args.experiment_a} won {result['wins_a']:g}, {args.experiment_b} won {result['wins_b']:g}")
+    if result["examples_skipped"]:
+        print(f"Skipped {result['examples_skipped']} examples whose judge call failed")
+    print(f"Log likelihood ratios: {evidence_a:.2f} for {args.experiment_a}, {evidence_b:.2f} for {args.experiment_b} (boundaries {lower:.2f} and {upper:.2f})")
+    if result["decision"] == "undecided" and result["expected_examples_to_tie"] > result["examples_available"]:
+        print(f"A tie takes about {result['expected_examples_to_tie']} examples at this tie margin; only {result['examples_available']} are shared")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""Split run_evaluate.py across processes or machines and merge the shards back together.
+
+Examples are assigned to shards by a hash of their id, so every process or machine that runs
+`python tests/run_evaluate.py --shard i/N` with the same settings agrees on the split without
+coordinating. Each shard is its own experiment, tagged with its shard index and a shard group
+derived from the dataset, settings and shard count.
+
+    python tests/sharding.py run 4                 # four local shards, then merge
+    python tests/sharding.py merge <shard_group>   # after shards ran anywhere
+
+Merging reads every shard experiment in the group, reports examples that no shard finished or
+that more than one run covered, checks all shards produced the same feedback keys, and records
+the combined result in the local results store under the group name.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from langsmith import Client
+from tests.results_store import results_store, row_from_run
+
+SHARD_METADATA_KEYS = ("shard_index", "shard_count", "shard_group")
+
+
+def parse_shard(value: str) -> tuple[int, int]:
+    """Parse "i/N" into (i, N) with 0 <= i < N."""
+    index, _, count = value.partition("/")
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        raise ValueError(f"Shard must look like i/N, got {value!r}") from None
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Shard index must be in [0, {count}), got {value!r}")
+    return index, count
+
+
+def shard_of(example_id, shard_count: int) -> int:
+    return int(hashlib.sha256(str(example_id).encode("utf-8")).hexdigest(), 16) % shard_count
+
+
+def shard_examples(examples, shard_index: int, shard_count: int):
+    """Yield the examples that belong to shard shard_index of shard_count."""
+    for example in examples:
+        if shard_of(example.id, shard_count) == shard_index:
+            yield example
+
+
+def shard_group_for(dataset_name: str, configuration: dict, shard_count: int) -> str:
+    """Identical for every shard started with the same dataset, settings and shard count."""
+    payload = json.dumps({"dataset": dataset_name, "configuration": configuration, "shards": shard_count}, sort_keys=True, default=str)
+    return f"shards-{hashlib.sha256(payload.encode('utf-8')).hexdigest()[:12]}"
+
+
+def merge_shards(client, shard_group: str, dataset_name: str | None = None, store=results_store) -> dict:
+    """Combine a shard group's experiments into one results store record and report coverage problems."""
+    projects = [project for project in client.list_projects(metadata={"shard_group": shard_group}) if (project.metadata or {}).get("shard_group") == shard_group]
+    if not projects:
+        raise ValueError(f"No experiments found for shard group {shard_group}")
+    shard_count = int(projects[0].metadata["shard_count"])
+    dataset_name = dataset_name or projects[0].metadata.get("dataset_name")
+
+    runs_by_example = {}
+    feedback_keys = {}
+    shards_seen = {}
+    for project in projects:
+        shard_index = int(project.metadata["shard_index"])
+        shards_seen.setdefault(shard_index, []).append(project.name)
+        keys = set()
+        for run in client.list_runs(project_name=project.name, is_root=True, select=["id", "inputs", "reference_example_id", "start_time", "end_time", "feedback_stats", "prompt_tokens", "completion_tokens", "total_tokens"]):
+            if run.reference_example_id is None or run.end_time is None:
+                continue
+            runs_by_example.setdefault(run.reference_example_id, []).append((shard_index, run))
+            keys.update((run.feedback_stats or {}).keys())
+        feedback_keys[project.name] = keys
+
+    duplicates = {str(example_id): [shard for shard, _ in runs] for example_id, runs in runs_by_example.items() if len(runs) > 1}
+    missing, misplaced = {}, []
+    if dataset_name:
+        expected = {example.id for example in client.list_examples(dataset_name=dataset_name)}
+        for example_id in expected - set(runs_by_example):
+            missing.setdefault(shard_of(example_id, shard_count), []).append(str(example_id))
+        # A run in the wrong shard means the shards were started with different shard counts
+        misplaced = [str(example_id) for example_id, runs in runs_by_example.items() if any(shard != shard_of(example_id, shard_count) for shard, _ in runs)]
+    all_keys = set().union(*feedback_keys.values())
+    mismatched_keys = {name: sorted(all_keys - keys) for name, keys in feedback_keys.items() if keys != all_keys}
+
+    rows = []
+    for example_id, runs in runs_by_example.items():
+        # Keep the latest run when an example was run more than once
+        _, run = max(runs, key=lambda shard_run: shard_run[1].start_time)
+        inputs = (run.inputs or {}).get("inputs", run.inputs or {})
+        rows.append(row_from_run(run, ((inputs.get("messages") or [{}])[0]).get("content")))
+    config = {key: value for key, value in projects[0].metadata.items() if key not in SHARD_METADATA_KEYS}
+    if store is not None:
+        store.record_experiment(shard_group, {**config, "shard_experiments": sorted(project.name for project in projects)}, dataset_name)
+        store.record_results(shard_group, rows)
+    return {
+        "shard_group": shard_group,
+        "examples": len(rows),
+        "shards_found": sorted(shards_seen),
+        "shards_missing": sorted(set(range(shard_count)) - set(shards_seen)),
+        "shards_repeated": {shard: names for shard, names in shards_seen.items() if len(names) > 1},
+        "missing_examples": missing,
+        "duplicate_examples": duplicates,
+        "misplaced_examples": misplaced,
+        "mismatched_feedback_keys": mismatched_keys,
+    }
+
+
+def run_local_shards(shard_count: int, shard_group: str) -> list[int]:
+    """Run shard_count run_evaluate.py processes side by side and return the shards that failed."""
+    env = {**os.environ, "RATE_LIMIT_SHARE": str(shard_count)}
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "run_evaluate.py")
+    processes = [
+        subprocess.Popen([sys.executable, script, "--shard", f"{index}/{shard_count}", "--shard-group", shard_group], env=env)
+        for index in range(shard_count)
+    ]
+    return [index for index, process in enumerate(processes) if process.wait() != 0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run run_evaluate.py in shards and merge the shard experiments')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run = commands.add_parser('run', help='Run N local shards, then merge them')
+    run.add_argument('shards', type=int, help='Number of shard processes')
+    run.add_argument('--shard-group', help='Name for the shard group (default: a new timestamped name)')
+    merge = commands.add_parser('merge', help='Merge the experiments of a shard group')
+    merge.add_argument('shard_group', help='Printed by every shard as "Shard group: ..."')
+    merge.add_argument('--dataset-name', help='Dataset used to detect missing examples (default: from the shard metadata)')
+    args = parser.parse_args()
+
+    shard_group = args.shard_group
+    if args.command == 'run':
+        shard_group = shard_group or f"shards-local-{time.strftime('%Y%m%d-%H%M%S')}"
+        failed = run_local_shards(args.shards, shard_group)
+        if failed:
+            print(f"Shards {failed} of {args.shards} exited with an error; merging what finished")
+    report = merge_shards(Client(), shard_group, getattr(args, 'dataset_name', None))
+    print(json.dumps(report, indent=2))
+    problems = report["shards_missing"] or report["missing_examples"] or report["duplicate_examples"] or report["misplaced_examples"] or report["mismatched_feedback_keys"]
+    print(f"Merged {report['examples']} examples into results store experiment {shard_group}" + (" (with the problems above)" if problems else ""))
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
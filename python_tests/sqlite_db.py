@@ -0,0 +1,18 @@
+"""Connection setup shared by the local SQLite caches, stores and ledgers."""
+
+import os
+import sqlite3
+from typing import Iterable
+
+
+def connect(path: str, schema: Iterable[str] = ()) -> sqlite3.Connection:
+    """Open (creating its directory) a WAL-mode database that any thread may use, and apply schema.
+
+    Autocommit mode, so callers open their own transactions; callers serialize access with a lock.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    for statement in schema:
+        connection.execute(statement)
+    return connection
@@ -1,8 +1,11 @@
 from open_deep_research.deep_researcher import deep_researcher_builder
 from langgraph.checkpoint.memory import MemorySaver
 import uuid
+import time
 import asyncio
+from contextlib import aclosing
 from langsmith import Client
+from tests.rate_limits import rate_limiter
 
 client = Client()
 
@@ -13,15 +16,26 @@ def right_parallelism_evaluator(
 ) -> dict:
     return {
         "key": "right_parallelism", 
-        "score": len(outputs["output"].values["supervisor_messages"][-1].tool_calls) == reference_outputs["parallel"]
+        "score": len(outputs["supervisor_messages"][-1].tool_calls) == reference_outputs["parallel"]
     }
 
+# Stop each example right after the supervisor's first planning step instead of running every researcher and the final report
+probe_first_supervisor_step = True
+
+checkpointer = MemorySaver()
+_compile_started = time.perf_counter()
+graph = deep_researcher_builder.compile(checkpointer=checkpointer)
+compile_seconds = time.perf_counter() - _compile_started
+examples_run = 0
+
 async def target(inputs: dict):
-    graph = deep_researcher_builder.compile(checkpointer=MemorySaver())
+    global examples_run
+    thread_id = str(uuid.uuid4())
     config = {
         "configurable": {
-            "thread_id": str(uuid.uuid4()),
-        }
+            "thread_id": thread_id,
+        },
+        "callbacks": [rate_limiter],
     }
     # NOTE: Configure the right dataset and evaluators
     config["configurable"]["max_structured_output_retries"] = 3
@@ -39,11 +53,30 @@ async def target(inputs: dict):
     config["configurable"]["final_report_model"] = "openai:gpt-4.1"
     config["configurable"]["final_report_model_max_tokens"] = 10000
     # NOTE: We do not use MCP tools to stay consistent
-    await graph.ainvoke(
-        {"messages": [{"role": "user", "content": inputs["messages"][0]["content"]}]},
-        config
-    )
-    return graph.get_state(config, subgraphs=True).tasks[0].state
+    graph_input = {"messages": [{"role": "user", "content": inputs["messages"][0]["content"]}]}
+    try:
+        if probe_first_supervisor_step:
+            supervisor_messages = await first_supervisor_messages(graph_input, config)
+        else:
+            await graph.ainvoke(graph_input, config)
+            supervisor_messages = graph.get_state(config, subgraphs=True).tasks[0].state.values["supervisor_messages"]
+    finally:
+        await checkpointer.adelete_thread(thread_id)
+    examples_run += 1
+    return {"supervisor_messages": supervisor_messages}
+
+async def first_supervisor_messages(graph_input: dict, config: dict) -> list:
+    """Stream the graph until the supervisor has made its first plan, then cancel the rest of the run."""
+    async with aclosing(graph.astream(graph_input, config, stream_mode="values", subgraphs=True)) as stream:
+        async for namespace, values in stream:
+            # Only the supervisor subgraph itself; researchers run in subgraphs nested below it
+            if len(namespace) != 1 or not namespace[0].startswith("research_supervisor"):
+                continue
+            supervisor_messages = values.get("supervisor_messages") or []
+            # The subgraph first emits its input state; the first AI message is the supervisor's plan
+            if supervisor_messages and supervisor_messages[-1].type == "ai":
+                return supervisor_messages
+    raise RuntimeError("The graph finished without a supervisor planning step")
 
 
 
@@ -53,9 +86,12 @@ async def main():
         data=dataset_name,
         evaluators=[right_parallelism_evaluator],
         experiment_prefix=f"v1 #",
-        max_concurrency=1,
+        # Examples only share the compiled graph; thread ids and the rate limiter keep concurrent runs safe
+        max_concurrency=10,
     )
 
 if __name__ == "__main__":
     results = asyncio.run(main())
-    print(results)
\ No newline at end of file
+    print(results)
+    print(f"Rate limiting: {rate_limiter.summary()}")
+    print(f"Graph compiled once in {compile_seconds:.2f}s, saving ~{compile_seconds * max(examples_run - 1, 0):.1f}s of compile/setup across {examples_run} examples")
\ No newline at end of file
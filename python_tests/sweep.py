@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""Run run_evaluate.py over a grid or random sample of experiment configurations.
+
+The spec is a JSON file:
+
+    {
+        "mode": "grid",                  # or "random", with "samples" and "seed"
+        "base": {"search_api": "tavily"},
+        "parameters": {
+            "max_researcher_iterations": [3, 6],
+            "research": [                # dict values set several settings together
+                {"research_model": "openai:gpt-5", "research_model_max_tokens": 10000},
+                {"research_model": "openai:gpt-4.1", "research_model_max_tokens": 10000}
+            ],
+            "max_react_tool_calls": {"min": 5, "max": 15}    # random mode only
+        }
+    }
+
+Each configuration runs as its own experiment in a fresh worker process. A semaphore shared by
+all workers caps the examples in flight across the whole sweep, and each worker gets an equal
+share of the provider rate limits. Every worker uses the same on-disk judge cache (and cassette
+in replay mode), so identical judge inputs are only paid for once. Duplicate configurations run
+once, configurations already in the results table are skipped, and the table is rewritten after
+every configuration with its settings, mean scores, latency and cost.
+"""
+
+import argparse
+import asyncio
+import csv
+import hashlib
+import itertools
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import Manager, get_context
+
+RESULT_COLUMNS = ["config_id", "experiment_name", "status", "examples", "wall_seconds", "latency_mean_s", "latency_p50_s", "latency_p95_s", "total_cost_usd", "cost_per_example_usd", "cached_token_rate"]
+
+_example_slots = None
+
+
+def _sample(rng: random.Random, values):
+    if isinstance(values, list):
+        return rng.choice(values)
+    low, high = values["min"], values["max"]
+    if values.get("log"):
+        return math.exp(rng.uniform(math.log(low), math.log(high)))
+    if isinstance(low, int) and isinstance(high, int):
+        return rng.randint(low, high)
+    return rng.uniform(low, high)
+
+
+def _merge(base: dict, choices) -> dict:
+    config = dict(base)
+    for name, value in choices:
+        if isinstance(value, dict):
+            config.update(value)
+        else:
+            config[name] = value
+    return config
+
+
+def config_id(config: dict) -> str:
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()[:10]
+
+
+def expand_spec(spec: dict) -> dict[str, dict]:
+    """Map config id -> settings overrides for every distinct configuration in the spec."""
+    base = spec.get("base", {})
+    parameters = spec.get("parameters", {})
+    if spec.get("mode", "grid") == "grid":
+        names = list(parameters)
+        configs = [_merge(base, zip(names, combination)) for combination in itertools.product(*(parameters[name] for name in names))]
+    else:
+        rng = random.Random(spec.get("seed", 0))
+        configs = [_merge(base, ((name, _sample(rng, values)) for name, values in parameters.items())) for _ in range(spec.get("samples", 10))]
+    return {config_id(config): config for config in configs}
+
+
+def _percentile(values: list[float], fraction: float):
+    return round(values[min(int(len(values) * fraction), len(values) - 1)], 2) if values else None
+
+
+def _init_worker(example_slots, workers: int):
+    global _example_slots
+    _example_slots = example_slots
+    from tests.rate_limits import share_limits
+    # Workers run side by side against the same provider accounts
+    share_limits(workers)
+
+
+async def _evaluate_configuration(run_evaluate, overrides: dict, experiment_prefix: str, max_concurrency: int) -> dict:
+    started = time.perf_counter()
+    results, rows = await run_evaluate.run_experiment(overrides, experiment_prefix, max_concurrency, _example_slots)
+    scores, latencies = {}, []
+    for row in rows:
+        if row["latency_s"] is not None:
+            latencies.append(row["latency_s"])
+        for key, score in row["scores"].items():
+            scores.setdefault(key, []).append(float(score))
+    wall_seconds = time.perf_counter() - started
+    if run_evaluate.cassette.mode != run_evaluate.REPLAY:
+        run_evaluate.attach_to_experiment(run_evaluate.client, results.experiment_name, run_evaluate.cost_meter, run_evaluate.examples_run)
+    totals = run_evaluate.cost_meter.totals()
+    latencies.sort()
+    examples = run_evaluate.examples_run
+    return {
+        "experiment_name": results.experiment_name,
+        "status": "ok",
+        "examples": examples,
+        "wall_seconds": round(wall_seconds, 1),
+        "latency_mean_s": round(sum(latencies) / len(latencies), 2) if latencies else None,
+        "latency_p50_s": _percentile(latencies, 0.5),
+        "latency_p95_s": _percentile(latencies, 0.95),
+        "total_cost_usd": totals["total_cost_usd"],
+        "cost_per_example_usd": round(totals["total_cost_usd"] / examples, 4) if examples else None,
+        "cached_token_rate": totals["cached_token_rate"],
+        **{key: round(sum(values) / len(values), 4) for key, values in scores.items()},
+    }
+
+
+def run_configuration(overrides: dict, experiment_prefix: str, max_concurrency: int) -> dict:
+    # Imported in the worker: compiles the graph and opens the shared caches in this process only
+    from tests import run_evaluate
+    return asyncio.run(_evaluate_configuration(run_evaluate, overrides, experiment_prefix, max_concurrency))
+
+
+def load_table(path: str) -> dict[str, dict]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, newline="", encoding="utf-8") as f:
+        return {row["config_id"]: row for row in csv.DictReader(f)}
+
+
+def write_table(path: str, rows: dict[str, dict], config_columns: list[str]) -> None:
+    score_columns = sorted({key for row in rows.values() for key in row} - set(RESULT_COLUMNS) - set(config_columns) - {"error"})
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_COLUMNS + config_columns + score_columns + ["error"], extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows.values())
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sweep run_evaluate experiment settings and collect one results table')
+    parser.add_argument('spec', help='JSON sweep spec (see the module docstring)')
+    parser.add_argument('--output', default='tests/expt_results/sweep_results.csv', help='Results table; configurations already in it are skipped')
+    parser.add_argument('--workers', type=int, default=2, help='Configurations evaluated at the same time')
+    parser.add_argument('--concurrency', type=int, default=10, help='Examples in flight across all workers')
+    parser.add_argument('--experiment-prefix', default='ODR sweep')
+    parser.add_argument('--dry-run', action='store_true', help='Only print the configurations')
+    args = parser.parse_args()
+
+    with open(args.spec, encoding="utf-8") as f:
+        configs = expand_spec(json.load(f))
+    config_columns = sorted({key for config in configs.values() for key in config})
+    rows = load_table(args.output)
+    pending = {cid: config for cid, config in configs.items() if rows.get(cid, {}).get("status") != "ok"}
+    print(f"{len(configs)} distinct configurations, {len(configs) - len(pending)} already in {args.output}, {len(pending)} to run")
+    if args.dry_run:
+        for cid, config in pending.items():
+            print(f"{cid}: {json.dumps(config, sort_keys=True)}")
+        return
+
+    with Manager() as manager:
+        example_slots = manager.BoundedSemaphore(args.concurrency)
+        with ProcessPoolExecutor(
+            max_workers=args.workers,
+            mp_context=get_context("spawn"),
+            # A fresh process per configuration keeps cost meters, rate limiters and counters separate
+            max_tasks_per_child=1,
+            initializer=_init_worker,
+            initargs=(example_slots, args.workers),
+        ) as executor:
+            futures = {
+                executor.submit(run_configuration, config, f"{args.experiment_prefix} {cid}", args.concurrency): cid
+                for cid, config in pending.items()
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                cid = futures[future]
+                try:
+                    result = future.result()
+                except Exception as error:
+                    result = {"status": "error", "error": repr(error)}
+                rows[cid] = {"config_id": cid, **configs[cid], **result}
+                write_table(args.output, rows, config_columns)
+                print(f"[{done}/{len(pending)}] {cid} {result['status']}: {result.get('experiment_name', result.get('error'))}")
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
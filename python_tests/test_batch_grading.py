@@ -0,0 +1,133 @@
+"""Multi-round batch grading against the local batch stand-in, including a restart from the state file."""
+
+import json
+import os
+import threading
+import uuid
+from http.server import ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("langchain_openai")
+pytest.importorskip("langchain_anthropic")
+# The judges are built at import time; the stand-in never checks the keys
+os.environ.setdefault("OPENAI_API_KEY", "stand-in")
+os.environ.setdefault("ANTHROPIC_API_KEY", "stand-in")
+
+from tests.batch_grading import batch_grade_experiment, load_state, make_batch_apis
+from tests.batch_standin_server import StandInBatches, make_handler
+from tests.evaluators import eval_groundedness_chunked, eval_relevance
+from tests.judge_cache import judge_cache
+
+
+class FakeClient:
+    """The few LangSmith client calls batch_grade_experiment makes, over in-memory runs."""
+
+    def __init__(self, count):
+        # Each run's notes mention the stand-in's placeholder claim, so every run gets its own verification context
+        self.runs = [
+            SimpleNamespace(
+                id=uuid.uuid4(),
+                inputs={"inputs": {"messages": [{"role": "user", "content": f"Question {index}"}]}},
+                outputs={"final_report": f"Report {index}", "raw_notes": [f"Notes for question {index}, quoted by the stand-in"]},
+                reference_example_id=uuid.uuid4(),
+            )
+            for index in range(count)
+        ]
+        self.feedback = []
+
+    def list_runs(self, **kwargs):
+        return self.runs
+
+    def list_examples(self, example_ids):
+        return [SimpleNamespace(id=example_id, outputs={"answer": "Answer"}) for example_id in example_ids]
+
+    def create_feedback(self, run_id, **kwargs):
+        self.feedback.append((run_id, kwargs))
+
+
+class CrashWhilePolling:
+    """Wraps a batch API so the run dies after submitting, before any result is read."""
+
+    def __init__(self, api):
+        self.api = api
+        self.provider = api.provider
+
+    def request_line(self, custom_id, call):
+        return self.api.request_line(custom_id, call)
+
+    def submit(self, lines):
+        return self.api.submit(lines)
+
+    def is_done(self, batch_id):
+        raise RuntimeError("process killed")
+
+
+@pytest.fixture
+def standin():
+    state = StandInBatches(complete_after=0.1)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1", state
+    server.shutdown()
+
+
+@pytest.fixture
+def fresh_judge_cache(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(judge_cache, "path", str(tmp_path / "judge_cache.sqlite"))
+    monkeypatch.setattr(judge_cache, "_conn", None)
+    monkeypatch.setattr(judge_cache, "enabled", True)
+
+
+def _forced_tools(batch):
+    return {request["body"]["tool_choice"]["function"]["name"] for request in batch["requests"]}
+
+
+def test_rounds_resume_after_a_restart_and_verify_claims_in_the_second_round(standin, fresh_judge_cache, tmp_path):
+    base_url, server_state = standin
+    client = FakeClient(3)
+    state_path = str(tmp_path / "batches" / "experiment.json")
+    evaluators = [eval_relevance, eval_groundedness_chunked]
+
+    crashing = make_batch_apis(base_url)
+    crashing["openai"] = CrashWhilePolling(crashing["openai"])
+    with pytest.raises(RuntimeError):
+        batch_grade_experiment(client, "experiment", evaluators, crashing, state_path, poll_seconds=0.05)
+    state = load_state(state_path)
+    assert [batch["done"] for batch in state["batches"]] == [False]
+    assert len(server_state.batches) == 1
+
+    feedback = batch_grade_experiment(client, "experiment", evaluators, make_batch_apis(base_url), state_path, poll_seconds=0.05)
+
+    # The restart polled the first batch instead of submitting it again, then claim verification followed in a second batch
+    batches = list(server_state.batches.values())
+    assert len(batches) == 2
+    assert _forced_tools(batches[0]) == {"RelevanceScore", "ExtractedClaims"}
+    assert _forced_tools(batches[1]) == {"ClaimVerification"}
+    assert len(batches[0]["requests"]) == 6
+    assert len(batches[1]["requests"]) == 3
+    assert all(batch["done"] for batch in load_state(state_path)["batches"])
+
+    assert set(feedback) == {run.id for run in client.runs}
+    for entries in feedback.values():
+        scores = {entry["key"]: entry["score"] for entry in entries}
+        assert scores["relevance_score"] == pytest.approx(0.6)
+        assert scores["groundedness_score"] == 1.0
+    assert len(client.feedback) == sum(len(entries) for entries in feedback.values())
+
+    # Everything is in the judge cache now, so grading again submits nothing
+    batch_grade_experiment(client, "experiment", evaluators, make_batch_apis(base_url), str(tmp_path / "again.json"), poll_seconds=0.05, upload=False)
+    assert len(server_state.batches) == 2
+
+
+def test_state_file_is_valid_json_after_every_round(standin, fresh_judge_cache, tmp_path):
+    base_url, _ = standin
+    state_path = str(tmp_path / "state.json")
+    batch_grade_experiment(FakeClient(1), "experiment", [eval_relevance], make_batch_apis(base_url), state_path, poll_seconds=0.05, upload=False)
+    with open(state_path, encoding="utf-8") as f:
+        state = json.load(f)
+    assert len(state["batches"]) == 1
+    assert set(state["attempts"].values()) == {1}
@@ -0,0 +1,43 @@
+"""Bulk export against the local LangSmith stand-in: projects run concurrently and each dataset is listed once."""
+
+import json
+import os
+
+import pytest
+
+pytest.importorskip("langsmith")
+
+from tests.extract_langsmith_data import bulk_extract_langsmith_data
+from tests.langsmith_standin_server import serve
+
+
+@pytest.fixture
+def standin():
+    server, state = serve(projects=6, datasets=2, examples=120, latency=0.05)
+    yield f"http://127.0.0.1:{server.server_address[1]}", state
+    server.shutdown()
+
+
+def test_bulk_export_is_concurrent_and_lists_each_dataset_once(standin, tmp_path, monkeypatch):
+    api_url, state = standin
+    monkeypatch.chdir(tmp_path)
+    paths = bulk_extract_langsmith_data(None, "stand_in", "stand-in", project_glob="stand-in-*", max_workers=4, api_url=api_url, store=None)
+
+    assert sorted(paths) == [f"stand-in-{index}" for index in range(6)]
+    for output_file_path in paths.values():
+        with open(output_file_path, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        assert len(records) == 120
+        assert len({record["id"] for record in records}) == 120
+    stats = state.stats()
+    assert stats["max_concurrent_run_queries"] > 1
+    assert set(stats["example_listings"].values()) == {1}
+
+
+def test_incremental_export_adds_nothing_when_up_to_date(standin, tmp_path, monkeypatch):
+    api_url, _ = standin
+    monkeypatch.chdir(tmp_path)
+    paths = bulk_extract_langsmith_data(["stand-in-0", "stand-in-1"], "stand_in", "stand-in", max_workers=2, incremental=True, api_url=api_url, store=None, output_format="both")
+    sizes = {path: os.path.getsize(path) for path in paths.values()}
+    bulk_extract_langsmith_data(["stand-in-0", "stand-in-1"], "stand_in", "stand-in", max_workers=2, incremental=True, api_url=api_url, store=None, output_format="both")
+    assert {path: os.path.getsize(path) for path in paths.values()} == sizes
@@ -0,0 +1,34 @@
+"""Default evaluator selection for concurrent per-example grading."""
+
+import asyncio
+import os
+
+import pytest
+
+pytest.importorskip("langchain_openai")
+# The judges are built at import time and never called here
+os.environ.setdefault("OPENAI_API_KEY", "stand-in")
+os.environ.setdefault("ANTHROPIC_API_KEY", "stand-in")
+
+import tests.evaluators as evaluators
+from tests.evaluators import default_evaluators, eval_groundedness, eval_groundedness_chunked
+
+
+@pytest.mark.parametrize("mode, groundedness", [("chunked", eval_groundedness_chunked), ("full", eval_groundedness)])
+def test_default_evaluators_grade_groundedness_once(monkeypatch, mode, groundedness):
+    monkeypatch.setattr(evaluators, "groundedness_mode", mode)
+    selected = default_evaluators()
+    assert groundedness in selected
+    assert len({eval_groundedness, eval_groundedness_chunked} & set(selected)) == 1
+    assert len(selected) == len(set(selected)) == 6
+
+
+def test_agrade_example_emits_each_key_once_by_default(monkeypatch):
+    async def fake_run(evaluator, inputs, outputs, reference_outputs):
+        return {"key": "groundedness_score" if "groundedness" in evaluator.__name__ else evaluator.__name__, "score": 1.0}
+
+    monkeypatch.setattr(evaluators, "_arun_evaluator", fake_run)
+    feedback = asyncio.run(evaluators.agrade_example({}, {}))
+    keys = [entry["key"] for entry in feedback]
+    assert keys.count("groundedness_score") == 1
+    assert len(keys) == len(set(keys))
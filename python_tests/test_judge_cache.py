@@ -0,0 +1,91 @@
+"""Keys, lookups and eviction of the on-disk judge cache."""
+
+from types import SimpleNamespace
+
+import pytest
+from pydantic import BaseModel
+
+import tests.judge_cache as judge_cache_module
+from tests.judge_cache import JudgeCache
+
+
+class Verdict(BaseModel):
+    score: int
+    reasoning: str
+
+
+class FakeJudge:
+    _llm_type = "fake-chat"
+
+    def __init__(self, temperature=0.0):
+        self._identifying_params = {"model": "judge-1", "temperature": temperature}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(value=1_000_000.0)
+    monkeypatch.setattr(judge_cache_module, "time", SimpleNamespace(time=lambda: now.value))
+    return now
+
+
+def _cache(tmp_path, **settings):
+    return JudgeCache(path=str(tmp_path / "judge_cache.sqlite"), enabled=True, **settings)
+
+
+def test_key_covers_model_settings_template_and_fields(tmp_path):
+    cache = _cache(tmp_path)
+    key = cache.key(Verdict, FakeJudge(), "Grade {report}", {"report": "text"})
+    assert key == cache.key(Verdict, FakeJudge(), "Grade {report}", {"report": "text"})
+    assert key != cache.key(Verdict, FakeJudge(temperature=1.0), "Grade {report}", {"report": "text"})
+    assert key != cache.key(Verdict, FakeJudge(), "Score {report}", {"report": "text"})
+    assert key != cache.key(Verdict, FakeJudge(), "Grade {report}", {"report": "other"})
+
+
+def test_round_trip_and_stats(tmp_path, clock):
+    cache = _cache(tmp_path)
+    assert cache.get("missing", Verdict) is None
+    cache.put("key", Verdict(score=4, reasoning="fine"))
+    assert cache.get("key", Verdict) == Verdict(score=4, reasoning="fine")
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = JudgeCache(path=str(tmp_path / "judge_cache.sqlite"), enabled=False)
+    cache.put("key", Verdict(score=4, reasoning="fine"))
+    cache.enabled = True
+    assert cache.get("key", Verdict) is None
+
+
+def test_expired_entries_miss_and_are_evicted(tmp_path, clock):
+    cache = _cache(tmp_path, max_age_days=1)
+    cache.put("old", Verdict(score=1, reasoning="old"))
+    clock.value += 2 * 24 * 3600
+    cache.put("new", Verdict(score=2, reasoning="new"))
+    assert cache.get("old", Verdict) is None
+    cache.evict()
+    assert cache._connection().execute("SELECT key FROM judge_results").fetchall() == [("new",)]
+
+
+def test_least_recently_used_entries_are_evicted_to_the_size_cap(tmp_path, clock):
+    result = Verdict(score=3, reasoning="x" * 100)
+    size = len(result.model_dump_json())
+    cache = _cache(tmp_path, max_bytes=3 * size)
+    for key in ("a", "b", "c", "d", "e"):
+        clock.value += 1
+        cache.put(key, result)
+    clock.value += 1
+    assert cache.get("a", Verdict) == result
+    cache.evict()
+    remaining = {row[0] for row in cache._connection().execute("SELECT key FROM judge_results")}
+    assert remaining == {"a", "d", "e"}
+
+
+def test_contains_does_not_count_a_lookup(tmp_path, clock):
+    cache = _cache(tmp_path, max_age_days=1)
+    cache.put("key", Verdict(score=4, reasoning="fine"))
+    assert cache.contains("key")
+    assert not cache.contains("missing")
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (0, 0)
+    clock.value += 2 * 24 * 3600
+    assert not cache.contains("key")
@@ -0,0 +1,50 @@
+"""Projection of target outputs and spilling of large fields to disk."""
+
+import os
+
+import pytest
+
+import tests.output_projection as output_projection
+from tests.output_projection import SPILL_MIN_BYTES, is_spilled, project_outputs, resolve_output, spill
+
+STATE = {"messages": ["hi"], "final_report": "report", "raw_notes": ["note"]}
+
+
+@pytest.fixture(autouse=True)
+def spill_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(output_projection, "SPILL_DIR", str(tmp_path / "spill"))
+    output_projection._load_spilled.cache_clear()
+    yield tmp_path / "spill"
+    output_projection._load_spilled.cache_clear()
+
+
+def test_projects_onto_requested_fields():
+    assert project_outputs(STATE, ["final_report", "missing"]) == {"final_report": "report"}
+    assert project_outputs(STATE, None) == STATE
+
+
+def test_small_fields_are_kept_inline(spill_dir):
+    assert project_outputs(STATE, ["raw_notes"]) == {"raw_notes": ["note"]}
+    assert not spill_dir.exists()
+
+
+def test_large_fields_are_spilled_and_resolved():
+    notes = ["n" * 1024] * (SPILL_MIN_BYTES // 1024 + 1)
+    outputs = project_outputs({**STATE, "raw_notes": notes}, ["final_report", "raw_notes"])
+    assert is_spilled(outputs["raw_notes"])
+    assert outputs["raw_notes"]["bytes"] >= SPILL_MIN_BYTES
+    assert resolve_output(outputs, "raw_notes") == notes
+    assert resolve_output(outputs, "final_report") == "report"
+    # An already spilled field is passed through as is
+    assert project_outputs(outputs, None) == outputs
+
+
+def test_spill_is_content_addressed(spill_dir):
+    first = spill({"notes": ["a"]})
+    assert spill({"notes": ["a"]}) == first
+    assert spill({"notes": ["b"]}) != first
+    assert len([name for _, _, names in os.walk(spill_dir) for name in names]) == 2
+
+
+def test_spill_keeps_values_below_min_bytes():
+    assert spill(["short"], min_bytes=1024) == ["short"]
@@ -0,0 +1,71 @@
+"""Judge cache reuse across presentation orders of the same answers."""
+
+import pytest
+
+import tests.pairwise_evaluation as pairwise_evaluation
+from tests.judge_cache import JudgeCache
+from tests.pairwise_evaluation import HEAD_TO_HEAD_PROMPT, REMAPPED_REASONING_NOTE, HeadToHeadRanking, Rankings, _remap_positions
+
+FIELDS = {"question": "Which grid storage option is cheapest?", "answer_a": "Pumped hydro report", "answer_b": "Lithium-ion report"}
+
+
+class FakeJudge:
+    _llm_type = "fake-chat"
+    _identifying_params = {"model": "judge-1"}
+
+
+class PrefersAnswer:
+    """Structured judge that always prefers a fixed report, wherever it is shown."""
+
+    def __init__(self, report, calls):
+        self.report = report
+        self.calls = calls
+
+    def invoke(self, messages, config=None):
+        self.calls.append(messages)
+        content = messages[0]["content"]
+        first = content.index(FIELDS["answer_a"]) < content.index(FIELDS["answer_b"])
+        preferred = 1 if (self.report == FIELDS["answer_a"]) == first else 2
+        return HeadToHeadRanking(reasoning=f"Answer {preferred} cites more sources.", preferred_answer=preferred)
+
+
+@pytest.fixture
+def calls(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(pairwise_evaluation, "judge_cache", JudgeCache(path=str(tmp_path / "judge_cache.sqlite"), enabled=True))
+    monkeypatch.setattr(pairwise_evaluation, "structured_judge", lambda judge, schema: PrefersAnswer(FIELDS["answer_b"], calls))
+    return calls
+
+
+def _judge(fields):
+    return pairwise_evaluation._cached_judge(FakeJudge(), HeadToHeadRanking, HEAD_TO_HEAD_PROMPT, fields)
+
+
+def test_swapped_order_reuses_the_cached_verdict_with_mirrored_scores(calls):
+    swapped = {**FIELDS, "answer_a": FIELDS["answer_b"], "answer_b": FIELDS["answer_a"]}
+    results = [_judge(FIELDS), _judge(swapped)]
+    assert len(calls) == 1
+    assert [result.preferred_answer for result in results] == [2, 1]
+    # The reused reasoning still numbers the answers as the judge saw them, so it is flagged
+    assert not results[0].reasoning.startswith(REMAPPED_REASONING_NOTE)
+    assert results[1].reasoning == REMAPPED_REASONING_NOTE + results[0].reasoning
+
+
+def test_same_order_from_the_cache_matches_the_fresh_verdict(calls):
+    fresh = _judge(FIELDS)
+    assert _judge(FIELDS).preferred_answer == fresh.preferred_answer == 2
+    assert len(calls) == 1
+
+
+def test_remap_positions_rewrites_every_position_and_flags_reasoning():
+    verdict = Rankings(reasoning="Answer 1 is best, answer 3 is worst.", preferred_answer=1, second_best_answer=2, worst_answer=3)
+    remapped = _remap_positions(verdict, [2, 0, 1])
+    assert (remapped.preferred_answer, remapped.second_best_answer, remapped.worst_answer) == (3, 1, 2)
+    assert remapped.reasoning == REMAPPED_REASONING_NOTE + verdict.reasoning
+    # Remapping again does not stack the note
+    assert _remap_positions(remapped, [1, 2, 0]).reasoning == remapped.reasoning
+
+
+def test_identity_mapping_leaves_the_verdict_alone():
+    verdict = HeadToHeadRanking(reasoning="Answer 1 is better.", preferred_answer=1)
+    assert _remap_positions(verdict, [0, 1]) == verdict
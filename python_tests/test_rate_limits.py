@@ -0,0 +1,155 @@
+"""AIMD concurrency limits, token buckets and slot bookkeeping of the rate limiter."""
+
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+import tests.rate_limits as rate_limits
+from tests.rate_limits import QUEUE_WAIT_SAMPLES, STALE_CALL_SECONDS, ProviderController, RateLimitCallbackHandler, TokenBucket
+
+LIMITS = {"rpm": 6000, "tpm": 1_000_000, "initial_concurrency": 4, "max_concurrency": 6}
+
+
+class Throttled(Exception):
+    status_code = 429
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(rate_limits, "time", SimpleNamespace(monotonic=lambda: now.value))
+    return now
+
+
+def test_token_bucket_refills_continuously_up_to_one_minute(clock):
+    bucket = TokenBucket(60)
+    bucket.take(60)
+    assert bucket.wait_time(1) == pytest.approx(1.0)
+    clock.value += 0.5
+    assert bucket.wait_time(1) == pytest.approx(0.5)
+    clock.value += 600
+    assert bucket.wait_time(60) == 0.0
+    assert bucket.available == 60
+    # Requests larger than the capacity wait for a full bucket, not forever
+    bucket.take(60)
+    assert bucket.wait_time(1000) == pytest.approx(60.0)
+
+
+def test_admission_stops_at_the_concurrency_limit(clock):
+    controller = ProviderController("openai", **LIMITS)
+    assert [controller.try_admit(10) for _ in range(4)] == [0.0] * 4
+    assert controller.try_admit(10) == rate_limits._POLL_SECONDS
+    controller.release(1.0, 10, 10)
+    assert controller.try_admit(10) == 0.0
+
+
+def test_successful_calls_grow_the_limit_up_to_the_maximum(clock):
+    controller = ProviderController("openai", **LIMITS)
+    for _ in range(4):
+        controller.in_flight += 1
+        controller.release(1.0, 10, 10)
+    # Additive increase: about one slot per window of limit successful calls
+    assert controller.limit == pytest.approx(4.95, abs=0.05)
+    for _ in range(100):
+        controller.in_flight += 1
+        controller.release(1.0, 10, 10)
+    assert controller.limit == LIMITS["max_concurrency"]
+
+
+def test_burst_of_throttles_halves_once_per_latency_window(clock):
+    controller = ProviderController("openai", **LIMITS)
+    controller.in_flight += 1
+    controller.release(2.0, 10, 10)
+    limit = controller.limit
+    for _ in range(5):
+        controller.in_flight += 1
+        controller.release(0.1, 10, None, throttled=True)
+    assert controller.limit == pytest.approx(limit / 2)
+    assert (controller.throttled, controller.decreases) == (5, 1)
+    clock.value += 2.5
+    controller.in_flight += 1
+    controller.release(0.1, 10, None, throttled=True)
+    assert controller.limit == pytest.approx(limit / 4)
+    clock.value += 2.5
+    controller.in_flight += 1
+    controller.release(0.1, 10, None, throttled=True)
+    assert controller.limit == controller.min_concurrency
+
+
+def test_latency_spike_halves_the_limit(clock):
+    controller = ProviderController("openai", **LIMITS)
+    controller.in_flight += 2
+    controller.release(1.0, 10, 10)
+    limit = controller.limit
+    clock.value += 5
+    controller.release(10.0, 10, 10)
+    assert controller.limit == pytest.approx(limit / 2)
+    assert controller.throttled == 0
+
+
+def test_reported_usage_corrects_the_token_estimate(clock):
+    controller = ProviderController("openai", **LIMITS)
+    controller.try_admit(100)
+    controller.release(1.0, 100, 400)
+    assert controller.tokens.available == pytest.approx(LIMITS["tpm"] - 400)
+
+
+def test_queue_wait_samples_are_bounded(clock):
+    controller = ProviderController("openai", **LIMITS)
+    for index in range(QUEUE_WAIT_SAMPLES + 10):
+        controller.record_queue_wait(index / 1000)
+    assert len(controller.queue_waits) == QUEUE_WAIT_SAMPLES
+    summary = controller.summary()
+    assert summary["calls"] == QUEUE_WAIT_SAMPLES + 10
+    assert summary["queue_wait_max_s"] == pytest.approx((QUEUE_WAIT_SAMPLES + 9) / 1000)
+
+
+def _start(handler, run_id):
+    return handler.on_chat_model_start(None, [["Grade this report"]], run_id=run_id, metadata={"ls_provider": "openai"})
+
+
+def test_cancelled_call_gives_back_its_slot(clock):
+    handler = RateLimitCallbackHandler({"openai": {**LIMITS, "initial_concurrency": 1}})
+    run_id = uuid.uuid4()
+
+    async def scenario():
+        await _start(handler, run_id)
+        controller = handler.controller("openai")
+        assert controller.in_flight == 1
+        await handler.on_llm_error(asyncio.CancelledError(), run_id=run_id)
+        assert controller.in_flight == 0
+        # A second cancellation callback for the same run does not free a slot twice
+        await handler.on_llm_error(asyncio.CancelledError(), run_id=run_id)
+        await _start(handler, uuid.uuid4())
+        return controller
+
+    controller = asyncio.run(scenario())
+    assert (controller.in_flight, controller.abandoned, controller.limit) == (1, 1, 1.0)
+
+
+def test_stale_call_is_expired_while_another_call_waits(clock):
+    handler = RateLimitCallbackHandler({"openai": {**LIMITS, "initial_concurrency": 1}})
+
+    async def scenario():
+        await _start(handler, uuid.uuid4())
+        clock.value += STALE_CALL_SECONDS + 1
+        await asyncio.wait_for(_start(handler, uuid.uuid4()), timeout=5)
+
+    asyncio.run(scenario())
+    controller = handler.controller("openai")
+    assert (controller.in_flight, controller.abandoned) == (1, 1)
+
+
+def test_throttle_errors_release_their_slot_as_throttled(clock):
+    handler = RateLimitCallbackHandler({"openai": LIMITS})
+    run_id = uuid.uuid4()
+
+    async def scenario():
+        await _start(handler, run_id)
+        await handler.on_llm_error(Throttled(), run_id=run_id)
+
+    asyncio.run(scenario())
+    controller = handler.controller("openai")
+    assert (controller.in_flight, controller.throttled, controller.decreases) == (0, 1, 1)
@@ -0,0 +1,82 @@
+"""Frame and index format of the compressed record archive."""
+
+import json
+
+import pytest
+
+from tests.record_archive import INDEX_VERSION, ArchiveReader, ArchiveWriter, archive_path_for, index_path_for
+
+RECORDS = [{"id": f"run-{index}", "outputs": {"final_report": "report " * index}} for index in range(50)]
+
+
+@pytest.fixture
+def archive(tmp_path):
+    path = archive_path_for(str(tmp_path / "runs.jsonl"), "zlib")
+    with ArchiveWriter(path, codec="zlib") as writer:
+        for record in RECORDS:
+            writer.write(record)
+    return path
+
+
+def test_round_trip(archive):
+    reader = ArchiveReader(archive, workers=2)
+    assert len(reader) == len(RECORDS)
+    assert "run-7" in reader
+    assert reader.get("run-7") == RECORDS[7]
+    assert reader.get_many(["run-3", "run-40"]) == {"run-3": RECORDS[3], "run-40": RECORDS[40]}
+    assert list(reader) == RECORDS
+    assert reader.stats()["records"] == len(RECORDS)
+    assert reader.stats()["codec"] == "zlib"
+
+
+def test_index_format(archive):
+    with open(index_path_for(archive), encoding="utf-8") as f:
+        index = json.load(f)
+    assert index["version"] == INDEX_VERSION
+    assert index["codec"] == "zlib"
+    keys = [key for key, _, _ in index["entries"]]
+    assert keys == [record["id"] for record in RECORDS]
+    # Frames are laid out back to back
+    ends = [offset + length for _, offset, length in index["entries"]]
+    assert [offset for _, offset, _ in index["entries"]][1:] == ends[:-1]
+
+
+def test_unsupported_index_version_is_rejected(archive):
+    index_path = index_path_for(archive)
+    with open(index_path, encoding="utf-8") as f:
+        index = json.load(f)
+    index["version"] = INDEX_VERSION + 1
+    with open(index_path, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    with pytest.raises(ValueError):
+        ArchiveReader(archive)
+
+
+def test_rewritten_id_points_at_newest_frame(archive):
+    with ArchiveWriter(archive, append=True) as writer:
+        writer.write({"id": "run-7", "outputs": {"final_report": "rewritten"}})
+    reader = ArchiveReader(archive)
+    assert len(reader) == len(RECORDS)
+    assert reader.get("run-7")["outputs"]["final_report"] == "rewritten"
+
+
+def test_append_truncates_frames_written_after_the_last_index(archive):
+    size = ArchiveReader(archive).stats()["file_bytes"]
+    # A writer that crashed before saving its index leaves unreferenced frames behind
+    crashed = ArchiveWriter(archive, append=True)
+    crashed.write({"id": "run-lost"})
+    crashed._file.close()
+    with ArchiveWriter(archive, append=True) as writer:
+        assert writer.ids() == {record["id"] for record in RECORDS}
+        writer.write({"id": "run-50"})
+    reader = ArchiveReader(archive)
+    assert "run-lost" not in reader
+    assert reader.get("run-50") == {"id": "run-50"}
+    assert reader.entries["run-50"][0] == size
+
+
+def test_to_jsonl(archive, tmp_path):
+    output_path = str(tmp_path / "export.jsonl")
+    assert ArchiveReader(archive).to_jsonl(output_path) == len(RECORDS)
+    with open(output_path, encoding="utf-8") as f:
+        assert [json.loads(line) for line in f] == RECORDS
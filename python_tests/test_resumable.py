@@ -0,0 +1,75 @@
+"""Run ledger and checkpoint pruning for resumable evaluation runs."""
+
+import sqlite3
+
+from tests.resumable import RunLedger, prune_checkpoints, run_key_for, thread_id_for
+
+
+def test_run_key_and_thread_id_are_deterministic():
+    key = run_key_for("bench", {"model": "a", "retries": 3})
+    assert key == run_key_for("bench", {"retries": 3, "model": "a"})
+    assert key != run_key_for("bench", {"model": "b", "retries": 3})
+    assert thread_id_for(key, "example-1") == thread_id_for(key, "example-1")
+    assert thread_id_for(key, "example-1") != thread_id_for(key, "example-2")
+
+
+def test_ledger_tracks_experiment_and_completed_examples(tmp_path):
+    path = str(tmp_path / "ledger.sqlite")
+    ledger = RunLedger(path)
+    ledger.start_run("run", {"model": "a"})
+    assert ledger.experiment_for("run") is None
+    ledger.set_experiment("run", "experiment-1")
+    ledger.mark_completed("run", "example-1")
+    ledger.mark_completed("run", "example-1")
+    ledger.mark_completed("run", "example-2")
+    # Starting the same run again keeps its experiment and progress
+    ledger.start_run("run", {"model": "a"})
+
+    reopened = RunLedger(path)
+    assert reopened.experiment_for("run") == "experiment-1"
+    assert reopened.completed("run") == {"example-1", "example-2"}
+    assert [(run["run_key"], run["completed"]) for run in reopened.runs()] == [("run", 2)]
+
+    reopened.forget("run")
+    assert reopened.completed("run") == set()
+    assert reopened.experiment_for("run") is None
+
+
+def _checkpoint_file(path, rows):
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE checkpoints (thread_id TEXT, checkpoint_ns TEXT, checkpoint_id TEXT, checkpoint BLOB)")
+    connection.execute("CREATE TABLE writes (thread_id TEXT, checkpoint_ns TEXT, checkpoint_id TEXT, task_id TEXT, value BLOB)")
+    for thread_id, namespace, checkpoint_id in rows:
+        connection.execute("INSERT INTO checkpoints VALUES (?, ?, ?, ?)", (thread_id, namespace, checkpoint_id, b"x" * 1000))
+        connection.execute("INSERT INTO writes VALUES (?, ?, ?, ?, ?)", (thread_id, namespace, checkpoint_id, "task", b"y"))
+    connection.commit()
+    connection.close()
+
+
+def _rows(path, table):
+    connection = sqlite3.connect(path)
+    try:
+        return sorted(connection.execute(f"SELECT thread_id, checkpoint_ns, checkpoint_id FROM {table}"))
+    finally:
+        connection.close()
+
+
+def test_prune_keeps_latest_checkpoint_of_unfinished_threads(tmp_path):
+    path = str(tmp_path / "checkpoints.sqlite")
+    _checkpoint_file(path, [
+        ("done", "", "1"), ("done", "", "2"),
+        ("interrupted", "", "1"), ("interrupted", "", "2"), ("interrupted", "", "3"),
+        ("interrupted", "subgraph", "1"), ("interrupted", "subgraph", "2"),
+    ])
+    summary = prune_checkpoints(path, ("done",))
+    expected = [("interrupted", "", "3"), ("interrupted", "subgraph", "2")]
+    assert _rows(path, "checkpoints") == expected
+    assert _rows(path, "writes") == expected
+    assert summary["threads_deleted"] == 1
+    assert summary["checkpoints_deleted"] == 3
+    assert summary["bytes_after"] <= summary["bytes_before"]
+
+
+def test_prune_without_a_checkpoint_file(tmp_path):
+    summary = prune_checkpoints(str(tmp_path / "missing.sqlite"))
+    assert summary == {"threads_deleted": 0, "checkpoints_deleted": 0, "bytes_before": 0, "bytes_after": 0}
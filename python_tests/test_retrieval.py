@@ -0,0 +1,53 @@
+"""Lexical pre-check that settles verbatim groundedness claims without a judge call."""
+
+import pytest
+
+from tests.retrieval import LexicalGroundingIndex
+
+NOTES = [
+    "According to the IEA (https://www.iea.org/reports/renewables-2023), global investment in solar photovoltaic "
+    "capacity increased sharply in 2023 across Europe, Asia and Latin America, reaching 380 billion USD [1].",
+    "Battery storage deployments doubled in the United States during 2023.",
+    "Offshore wind output was higher than expected in the North Sea.",
+]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return LexicalGroundingIndex(NOTES)
+
+
+@pytest.mark.parametrize("claim", [
+    "Global investment in solar photovoltaic capacity increased sharply in 2023 [1].",
+    "Global investment in solar photovoltaic capacity increased sharply in 2023 across Europe, Asia and Latin America.",
+    "Battery storage deployments doubled in the United States during 2023 (https://www.iea.org/reports/renewables-2023).",
+])
+def test_verbatim_claims_are_settled(index, claim):
+    assert index.is_grounded(claim)
+
+
+@pytest.mark.parametrize("claim", [
+    # Negations, even when the rest of the claim is quoted
+    "Global investment in solar photovoltaic capacity did not increase sharply in 2023.",
+    "Global investment in solar photovoltaic capacity increased sharply in 2023 across Europe and Asia but not Latin America.",
+    "Global investment in solar photovoltaic capacity didn't increase sharply in 2023.",
+    # A content word the notes never use
+    "Global investment in wind capacity increased sharply in 2023 across Europe.",
+    # Comparatives are judged even when quoted verbatim
+    "Offshore wind output was higher than expected in the North Sea.",
+    # Words from the notes, but not in this order
+    "Global investment in solar photovoltaic capacity increased sharply across Asia in 2023.",
+    # Stitched together from two notes
+    "Latin America reaching 380 billion USD battery storage deployments doubled.",
+    # Numbers and URLs must appear in the notes
+    "Global investment in solar photovoltaic capacity increased sharply in 2024.",
+    "Battery storage deployments doubled in the United States (https://example.com/storage).",
+    # Too short to be distinctive
+    "Battery storage deployments doubled.",
+])
+def test_everything_else_goes_to_the_judge(index, claim):
+    assert not index.is_grounded(claim)
+
+
+def test_single_string_notes():
+    assert LexicalGroundingIndex(NOTES[1]).is_grounded("Battery storage deployments doubled in the United States.")
@@ -0,0 +1,95 @@
+"""Stopping rule of the sequential head-to-head comparison."""
+
+import random
+
+import pytest
+
+from tests.sequential_comparison import SequentialComparison, compare_sequentially
+
+
+def _run(win_rate, rng, examples=100, batch=4, **settings):
+    comparison = SequentialComparison(**settings)
+    for start in range(0, examples, batch):
+        for _ in range(min(batch, examples - start)):
+            comparison.record([1, 0] if rng.random() < win_rate else [0, 1])
+        decision = comparison.decision()
+        if decision is not None:
+            return decision
+    return "undecided"
+
+
+def test_no_decision_before_min_examples():
+    comparison = SequentialComparison(min_examples=20)
+    for _ in range(19):
+        comparison.record([1, 0])
+    assert comparison.decision() is None
+    comparison.record([1, 0])
+    assert comparison.decision() == "A"
+
+
+def test_clear_winner_in_either_direction():
+    for scores, winner in (([1, 0], "A"), ([0, 1], "B")):
+        comparison = SequentialComparison()
+        while comparison.decision() is None:
+            comparison.record(scores)
+        assert comparison.decision() == winner
+        assert comparison.judged < 20
+
+
+def test_ties_count_half_and_reach_a_tie():
+    comparison = SequentialComparison()
+    while comparison.decision() is None:
+        comparison.record([1, 1])
+    assert comparison.decision() == "tie"
+    assert comparison.wins_a == comparison.wins_b
+    assert comparison.judged <= comparison.expected_examples_to_tie()
+
+
+def test_tie_is_reachable_within_a_100_example_dataset():
+    assert SequentialComparison().expected_examples_to_tie() < 100
+
+
+def test_false_winner_rate_between_equal_experiments_stays_below_alpha():
+    rng = random.Random(0)
+    decisions = [_run(0.5, rng, alpha=0.05) for _ in range(2000)]
+    assert (decisions.count("A") + decisions.count("B")) / len(decisions) <= 0.05
+    assert decisions.count("tie") / len(decisions) > 0.5
+
+
+def test_real_difference_is_usually_found():
+    rng = random.Random(1)
+    decisions = [_run(0.7, rng) for _ in range(500)]
+    assert decisions.count("A") / len(decisions) > 0.8
+    assert "B" not in decisions
+
+
+def test_tie_margin_must_leave_room_on_both_sides():
+    with pytest.raises(ValueError):
+        SequentialComparison(tie_margin=0.5)
+
+
+def test_compare_sequentially_undoes_swapped_presentation():
+    outputs_a = {index: ({"question": index}, {"name": "a"}) for index in range(60)}
+    outputs_b = {index: ({"question": index}, {"name": "b"}) for index in range(60)}
+
+    def judge(inputs, outputs):
+        return [1, 0] if outputs[0]["name"] == "a" else [0, 1]
+
+    result = compare_sequentially(outputs_a, outputs_b, judge=judge, max_workers=2)
+    assert result["decision"] == "A"
+    assert result["wins_b"] == 0
+
+
+def test_failed_judge_calls_skip_only_their_example():
+    outputs_a = {index: ({"question": index}, {"name": "a"}) for index in range(60)}
+    outputs_b = {index: ({"question": index}, {"name": "b"}) for index in range(60)}
+
+    def judge(inputs, outputs):
+        if inputs["question"] % 3 == 0:
+            raise TimeoutError("judge timed out")
+        return [1, 0] if outputs[0]["name"] == "a" else [0, 1]
+
+    result = compare_sequentially(outputs_a, outputs_b, judge=judge, max_workers=2)
+    assert result["decision"] == "A"
+    assert result["examples_skipped"] > 0
+    assert result["examples_judged"] == result["wins_a"]
@@ -0,0 +1,39 @@
+"""Hash partitioning of dataset examples across shards."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from tests.sharding import parse_shard, shard_examples, shard_group_for, shard_of
+
+
+@pytest.mark.parametrize("value, expected", [("0/1", (0, 1)), ("3/4", (3, 4))])
+def test_parse_shard(value, expected):
+    assert parse_shard(value) == expected
+
+
+@pytest.mark.parametrize("value", ["4/4", "-1/4", "0/0", "a/4", "2"])
+def test_parse_shard_rejects_invalid_shards(value):
+    with pytest.raises(ValueError):
+        parse_shard(value)
+
+
+def test_every_example_lands_in_exactly_one_shard():
+    examples = [SimpleNamespace(id=f"example-{index}") for index in range(200)]
+    shards = [list(shard_examples(examples, index, 4)) for index in range(4)]
+    assert sorted(example.id for shard in shards for example in shard) == sorted(example.id for example in examples)
+    assert all(shards)
+
+
+def test_shard_of_is_stable_and_in_range():
+    assert shard_of("example-1", 7) == shard_of("example-1", 7)
+    assert {shard_of(f"example-{index}", 7) for index in range(100)} == set(range(7))
+
+
+def test_shard_group_depends_on_dataset_settings_and_count():
+    group = shard_group_for("bench", {"model": "a", "retries": 3}, 4)
+    assert group == shard_group_for("bench", {"retries": 3, "model": "a"}, 4)
+    assert group.startswith("shards-")
+    assert group != shard_group_for("bench", {"model": "b", "retries": 3}, 4)
+    assert group != shard_group_for("bench", {"model": "a", "retries": 3}, 2)
+    assert group != shard_group_for("other", {"model": "a", "retries": 3}, 4)
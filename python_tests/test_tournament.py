@@ -0,0 +1,93 @@
+"""Bradley-Terry fit and the adaptive tournament's stopping and scheduling."""
+
+import random
+from itertools import combinations
+
+import pytest
+
+from tests.tournament import Tournament, difference_distribution, fit_bradley_terry, log_strength_covariance
+
+STRENGTHS = {"a": 4.0, "b": 2.0, "c": 1.0}
+
+
+def _expected_wins(games_per_pair=200):
+    wins = {i: {j: 0.0 for j in STRENGTHS} for i in STRENGTHS}
+    for i, j in combinations(STRENGTHS, 2):
+        share = STRENGTHS[i] / (STRENGTHS[i] + STRENGTHS[j])
+        wins[i][j] = games_per_pair * share
+        wins[j][i] = games_per_pair * (1 - share)
+    return wins
+
+
+def test_fit_recovers_strength_ratios():
+    strengths = fit_bradley_terry(list(STRENGTHS), _expected_wins(), prior=0.0, iterations=500)
+    assert strengths["a"] / strengths["b"] == pytest.approx(2.0, rel=1e-3)
+    assert strengths["b"] / strengths["c"] == pytest.approx(2.0, rel=1e-3)
+    assert sum(strengths.values()) == pytest.approx(len(STRENGTHS))
+
+
+def test_prior_keeps_unbeaten_strengths_finite():
+    names = ["a", "b"]
+    wins = {"a": {"a": 0.0, "b": 5.0}, "b": {"a": 0.0, "b": 0.0}}
+    strengths = fit_bradley_terry(names, wins)
+    assert strengths["a"] > strengths["b"] > 0
+
+
+def test_posterior_narrows_with_more_games():
+    names = list(STRENGTHS)
+    spreads = []
+    for games in (20, 200):
+        wins = _expected_wins(games)
+        strengths = fit_bradley_terry(names, wins)
+        covariance = log_strength_covariance(names, wins, strengths)
+        spreads.append(difference_distribution("a", "b", strengths, covariance).stdev)
+    assert spreads[1] < spreads[0]
+
+
+def _tournament(strengths, examples=150, seed=0, fail_on=()):
+    outputs = {name: {example: ({"question": example}, {"name": name}) for example in range(examples)} for name in strengths}
+    rng = random.Random(seed)
+
+    def judge(inputs, pair_outputs):
+        first, second = pair_outputs[0]["name"], pair_outputs[1]["name"]
+        if inputs["question"] in fail_on:
+            raise RuntimeError("judge unavailable")
+        return [1, 0] if rng.random() < strengths[first] / (strengths[first] + strengths[second]) else [0, 1]
+
+    return Tournament(outputs, judge=judge, seed=seed)
+
+
+def test_run_orders_clearly_separated_experiments_with_fewer_calls_than_all_pairs():
+    tournament = _tournament({"a": 8.0, "b": 2.0, "c": 0.5})
+    ranking = tournament.run(max_workers=4)
+    assert [name for name, _ in ranking] == ["a", "b", "c"]
+    assert all(pair["status"] == "ordered" for pair in tournament.adjacent_pairs())
+    assert tournament.judge_calls < tournament.all_pairs_calls()
+
+
+def test_equal_experiments_end_as_a_tie_or_exhausted():
+    tournament = _tournament({"a": 1.0, "b": 1.0}, examples=300)
+    tournament.run(max_workers=4)
+    assert tournament.adjacent_pairs()[0]["status"] in ("tie", "exhausted")
+
+
+def test_rounds_fill_the_worker_batch():
+    tournament = _tournament({"a": 1.0, "b": 1.0, "c": 1.0})
+    tournament.run(max_workers=6, max_judge_calls=6)
+    assert tournament.rounds == 1
+    assert tournament.judge_calls == 6
+
+
+def test_judge_errors_cost_only_their_match():
+    tournament = _tournament({"a": 8.0, "b": 2.0}, fail_on=set(range(0, 150, 3)))
+    tournament.run(max_workers=4)
+    assert tournament.judge_errors > 0
+    assert tournament.judge_calls > tournament.judge_errors
+    assert tournament.ranking()[0][0] == "a"
+
+
+def test_max_judge_calls_is_a_hard_cap():
+    tournament = _tournament({"a": 1.0, "b": 1.0, "c": 1.0})
+    tournament.run(max_workers=4, max_judge_calls=10)
+    assert tournament.judge_calls == 10
+
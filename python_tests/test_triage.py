@@ -0,0 +1,87 @@
+"""Threshold fitting, the calibration split and cache lookups of the triage cascade."""
+
+import random
+
+from pydantic import BaseModel
+
+import tests.triage as triage
+from tests.judge_cache import JudgeCache
+from tests.triage import ON, TriageCascade, evaluate_thresholds, fit_threshold, fit_thresholds, split_held_out, threshold_for
+
+
+class Score(BaseModel):
+    reasoning: str
+    score: int
+
+
+def _samples(count, seed=0, schema="Score", verdict="[4]", group=None):
+    """Synthetic calibration samples whose agreement rate equals their confidence."""
+    rng = random.Random(seed)
+    samples = []
+    for index in range(count):
+        confidence = rng.random()
+        samples.append({"schema": schema, "verdict": verdict, "confidence": confidence, "agreed": rng.random() < confidence, "group": group or f"example-{index}"})
+    return samples
+
+
+def test_fit_threshold_picks_lowest_confidence_meeting_the_target():
+    samples = [(0.95, True), (0.9, True), (0.8, True), (0.7, False), (0.6, True), (0.5, False)]
+    assert fit_threshold(samples, 1.0) == 0.8
+    assert fit_threshold(samples, 0.8) == 0.6
+    assert fit_threshold(samples, 0.5) == 0.5
+
+
+def test_fit_threshold_never_cuts_between_equal_confidences():
+    assert fit_threshold([(0.9, True), (0.9, False), (0.5, True)], 1.0) is None
+    assert fit_threshold([(0.9, True), (0.9, True), (0.5, False)], 1.0) == 0.9
+
+
+def test_fit_threshold_is_none_when_the_target_is_unreachable():
+    assert fit_threshold([(0.9, False), (0.8, False)], 0.5) is None
+    assert fit_threshold([], 0.9) is None
+
+
+def test_fit_thresholds_needs_enough_samples_per_schema_and_verdict():
+    samples = _samples(200) + _samples(5, verdict="[1]") + _samples(10, schema="Rare")
+    thresholds = fit_thresholds(samples, 0.9)
+    assert set(thresholds) == {"Score"}
+    assert set(thresholds["Score"]["verdicts"]) == {"[4]"}
+    assert thresholds["Score"]["samples"] == 205
+    # A verdict without its own threshold falls back to the schema's
+    assert threshold_for(thresholds, "Score", "[1]") == thresholds["Score"]["threshold"]
+    assert threshold_for(thresholds, "Rare", "[4]") is None
+
+
+def test_fitted_threshold_holds_on_held_out_samples():
+    fit, held_out = split_held_out(_samples(4000), 0.3)
+    thresholds = fit_thresholds(fit, 0.9)
+    report = evaluate_thresholds(thresholds, held_out)["Score"]
+    assert 0.85 <= report["accepted_agreement"] <= 0.95
+    assert 0 < report["calls_avoided"] < 1
+    assert report["overall_agreement"] >= report["accepted_agreement"]
+
+
+def test_split_keeps_each_example_on_one_side():
+    samples = [sample for index in range(300) for sample in _samples(3, seed=index, group=f"example-{index}")]
+    fit, held_out = split_held_out(samples, 0.3)
+    assert len(fit) + len(held_out) == len(samples)
+    assert not {sample["group"] for sample in fit} & {sample["group"] for sample in held_out}
+    assert 0.2 < len(held_out) / len(samples) < 0.4
+    assert split_held_out(samples, 0.3) == (fit, held_out)
+
+
+def test_cached_full_verdict_skips_triage_and_counts_one_hit(tmp_path, monkeypatch):
+    cache = JudgeCache(path=str(tmp_path / "judge_cache.sqlite"), enabled=True)
+    monkeypatch.setattr(triage, "judge_cache", cache)
+    cascade = TriageCascade(mode=ON, thresholds_path=str(tmp_path / "thresholds.json"))
+    cascade._thresholds = {"Score": {"threshold": 0.5, "samples": 100, "verdicts": {}}}
+    verdict = Score(reasoning="clear", score=4)
+    cache.put("key", verdict)
+
+    def invoke_full():
+        return cache.get("key", Score)
+
+    assert cascade.run(Score, judge=None, request=([], "", {}), key="key", invoke_full=invoke_full) == verdict
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 0)
+    assert cascade.summary() == {}
+
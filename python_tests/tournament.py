@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""Rank any number of experiments with adaptive head-to-head judging instead of all pairs.
+
+Each round refits a Bradley-Terry model over all head_to_head_evaluator outcomes and fills a
+batch of judge calls with pairs that are adjacent in the current ranking and not yet settled.
+An adjacent pair is settled once the Laplace approximation to the Bradley-Terry posterior puts
+it in order with the required confidence (Bonferroni-corrected over the adjacent pairs), shows
+the two are within the tie margin, or the shared examples run out. The tournament stops when
+every adjacent pair is settled, and reports how many judge calls were saved compared with all pairs.
+"""
+
+import argparse
+import math
+import random
+from concurrent.futures import ThreadPoolExecutor
+from itertools import combinations
+from statistics import NormalDist
+from langsmith import Client
+from tests.pairwise_evaluation import head_to_head_evaluator
+from tests.experiments import load_experiment_outputs
+
+
+def fit_bradley_terry(names, wins, prior=0.5, iterations=200):
+    """Fit Bradley-Terry strengths with the MM algorithm; prior adds pseudo-wins between every pair."""
+    strengths = {name: 1.0 for name in names}
+    for _ in range(iterations):
+        updated = {}
+        for i in names:
+            total_wins = sum(wins[i][j] + prior for j in names if j != i)
+            denominator = sum((wins[i][j] + wins[j][i] + 2 * prior) / (strengths[i] + strengths[j]) for j in names if j != i)
+            updated[i] = total_wins / denominator if denominator else strengths[i]
+        scale = len(names) / sum(updated.values())
+        strengths = {name: value * scale for name, value in updated.items()}
+    return strengths
+
+
+def _invert(matrix: list[list[float]]) -> list[list[float]]:
+    # Gauss-Jordan elimination; the matrices here are small and positive definite
+    size = len(matrix)
+    augmented = [row[:] + [float(i == j) for j in range(size)] for i, row in enumerate(matrix)]
+    for column in range(size):
+        pivot = max(range(column, size), key=lambda row: abs(augmented[row][column]))
+        augmented[column], augmented[pivot] = augmented[pivot], augmented[column]
+        scale = augmented[column][column]
+        augmented[column] = [value / scale for value in augmented[column]]
+        for row in range(size):
+            if row != column and augmented[row][column]:
+                factor = augmented[row][column]
+                augmented[row] = [value - factor * pivot_value for value, pivot_value in zip(augmented[row], augmented[column])]
+    return [row[size:] for row in augmented]
+
+
+def log_strength_covariance(names, wins, strengths, prior=0.5):
+    """Covariance of the log-strengths under the Laplace approximation to the Bradley-Terry posterior.
+
+    The prior pseudo-wins act as the prior. Only differences are identified, so the last name's
+    log-strength is held fixed; variances of differences do not depend on that choice.
+    """
+    free = {name: index for index, name in enumerate(names[:-1])}
+    information = [[0.0] * len(free) for _ in free]
+    for i, j in combinations(names, 2):
+        p = strengths[i] / (strengths[i] + strengths[j])
+        weight = (wins[i][j] + wins[j][i] + 2 * prior) * p * (1 - p)
+        for a, b, sign in ((i, i, 1), (j, j, 1), (i, j, -1), (j, i, -1)):
+            if a in free and b in free:
+                information[free[a]][free[b]] += sign * weight
+    inverse = _invert(information) if free else []
+    return {a: {b: inverse[free[a]][free[b]] if a in free and b in free else 0.0 for b in names} for a in names}
+
+
+def difference_distribution(a, b, strengths, covariance) -> NormalDist:
+    """Approximate posterior of log(strength a) - log(strength b)."""
+    variance = covariance[a][a] + covariance[b][b] - 2 * covariance[a][b]
+    return NormalDist(math.log(strengths[a]) - math.log(strengths[b]), math.sqrt(max(variance, 1e-12)))
+
+
+class Tournament:
+    def __init__(self, experiment_outputs: dict, judge=head_to_head_evaluator, seed: int = 0):
+        self.names = list(experiment_outputs)
+        self.outputs = experiment_outputs
+        self.judge = judge
+        self.random = random.Random(seed)
+        # Only examples every experiment finished can be compared fairly
+        self.examples = sorted(set.intersection(*(set(outputs) for outputs in experiment_outputs.values())), key=str)
+        self.wins = {i: {j: 0.0 for j in self.names} for i in self.names}
+        self.judged = {pair: set() for pair in combinations(sorted(self.names), 2)}
+        self.judge_calls = 0
+        self.judge_errors = 0
+        self.rounds = 0
+
+    def ranking(self) -> list[tuple[str, float]]:
+        strengths = fit_bradley_terry(self.names, self.wins)
+        return sorted(strengths.items(), key=lambda item: item[1], reverse=True)
+
+    def adjacent_pairs(self, confidence=0.95, tie_margin=0.1, min_pair_comparisons=5) -> list[dict]:
+        """Each adjacent pair of the current ranking with its comparisons, confidence and status.
+
+        The status is "ordered", "tie", "exhausted" or "open". tie_margin is on the head-to-head
+        win rate: a pair is a tie once its win rate is within tie_margin of 0.5.
+        """
+        ranking = self.ranking()
+        strengths = dict(ranking)
+        covariance = log_strength_covariance(self.names, self.wins, strengths)
+        # Every adjacent pair is tested, so each gets an equal share of the error rate
+        pair_confidence = 1 - (1 - confidence) / max(1, len(self.names) - 1)
+        z = NormalDist().inv_cdf(pair_confidence)
+        tie_log_odds = math.log((0.5 + tie_margin) / (0.5 - tie_margin))
+        pairs = []
+        for (a, _), (b, _) in zip(ranking, ranking[1:]):
+            comparisons = len(self.judged[tuple(sorted((a, b)))])
+            difference = difference_distribution(a, b, strengths, covariance)
+            ordered_probability = 1 - difference.cdf(0)
+            if comparisons >= len(self.examples):
+                status = "exhausted"
+            elif comparisons < min_pair_comparisons:
+                status = "open"
+            elif ordered_probability >= pair_confidence:
+                status = "ordered"
+            elif -tie_log_odds <= difference.mean - z * difference.stdev and difference.mean + z * difference.stdev <= tie_log_odds:
+                status = "tie"
+            else:
+                status = "open"
+            pairs.append({"pair": (a, b), "comparisons": comparisons, "confidence": ordered_probability, "status": status})
+        return pairs
+
+    def _next_example(self, a, b):
+        pair = tuple(sorted((a, b)))
+        remaining = [example_id for example_id in self.examples if example_id not in self.judged[pair]]
+        if not remaining:
+            return None
+        example_id = self.random.choice(remaining)
+        self.judged[pair].add(example_id)
+        return example_id
+
+    def _presentation_order(self, a, b):
+        # Randomize presentation order so position bias does not favour either experiment
+        return (a, b) if self.random.random() < 0.5 else (b, a)
+
+    def _schedule(self, pairs: list[tuple[str, str]], batch_size: int) -> list[tuple]:
+        """Up to batch_size matches, spread round-robin over pairs, each on an example the pair has not seen."""
+        matches, pairs = [], list(pairs)
+        while pairs and len(matches) < batch_size:
+            for pair in list(pairs):
+                if len(matches) == batch_size:
+                    break
+                example_id = self._next_example(*pair)
+                if example_id is None:
+                    pairs.remove(pair)
+                else:
+                    matches.append((*self._presentation_order(*pair), example_id))
+        return matches
+
+    def _compare(self, first, second, example_id):
+        inputs = self.outputs[first][example_id][0]
+        try:
+            scores = self.judge(inputs, [self.outputs[first][example_id][1], self.outputs[second][example_id][1]])
+        except Exception as error:
+            # A failed judge call loses that one match; the example is not retried for the pair
+            print(f"Judge call failed for {first} vs {second} on {example_id}: {error!r}")
+            scores = None
+        return first, second, scores
+
+    def _record(self, first, second, scores):
+        if scores[0] == scores[1]:
+            self.wins[first][second] += 0.5
+            self.wins[second][first] += 0.5
+        elif scores[0] > scores[1]:
+            self.wins[first][second] += 1
+        else:
+            self.wins[second][first] += 1
+
+    def run(self, confidence=0.95, tie_margin=0.1, min_pair_comparisons=5, max_judge_calls=None, max_workers=4):
+        """Judge batches of open adjacent pairs until every adjacent pair is ordered, tied or out of examples."""
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while True:
+                open_pairs = [pair["pair"] for pair in self.adjacent_pairs(confidence, tie_margin, min_pair_comparisons) if pair["status"] == "open"]
+                batch_size = max_workers if max_judge_calls is None else min(max_workers, max_judge_calls - self.judge_calls)
+                matches = self._schedule(open_pairs, batch_size)
+                if not matches:
+                    break
+                for first, second, scores in executor.map(lambda match: self._compare(*match), matches):
+                    self.judge_calls += 1
+                    if scores is None:
+                        self.judge_errors += 1
+                    else:
+                        self._record(first, second, scores)
+                self.rounds += 1
+        return self.ranking()
+
+    def all_pairs_calls(self) -> int:
+        return len(self.judged) * len(self.examples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rank experiments with adaptive head-to-head judging')
+    parser.add_argument('experiments', nargs='+', help='Experiment (project) names to rank')
+    parser.add_argument('--confidence', type=float, default=0.95, help='Probability that the whole ranking of adjacent pairs is in the right order')
+    parser.add_argument('--tie-margin', type=float, default=0.1, help='Call an adjacent pair a tie once its win rate is within this margin of 0.5')
+    parser.add_argument('--min-pair-comparisons', type=int, default=5, help='Judge each adjacent pair in the final ranking at least this many times')
+    parser.add_argument('--max-judge-calls', type=int, help='Hard cap on judge calls')
+    parser.add_argument('--workers', type=int, default=4, help='Concurrent judge calls per round')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    if len(args.experiments) < 2:
+        parser.error("At least two experiments are needed to rank")
+
+    client = Client()
+    tournament = Tournament({name: load_experiment_outputs(client, name) for name in args.experiments}, seed=args.seed)
+    ranking = tournament.run(confidence=args.confidence, tie_margin=args.tie_margin, min_pair_comparisons=args.min_pair_comparisons, max_judge_calls=args.max_judge_calls, max_workers=args.workers)
+
+    for position, (name, strength) in enumerate(ranking, start=1):
+        print(f"{position}. {name} (Bradley-Terry strength {strength:.3f})")
+    for pair in tournament.adjacent_pairs(args.confidence, args.tie_margin, args.min_pair_comparisons):
+        a, b = pair["pair"]
+        print(f"{a} > {b}: P = {pair['confidence']:.3f} after {pair['comparisons']} comparisons ({pair['status']})")
+    all_pairs = tournament.all_pairs_calls()
+    print(f"Judge calls: {tournament.judge_calls} vs {all_pairs} for all pairs on {len(tournament.examples)} shared examples "
+          f"({all_pairs - tournament.judge_calls} saved, {tournament.judge_errors} failed)")
+
+
+if __name__ == "__main__":
+    main()
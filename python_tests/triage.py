@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""Cheap-model triage in front of the expensive judges.
+
+With JUDGE_CASCADE=on, a judge call that misses the judge cache first goes to a small model of
+the same provider, asked for the same verdict plus a confidence. The small model's verdict is
+kept when its confidence clears the calibrated threshold for that schema and verdict; otherwise
+the call escalates to the full judge. Verdicts that the small model gets wrong too often at any
+confidence (typically the borderline ones) get no threshold and always escalate. A random
+TRIAGE_AUDIT_RATE of accepted verdicts is escalated anyway, to keep measuring agreement.
+
+Thresholds come from calibration on experiments that were already graded, so the full verdicts
+are judge cache hits and only the small model is paid for:
+
+    python tests/triage.py calibrate "ODR GPT-5, Tavily Search-1a2b3c4d" --target-agreement 0.9
+    python tests/triage.py calibrate --pairwise "DR Single Agent..." "DR Supervisor..."
+
+Thresholds are fit on part of the examples and their agreement and avoided calls are reported
+on the held-out rest, which is what to expect from a cascade run.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import threading
+from typing import Optional
+from pydantic import BaseModel, Field, create_model
+from langchain_anthropic import ChatAnthropic
+from tests.judge_cache import judge_cache
+from tests.cost_meter import cost_meter
+from tests.rate_limits import rate_limiter
+from tests.judges import get_judge, structured_judge, judge_calls_deferred
+from tests.sharding import shard_of
+from tests.experiments import load_experiment_outputs
+
+OFF, ON, CALIBRATE = "off", "on", "calibrate"
+THRESHOLDS_PATH = os.getenv("TRIAGE_THRESHOLDS_PATH", "tests/.cache/triage_thresholds.json")
+# Small model per judge provider, so requests keep the provider's message format
+TRIAGE_MODELS = {"openai": "gpt-4.1-mini", "anthropic": "claude-3-5-haiku-latest"}
+# Fewer calibration samples than these leave a schema (or a verdict) on its coarser threshold
+MIN_SCHEMA_SAMPLES = 20
+MIN_VERDICT_SAMPLES = 10
+CONFIDENCE_DESCRIPTION = "Probability from 0 to 1 that a careful expert grader, reading the same material, would give exactly this verdict."
+
+_confidence_schemas: dict[type, type] = {}
+_lock = threading.Lock()
+
+
+def decision_fields(schema: type[BaseModel]) -> list[str]:
+    """The scalar fields that make up a verdict; free-text reasoning does not count."""
+    return [name for name, field in schema.model_fields.items() if field.annotation in (int, float, bool)]
+
+
+def with_confidence(schema: type[BaseModel]) -> type[BaseModel]:
+    """schema plus a confidence field, for the triage model to answer with."""
+    with _lock:
+        if schema not in _confidence_schemas:
+            _confidence_schemas[schema] = create_model(
+                f"{schema.__name__}Triage",
+                __base__=schema,
+                __doc__=schema.__doc__,
+                confidence=(float, Field(description=CONFIDENCE_DESCRIPTION)),
+            )
+        return _confidence_schemas[schema]
+
+
+def verdict_of(schema: type[BaseModel], result: BaseModel) -> str:
+    return json.dumps([getattr(result, name) for name in decision_fields(schema)])
+
+
+def triage_judge_for(judge):
+    if isinstance(judge, ChatAnthropic):
+        return get_judge("anthropic", TRIAGE_MODELS["anthropic"], max_tokens=4096)
+    return get_judge("openai", TRIAGE_MODELS["openai"])
+
+
+def fit_threshold(samples: list[tuple[float, bool]], target_agreement: float) -> Optional[float]:
+    """Lowest confidence at which the samples at or above it agree at least target_agreement of the time.
+
+    None when no confidence level gets there: those verdicts always escalate.
+    """
+    ordered = sorted(samples, key=lambda sample: sample[0], reverse=True)
+    best, agreed = None, 0
+    for count, (confidence, agrees) in enumerate(ordered, start=1):
+        agreed += agrees
+        # Only cut between distinct confidences, so every sample at the threshold is accepted
+        if (count == len(ordered) or ordered[count][0] < confidence) and agreed / count >= target_agreement:
+            best = confidence
+    return best
+
+
+def fit_thresholds(samples: list[dict], target_agreement: float) -> dict:
+    """Per schema threshold, plus per verdict thresholds where a verdict has enough samples."""
+    thresholds = {}
+    for schema_name in sorted({sample["schema"] for sample in samples}):
+        schema_samples = [sample for sample in samples if sample["schema"] == schema_name]
+        if len(schema_samples) < MIN_SCHEMA_SAMPLES:
+            continue
+        verdicts = {}
+        for verdict in sorted({sample["verdict"] for sample in schema_samples}):
+            verdict_samples = [(sample["confidence"], sample["agreed"]) for sample in schema_samples if sample["verdict"] == verdict]
+            if len(verdict_samples) >= MIN_VERDICT_SAMPLES:
+                verdicts[verdict] = {"threshold": fit_threshold(verdict_samples, target_agreement), "samples": len(verdict_samples)}
+        thresholds[schema_name] = {
+            "threshold": fit_threshold([(sample["confidence"], sample["agreed"]) for sample in schema_samples], target_agreement),
+            "samples": len(schema_samples),
+            "verdicts": verdicts,
+        }
+    return thresholds
+
+
+def split_held_out(samples: list[dict], held_out: float) -> tuple[list[dict], list[dict]]:
+    """(fit, held out) samples, split by example so one example's judge calls are never on both sides."""
+    fit, held = [], []
+    for sample in samples:
+        (held if shard_of(sample["group"], 100) < held_out * 100 else fit).append(sample)
+    return fit, held
+
+
+def threshold_for(thresholds: dict, schema_name: str, verdict: str) -> Optional[float]:
+    entry = thresholds.get(schema_name)
+    if entry is None:
+        return None
+    return entry["verdicts"].get(verdict, entry)["threshold"]
+
+
+def evaluate_thresholds(thresholds: dict, samples: list[dict]) -> dict:
+    """Agreement of the verdicts the thresholds would accept, and the share of full judge calls avoided."""
+    report = {}
+    for schema_name in sorted({sample["schema"] for sample in samples}):
+        schema_samples = [sample for sample in samples if sample["schema"] == schema_name]
+        accepted = [
+            sample for sample in schema_samples
+            if (threshold := threshold_for(thresholds, schema_name, sample["verdict"])) is not None and sample["confidence"] >= threshold
+        ]
+        report[schema_name] = {
+            "samples": len(schema_samples),
+            "calls_avoided": round(len(accepted) / len(schema_samples), 3),
+            "accepted_agreement": round(sum(sample["agreed"] for sample in accepted) / len(accepted), 3) if accepted else None,
+            # Agreement of the cascade as a whole: escalated calls get the full verdict
+            "overall_agreement": round(1 - sum(not sample["agreed"] for sample in accepted) / len(schema_samples), 3),
+            "triage_agreement": round(sum(sample["agreed"] for sample in schema_samples) / len(schema_samples), 3),
+        }
+    return report
+
+
+class TriageCascade:
+    """Runs judge calls through the small model first and decides whether to escalate."""
+
+    def __init__(self, mode: str = os.getenv("JUDGE_CASCADE", OFF), thresholds_path: str = THRESHOLDS_PATH, audit_rate: float = float(os.getenv("TRIAGE_AUDIT_RATE", "0.05")), seed: Optional[int] = None):
+        self.mode = mode
+        self.thresholds_path = thresholds_path
+        self.audit_rate = audit_rate
+        self.samples: list[dict] = []
+        # Identifies the example being graded while calibrating, for the fit / held-out split
+        self.sample_group: Optional[str] = None
+        self._thresholds: Optional[dict] = None
+        self._counts: dict[str, dict[str, int]] = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def thresholds(self) -> dict:
+        if self._thresholds is None:
+            self._thresholds = {}
+            if os.path.exists(self.thresholds_path):
+                with open(self.thresholds_path, encoding="utf-8") as f:
+                    self._thresholds = json.load(f)["schemas"]
+        return self._thresholds
+
+    def _count(self, schema: type[BaseModel], *names: str) -> None:
+        with self._lock:
+            counts = self._counts.setdefault(schema.__name__, {})
+            for name in names:
+                counts[name] = counts.get(name, 0) + 1
+
+    def _should_triage(self, schema: type[BaseModel], key: str) -> bool:
+        # Deferred (batch) grading is already cheap, and schemas without a scalar verdict cannot be compared
+        if self.mode == OFF or judge_calls_deferred() or not decision_fields(schema):
+            return False
+        if self.mode == CALIBRATE:
+            return True
+        entry = self.thresholds.get(schema.__name__)
+        if entry is None or (entry["threshold"] is None and all(verdict["threshold"] is None for verdict in entry["verdicts"].values())):
+            return False
+        # A full verdict already in the judge cache costs nothing; invoke_full looks it up and counts the hit
+        return not judge_cache.contains(key)
+
+    def _triage_call(self, judge, schema: type[BaseModel], request: tuple[list[dict], str, dict]):
+        messages, template, fields = request
+        triage_judge, triage_schema = triage_judge_for(judge), with_confidence(schema)
+        return triage_judge, triage_schema, messages, judge_cache.key(triage_schema, triage_judge, template, fields)
+
+    def _decide(self, schema: type[BaseModel], triaged: Optional[BaseModel]) -> str:
+        if triaged is None:
+            self._count(schema, "triage_errors")
+            return "escalate"
+        if self.mode == CALIBRATE:
+            return "calibrate"
+        self._count(schema, "triaged")
+        threshold = threshold_for(self.thresholds, schema.__name__, verdict_of(schema, triaged))
+        if threshold is None or triaged.confidence < threshold:
+            self._count(schema, "escalated")
+            return "escalate"
+        with self._lock:
+            audit = self._rng.random() < self.audit_rate
+        if audit:
+            self._count(schema, "audited")
+            return "audit"
+        self._count(schema, "accepted")
+        return "accept"
+
+    def _record(self, schema: type[BaseModel], decision: str, triaged: Optional[BaseModel], full: BaseModel) -> None:
+        if triaged is None:
+            return
+        agreed = verdict_of(schema, triaged) == verdict_of(schema, full)
+        if decision == "calibrate":
+            with self._lock:
+                self.samples.append({"schema": schema.__name__, "verdict": verdict_of(schema, triaged), "confidence": triaged.confidence, "agreed": agreed, "group": self.sample_group})
+        elif agreed:
+            self._count(schema, f"{decision}_agreed")
+
+    def run(self, schema: type[BaseModel], judge, request: tuple[list[dict], str, dict], key: str, invoke_full):
+        """Judge result for a request: the triage verdict when confident enough, else invoke_full()."""
+        if not self._should_triage(schema, key):
+            return invoke_full()
+        triage_judge, triage_schema, messages, triage_key = self._triage_call(judge, schema, request)
+        triaged = judge_cache.get(triage_key, triage_schema)
+        if triaged is None:
+            try:
+                triaged = structured_judge(triage_judge, triage_schema).invoke(messages, config={"callbacks": [cost_meter, rate_limiter]})
+                judge_cache.put(triage_key, triaged)
+            except Exception:
+                triaged = None
+        decision = self._decide(schema, triaged)
+        if decision == "accept":
+            return schema.model_validate(triaged.model_dump(exclude={"confidence"}))
+        full = invoke_full()
+        self._record(schema, decision, triaged, full)
+        return full
+
+    async def arun(self, schema: type[BaseModel], judge, request: tuple[list[dict], str, dict], key: str, ainvoke_full):
+        if not self._should_triage(schema, key):
+            return await ainvoke_full()
+        triage_judge, triage_schema, messages, triage_key = self._triage_call(judge, schema, request)
+        triaged = judge_cache.get(triage_key, triage_schema)
+        if triaged is None:
+            try:
+                triaged = await structured_judge(triage_judge, triage_schema).ainvoke(messages, config={"callbacks": [cost_meter, rate_limiter]})
+                judge_cache.put(triage_key, triaged)
+            except Exception:
+                triaged = None
+        decision = self._decide(schema, triaged)
+        if decision == "accept":
+            return schema.model_validate(triaged.model_dump(exclude={"confidence"}))
+        full = await ainvoke_full()
+        self._record(schema, decision, triaged, full)
+        return full
+
+    def summary(self) -> dict:
+        """Per schema: full judge calls avoided, and agreement with the full judge where it was still asked."""
+        summary = {}
+        with self._lock:
+            for schema_name, counts in sorted(self._counts.items()):
+                triaged = counts.get("triaged", 0)
+                audited, escalated = counts.get("audited", 0), counts.get("escalated", 0)
+                summary[schema_name] = {
+                    **counts,
+                    "calls_avoided": round(counts.get("accepted", 0) / triaged, 3) if triaged else None,
+                    # Audits are a random sample of accepted verdicts, so this estimates the accepted verdicts' agreement
+                    "audit_agreement": round(counts.get("audit_agreed", 0) / audited, 3) if audited else None,
+                    "escalated_agreement": round(counts.get("escalate_agreed", 0) / escalated, 3) if escalated else None,
+                }
+        return summary
+
+
+triage_cascade = TriageCascade()
+
+
+def save_thresholds(path: str, thresholds: dict, target_agreement: float, report: dict) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"target_agreement": target_agreement, "triage_models": TRIAGE_MODELS, "schemas": thresholds, "held_out": report}, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+async def _grade_experiments(client, experiment_names: list[str], evaluators: list) -> None:
+    from tests.evaluators import agrade_example
+    from tests.batch_grading import load_experiment_examples
+    for experiment_name in experiment_names:
+        for run_id, inputs, outputs, reference_outputs in load_experiment_examples(client, experiment_name):
+            triage_cascade.sample_group = str(run_id)
+            await agrade_example(inputs, outputs, reference_outputs, evaluators)
+
+
+def _compare_experiments(client, experiment_names: list[str]) -> None:
+    from tests.pairwise_evaluation import head_to_head_evaluator, free_for_all_evaluator
+    evaluator = head_to_head_evaluator if len(experiment_names) == 2 else free_for_all_evaluator
+    experiment_outputs = {name: load_experiment_outputs(client, name) for name in experiment_names}
+    for example_id in sorted(set.intersection(*(set(outputs) for outputs in experiment_outputs.values())), key=str):
+        triage_cascade.sample_group = str(example_id)
+        try:
+            evaluator(experiment_outputs[experiment_names[0]][example_id][0], [experiment_outputs[name][example_id][1] for name in experiment_names])
+        except Exception as error:
+            print(f"Skipping {example_id}: {error!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Calibrate the triage cascade on already graded experiments')
+    commands = parser.add_subparsers(dest='command', required=True)
+    calibrate = commands.add_parser('calibrate', help='Grade experiments with both models and fit confidence thresholds')
+    calibrate.add_argument('experiments', nargs='+', help='Experiments graded before, so the full verdicts come from the judge cache')
+    calibrate.add_argument('--pairwise', action='store_true', help='Calibrate the pairwise judge on two or three experiments instead')
+    calibrate.add_argument('--groundedness-mode', choices=['chunked', 'full'], default='chunked')
+    calibrate.add_argument('--target-agreement', type=float, default=0.9, help='Agreement with the full judge required of accepted verdicts')
+    calibrate.add_argument('--held-out', type=float, default=0.3, help='Fraction of examples held out to measure the fitted thresholds')
+    calibrate.add_argument('--output', default=THRESHOLDS_PATH)
+    args = parser.parse_args()
+    if args.pairwise and len(args.experiments) not in (2, 3):
+        parser.error("Pairwise calibration compares two or three experiments")
+
+    from langsmith import Client
+    client = Client()
+    triage_cascade.mode = CALIBRATE
+    if args.pairwise:
+        _compare_experiments(client, args.experiments)
+    else:
+        from tests.evaluators import eval_overall_quality, eval_relevance, eval_structure, eval_correctness, eval_groundedness, eval_groundedness_chunked, eval_completeness
+        groundedness = eval_groundedness_chunked if args.groundedness_mode == "chunked" else eval_groundedness
+        asyncio.run(_grade_experiments(client, args.experiments, [eval_overall_quality, eval_relevance, eval_structure, eval_correctness, groundedness, eval_completeness]))
+
+    fit, held_out = split_held_out(triage_cascade.samples, args.held_out)
+    thresholds = fit_thresholds(fit, args.target_agreement)
+    report = evaluate_thresholds(thresholds, held_out)
+    save_thresholds(args.output, thresholds, args.target_agreement, report)
+    print(f"{len(fit)} samples fit, {len(held_out)} held out; thresholds written to {args.output}")
+    print(json.dumps(report, indent=2))
+    print(f"Judge cache: {judge_cache.stats()}")
+    print(f"Cost: {cost_meter.totals()}")
+
+
+if __name__ == "__main__":
+    main()